@@ -1,11 +1,53 @@
+import time
+
+# Desde aquí se mide el arranque de cada worker (ver app.extensions['arranque'])
+INICIO_IMPORTACION = time.perf_counter()
+
 from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager  
+import os
+import tempfile
+
+from .comandos import registrar_comandos
+from .modelos import db
+from .servicios.cache_documentos import cache_documentos
+from .servicios.cache_usuarios import cache_usuarios
+from .servicios.catalogo_roles import catalogo_roles
+from .servicios.compresion import compresion
+from .servicios.contrasenas import politica_contrasenas
+from .servicios.conversion import conversor_pdf
+from .servicios.metricas import metricas
+from .servicios.perfilado import perfilador
+from .servicios.renderizado import cola_renderizado
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _entorno_entero(nombre, defecto):
+    valor = os.environ.get(nombre)
+    return int(valor) if valor not in (None, '') else defecto
 
-db = SQLAlchemy()
 
+def _entorno_booleano(nombre, defecto):
+    valor = os.environ.get(nombre)
+    if valor in (None, ''):
+        return defecto
+    return valor.strip().lower() in ('1', 'true', 'si', 'sí', 'yes', 'on')
 
-def create_app(config_name=None):
+
+def opciones_motor():
+    """Opciones del pool de conexiones (aplican a la principal y a las réplicas)."""
+    return {
+        'pool_size': _entorno_entero('DB_POOL_SIZE', 10),
+        'max_overflow': _entorno_entero('DB_MAX_OVERFLOW', 20),
+        'pool_timeout': _entorno_entero('DB_POOL_TIMEOUT', 30),
+        # Menor que wait_timeout de MySQL, para no usar conexiones que el servidor ya cerró
+        'pool_recycle': _entorno_entero('DB_POOL_RECYCLE', 1800),
+        'pool_pre_ping': _entorno_booleano('DB_POOL_PRE_PING', True),
+    }
+
+
+def create_app(config_name=None, configuracion=None):
     app = Flask(__name__)
 
     USER_DB = 'root'
@@ -14,17 +56,111 @@ def create_app(config_name=None):
     NAME_DB = 'cmc'
     FULL_URL_DB = f'mysql+pymysql://{USER_DB}:{PASS_DB}@{URL_DB}/{NAME_DB}'
 
-    app.config['SQLALCHEMY_DATABASE_URI'] = FULL_URL_DB
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', FULL_URL_DB)
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = opciones_motor()
+
+    # Réplicas de lectura para las vistas @solo_lectura (URLs separadas por coma)
+    replicas = [url.strip() for url in os.environ.get('DATABASE_REPLICAS', '').split(',') if url.strip()]
+    app.config['SQLALCHEMY_BINDS'] = {f'replica_{i}': url for i, url in enumerate(replicas)}
+    app.config['REPLICAS'] = list(app.config['SQLALCHEMY_BINDS'])
 
     # JWT
-    app.config['JWT_SECRET_KEY'] = 'Camilo1006'
+    app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY', 'Camilo1006')
     app.config['PROPAGATE_EXCEPTIONS'] = True
 
+    # Paginación por cursor (?after=&limit=)
+    app.config['PAGINACION_LIMITE_DEFECTO'] = 50
+    app.config['PAGINACION_LIMITE_MAXIMO'] = 500
+    # ?total=aproximado cuenta como mucho estas filas cuando hay filtros
+    app.config['CONTEO_MAXIMO'] = 10000
+
+    # Filas por lote al exportar certificados en streaming
+    app.config['EXPORTACION_LOTE'] = 500
+    # Descarga de varios certificados en un ZIP
+    app.config['ZIP_MAXIMO_CERTIFICADOS'] = 1000
+    app.config['ZIP_PARALELISMO'] = 4
+
+    # Máximo de certificados por POST /certificados/lote
+    app.config['CERTIFICADOS_LOTE_MAXIMO'] = 200
+
+    # Generación de documentos en segundo plano (0 = en el hilo de la petición)
+    app.config['PLANTILLA_CERTIFICADO'] = os.path.join(BASE_DIR, 'plantillas', 'plantilla_certificado.docx')
+    app.config['RENDER_PROCESOS'] = os.cpu_count() or 1
+
+    # Caché de documentos generados (DOCX/PDF) con límite de tamaño
+    app.config['CERTIFICADOS_DIR'] = os.path.join(BASE_DIR, 'certificados_generados')
+    app.config['CERTIFICADOS_CACHE_MAX_BYTES'] = 512 * 1024 * 1024
+
+    # Conversión DOCX -> PDF: 'libreoffice' (unoserver), 'docx2pdf' (requiere Word) o 'texto'
+    app.config['CONVERSOR_PDF'] = 'libreoffice'
+    app.config['CONVERSION_PROCESOS'] = 2
+    app.config['CONVERSION_TIMEOUT'] = 60
+    app.config['LIBREOFFICE_PUERTO_BASE'] = 2003
+    app.config['LIBREOFFICE_PERFILES_DIR'] = os.path.join(tempfile.gettempdir(), 'cmc_libreoffice')
+
+    # Entrega de archivos: 'flask', 'x-accel' (nginx) o 'x-sendfile' (Apache/lighttpd)
+    app.config['ENTREGA_ARCHIVOS'] = 'flask'
+    app.config['ENTREGA_X_ACCEL_PREFIJO'] = '/certificados_generados_internos/'
+
+    # Hash de contraseñas: 'pbkdf2:<hash>:<iteraciones>' o 'scrypt:<n>:<r>:<p>'.
+    # Los hashes con otra política se actualizan en el siguiente inicio de sesión.
+    app.config['CONTRASENA_METODO'] = 'pbkdf2:sha256:600000'
+    app.config['CONTRASENA_HILOS'] = 2
+    app.config['CONTRASENA_COLA'] = 32
+    app.config['CONTRASENA_ESPERA'] = 10
+
+    # Caché por proceso de usuarios autenticados (segundos de vigencia y máximo de entradas)
+    app.config['USUARIOS_CACHE_TTL'] = 60
+    app.config['USUARIOS_CACHE_MAXIMO'] = 1024
+    # Catálogo de roles en memoria: segundos antes de volver a leer la tabla
+    app.config['ROLES_CACHE_TTL'] = 300
+    # /metrics: con varios workers, directorio compartido donde cada proceso vuelca lo suyo
+    # (vaciarlo al desplegar); sin él cada worker expone solo sus propios valores
+    app.config['METRICAS_DIR'] = os.environ.get('METRICAS_DIR') or None
+    app.config['METRICAS_INTERVALO'] = 5
+    app.config['METRICAS_TOKEN'] = os.environ.get('METRICAS_TOKEN') or None
+    # Perfilado bajo demanda (cabecera X-Perfilar con este token); sin token no hay hooks
+    app.config['PERFILADO_TOKEN'] = os.environ.get('PERFILADO_TOKEN') or None
+    app.config['PERFILADO_DIR'] = os.environ.get('PERFILADO_DIR') or os.path.join(tempfile.gettempdir(), 'cmc_perfiles')
+    app.config['PERFILADO_FUNCIONES'] = 40
+
+    # Idempotency-Key en la creación de certificados: vigencia de las claves, espera máxima
+    # de un reintento a la petición original y segundos tras los que una reserva se da por abandonada
+    app.config['IDEMPOTENCIA_VENTANA'] = _entorno_entero('IDEMPOTENCIA_VENTANA', 24 * 3600)
+    app.config['IDEMPOTENCIA_ESPERA'] = 10
+    app.config['IDEMPOTENCIA_BLOQUEO'] = 120
+    # Compresión de respuestas (brotli si está instalado, si no gzip) a partir de este tamaño
+    app.config['COMPRESION_MINIMO'] = _entorno_entero('COMPRESION_MINIMO', 1024)
+    app.config['COMPRESION_NIVEL_GZIP'] = 6
+    app.config['COMPRESION_NIVEL_BROTLI'] = 5
+    app.config['COMPRESION_TIPOS'] = (
+        'application/json', 'application/x-ndjson', 'text/csv', 'text/plain', 'text/html',
+        'application/javascript', 'text/css',
+    )
+    # Documentos generados que se guardan también comprimidos (el DOCX ya es un ZIP)
+    app.config['COMPRESION_ARCHIVOS'] = ('pdf',)
+
+    # Valores que reemplazan los de arriba (benchmarks, pruebas manuales)
+    if configuracion:
+        app.config.update(configuracion)
+
     db.init_app(app)
+    cache_documentos.init_app(app)
+    cola_renderizado.init_app(app)
+    conversor_pdf.init_app(app)
+    politica_contrasenas.init_app(app)
+    cache_usuarios.init_app(app)
+    catalogo_roles.init_app(app)
+    # Antes que metricas y perfilador: after_request corre en orden inverso y la
+    # compresión tiene que ver la respuesta definitiva
+    compresion.init_app(app)
+    metricas.init_app(app)
+    perfilador.init_app(app)
 
     # Inicializar JWTManager después de configurar la clave secreta
     JWTManager(app)  # Inicializar JWTManager aquí
-    print(f"__init__.py: JWT_SECRET_KEY = {app.config['JWT_SECRET_KEY']}")
+
+    registrar_comandos(app)
 
     return app
\ No newline at end of file
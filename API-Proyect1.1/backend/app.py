@@ -1,54 +1,91 @@
-from flask import Flask, send_file
+from flask import Flask
 from flask_restful import Api
 from flask_cors import CORS
 from flask_migrate import Migrate
 from flasgger import Swagger
 
-from . import create_app
-from .modelos import db, crear_superusuario
+from . import INICIO_IMPORTACION, create_app
+from .modelos import db
+from .servicios import busqueda
+from .servicios.conversion import ErrorConversion
+from .servicios.entrega import enviar_documento, no_modificado
+from .servicios.renderizado import cola_renderizado
 from .vistas.auth import auth_blueprint
-from .vistas.vista_certificado import VistaCertificado, VistaCertificados
+from .vistas.vista_busqueda import VistaBuscarCertificados
+from .vistas.vista_certificado import VistaCertificado, VistaCertificados, VistaCertificadosLote, VistaEstadoRender
+from .vistas.vista_exportacion import VistaExportarCertificados, VistaZipCertificados
+from .vistas.vista_reportes import VistaReporteMensual, VistaReporteOperarios, VistaReporteTiposServicio
 from .vistas.vista_rol import VistaRol
 from .vistas.vistas_usuarios import UsuariosResource, UsuarioResource 
-from docx2pdf import convert
 
+import logging
 import os
+import time
 
-app = create_app()
 
-CORS(app, supports_credentials=True, resources={r"/*": {"origins": "http://localhost:5173"}})
+def descargar_certificado(id):
+    ruta_docx = cola_renderizado.ruta_vigente(id)
+    if ruta_docx:
+        # Si el cliente ya tiene este PDF no hace falta ni generarlo ni leerlo
+        no_modificada = no_modificado(os.path.splitext(ruta_docx)[0] + '.pdf')
+        if no_modificada:
+            return no_modificada
 
-Swagger(app)
-migrate = Migrate(app, db)
+    try:
+        ruta_pdf = cola_renderizado.documento_pdf(id)
+    except ErrorConversion as e:
+        return {'message': 'Error al convertir a PDF', 'error': str(e)}, 503
+    except Exception as e:
+        return {'message': 'Error al generar el PDF', 'error': str(e)}, 500
+    if not ruta_pdf:
+        return {'message': 'Archivo .docx no encontrado'}, 404
 
-app.register_blueprint(auth_blueprint)
+    return enviar_documento(ruta_pdf, f"Certificado_{id}.pdf")
 
-api = Api(app)
-api.add_resource(VistaCertificados, '/certificados')
-api.add_resource(VistaCertificado, '/certificados/<int:id>')
-api.add_resource(VistaRol, '/roles')
-api.add_resource(UsuariosResource, '/usuarios')
-api.add_resource(UsuarioResource, '/usuarios/<int:usuario_id>')
 
-@app.route('/certificados/<int:id>/archivo', methods=['GET'])
-def descargar_certificado(id):
-    ruta_docx = f"certificados_generados/Certificado_{id}.docx"
-    ruta_pdf = f"certificados_generados/Certificado_{id}.pdf"
+def construir_app(configuracion=None):
+    """La app con todas sus rutas; ``configuracion`` reemplaza valores de create_app."""
+    app = create_app(configuracion=configuracion)
+
+    CORS(app, supports_credentials=True, resources={r"/*": {"origins": "http://localhost:5173"}})
+
+    Swagger(app)
+    # La tabla de búsqueda no es un modelo: autogenerate no debe tocarla
+    Migrate(app, db, include_object=busqueda.incluir_en_migraciones)
+
+    app.register_blueprint(auth_blueprint)
+
+    api = Api(app)
+    api.add_resource(VistaCertificados, '/certificados')
+    api.add_resource(VistaCertificadosLote, '/certificados/lote')
+    api.add_resource(VistaBuscarCertificados, '/certificados/buscar')
+    api.add_resource(VistaCertificado, '/certificados/<int:id>')
+    api.add_resource(VistaExportarCertificados, '/certificados/exportar')
+    api.add_resource(VistaZipCertificados, '/certificados/zip')
+    api.add_resource(VistaEstadoRender, '/certificados/<int:id>/render-status')
+    api.add_resource(VistaReporteMensual, '/reportes/mensual')
+    api.add_resource(VistaReporteOperarios, '/reportes/operarios')
+    api.add_resource(VistaReporteTiposServicio, '/reportes/tipos-servicio')
+    api.add_resource(VistaRol, '/roles', '/roles/<int:id>')
+    api.add_resource(UsuariosResource, '/usuarios')
+    api.add_resource(UsuarioResource, '/usuarios/<int:usuario_id>')
+
+    app.add_url_rule('/certificados/<int:id>/archivo', view_func=descargar_certificado, methods=['GET'])
+    return app
 
-    if not os.path.exists(ruta_docx):
-        return {'message': 'Archivo .docx no encontrado'}, 404
 
-    if not os.path.exists(ruta_pdf):
-        try:
-            convert(ruta_docx, ruta_pdf)
-        except Exception as e:
-            return {'message': 'Error al convertir a PDF', 'error': str(e)}, 500
+app = construir_app()
 
-    return send_file(ruta_pdf, as_attachment=True)
+# Las tablas y el superusuario ya no se crean al importar (cada worker lo repetía):
+# ver `flask crear-tablas` y `flask crear-superusuario` en comandos.py.
 
-with app.app_context():
-    db.create_all()
-    crear_superusuario()
+app.extensions['arranque'] = {
+    'pid': os.getpid(),
+    'segundos': time.perf_counter() - INICIO_IMPORTACION,
+}
+logging.getLogger(__name__).info(
+    "Worker %s listo en %.1f ms", os.getpid(), app.extensions['arranque']['segundos'] * 1000
+)
 
 if __name__ == '__main__':
     app.run(debug=True)
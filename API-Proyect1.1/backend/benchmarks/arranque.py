@@ -0,0 +1,77 @@
+"""
+Mide el arranque en frío de un worker: importar backend.app en un proceso nuevo, como hace
+gunicorn con cada worker. La base apunta a una ruta que no existe, así que si algo intenta
+conectarse durante la importación la medición falla en lugar de esconderlo.
+
+Uso (desde API-Proyect1.1/):
+    python -m backend.benchmarks.arranque [--repeticiones 10] [--modulos 15]
+
+--modulos muestra los módulos más lentos según `python -X importtime`.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+CODIGO = (
+    "import time; t = time.perf_counter(); import backend.app as m; "
+    "print(time.perf_counter() - t, m.app.extensions['arranque']['segundos'])"
+)
+
+
+def _entorno():
+    entorno = dict(os.environ)
+    entorno['DATABASE_URL'] = 'sqlite:////ruta/que/no/existe/arranque.db'
+    entorno.pop('DATABASE_REPLICAS', None)
+    return entorno
+
+
+def medir(repeticiones):
+    totales, propios = [], []
+    for _ in range(repeticiones):
+        salida = subprocess.run(
+            [sys.executable, '-c', CODIGO], capture_output=True, text=True, env=_entorno()
+        )
+        if salida.returncode != 0:
+            raise SystemExit(f"La importación falló:\n{salida.stderr}")
+        total, propio = map(float, salida.stdout.split()[-2:])
+        totales.append(total)
+        propios.append(propio)
+    return totales, propios
+
+
+def modulos_lentos(cantidad):
+    salida = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import backend.app'],
+        capture_output=True, text=True, env=_entorno()
+    )
+    filas = []
+    for linea in salida.stderr.splitlines():
+        if not linea.startswith('import time:') or 'self [us]' in linea:
+            continue
+        _, acumulado, modulo = linea[len('import time:'):].split('|')
+        filas.append((int(acumulado), modulo.rstrip()))
+    return sorted(filas, reverse=True)[:cantidad]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--repeticiones', type=int, default=10)
+    parser.add_argument('--modulos', type=int, default=0)
+    args = parser.parse_args()
+
+    totales, propios = medir(args.repeticiones)
+    ms = lambda v: f"{v * 1000:.1f} ms"
+    print(f"import backend.app ({args.repeticiones} procesos)")
+    print(f"  total:   mediana {ms(statistics.median(totales))}  min {ms(min(totales))}  max {ms(max(totales))}")
+    print(f"  backend: mediana {ms(statistics.median(propios))}  (app.extensions['arranque'])")
+
+    if args.modulos:
+        print("\nMódulos más lentos (acumulado):")
+        for acumulado, modulo in modulos_lentos(args.modulos):
+            print(f"  {acumulado / 1000:8.1f} ms  {modulo}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,299 @@
+"""
+Benchmark de los endpoints principales contra una base SQLite sembrada.
+
+La app se construye con construir_app() (las mismas rutas que en producción) y se recorre
+con el cliente de pruebas de Flask, primero en secuencia y luego con varios hilos a la vez.
+Por endpoint se informa latencia p50/p95/p99, peticiones por segundo y consultas SQL por
+petición. La conversión a PDF usa el conversor 'texto', sin LibreOffice.
+
+Con --guardar los resultados quedan como línea base; sin él se comparan con la línea base
+guardada y el proceso termina con código 1 si algún endpoint empeoró más que --margen
+(latencia p95 o rendimiento) o hace más consultas SQL que antes.
+
+Uso (desde API-Proyect1.1/):
+    python -m backend.benchmarks.bench_endpoints [--certificados 2000] [--usuarios 50]
+        [--peticiones 100] [--concurrencia 8] [--margen 0.25] [--guardar]
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from sqlalchemy import event
+
+LINEA_BASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'linea_base_endpoints.json')
+CONTRASENA = 'benchmark123'
+# Certificados que se descargan: pocos, para medir también la caché de documentos
+DESCARGAS_DISTINTAS = 20
+BUSQUEDAS = ('producto', 'operario', 'producto%201', 'ingrediente%20b', 'ninguna%20oper')
+
+
+def item_certificado(usuario_id, rng):
+    return {
+        'usuario_id': usuario_id,
+        'fecha': (date(2024, 1, 1) + timedelta(days=rng.randrange(365))).isoformat(),
+        'estado': 'activo',
+        'orden_servicio': {
+            'fecha': '2024-05-01', 'hora': '10:00', 'precaucion': 'ninguna', 'usuario_id': usuario_id,
+            'tipo_servicio': {'descripcion': 'Fumigación'},
+        },
+        'detalle_servicio': {'precio': 1000, 'nombre_operario': 'Operario', 'cantidad_producto': '2L', 'fin_servicio': '11:00'},
+        'fichas_tecnicas': [
+            {'producto_aplicado': 'Producto A', 'dosis': '1ml', 'ingrediente_activo': 'Ingrediente A'},
+            {'producto_aplicado': 'Producto B', 'dosis': '2ml', 'ingrediente_activo': 'Ingrediente B'},
+        ],
+    }
+
+
+def sembrar(db, n_usuarios, n_certificados):
+    """Inserciones masivas con ids explícitos: sembrar miles de certificados toma segundos."""
+    from backend.modelos import (
+        Certificado, DetalleServicio, FichaTecnica, OrdenServicio, Rol, TipoServicio, TrabajoRender, Usuario
+    )
+    from backend.servicios.contrasenas import politica_contrasenas
+
+    contrasena_hash = politica_contrasenas.generar(CONTRASENA)
+    insertar = lambda modelo, filas: filas and db.session.execute(modelo.__table__.insert(), filas)
+
+    insertar(Rol, [{'id': 1, 'nombre': 'admin'}, {'id': 2, 'nombre': 'cliente'}])
+    insertar(Usuario, [
+        {'id': i, 'nombre': f'usuario_{i}', 'direccion': 'Calle 1', 'telefono': '3000000000',
+         'contrasena_hash': contrasena_hash, 'rol_id': 1 if i == 1 else 2}
+        for i in range(1, n_usuarios + 1)
+    ])
+    insertar(TipoServicio, [{'id': i, 'descripcion': 'Fumigación'} for i in range(1, n_certificados + 1)])
+    ordenes, detalles, certificados, fichas, trabajos = [], [], [], [], []
+    for i in range(1, n_certificados + 1):
+        usuario_id = (i % n_usuarios) + 1
+        fecha = date(2024, 1, 1) + timedelta(days=i % 365)
+        ordenes.append({'id': i, 'fecha': fecha, 'hora': '10:00', 'precaucion': 'ninguna',
+                        'usuario_id': usuario_id, 'tipo_servicio_id': i})
+        detalles.append({'id': i, 'precio': 1000, 'nombre_operario': 'Operario', 'cantidad_producto': '2L',
+                         'fin_servicio': '11:00', 'orden_servicio_id': i})
+        certificados.append({'id': i, 'fecha': fecha, 'estado': 'activo', 'usuario_id': usuario_id,
+                             'orden_servicio_id': i})
+        for k in range(2):
+            fichas.append({'producto_aplicado': f'Producto {k}', 'dosis': '1ml', 'ingrediente_activo': 'X',
+                           'certificado_id': i, 'detalle_servicio_id': i})
+        trabajos.append({'certificado_id': i, 'estado': 'pendiente', 'datos': json.dumps({
+            'fecha': fecha.isoformat(), 'cliente': f'usuario_{usuario_id}', 'descripcion_servicio': 'Fumigación',
+        })})
+    insertar(OrdenServicio, ordenes)
+    insertar(DetalleServicio, detalles)
+    insertar(Certificado, certificados)
+    insertar(FichaTecnica, fichas)
+    insertar(TrabajoRender, trabajos)
+    db.session.commit()
+
+
+def escenarios(n_usuarios, n_certificados, token_admin):
+    """nombre -> función(cliente, rng) que hace una petición y devuelve la respuesta."""
+    admin = {'Authorization': f'Bearer {token_admin}'}
+    return {
+        'POST /login': lambda c, rng: c.post('/login', json={
+            'nombre': f'usuario_{rng.randint(1, n_usuarios)}', 'contrasena': CONTRASENA}),
+        'GET /certificados': lambda c, rng: c.get('/certificados?limit=50'),
+        'GET /certificados (gzip)': lambda c, rng: c.get(
+            '/certificados?limit=50', headers={'Accept-Encoding': 'gzip'}),
+        'GET /certificados?after=': lambda c, rng: c.get(
+            f'/certificados?limit=50&after={rng.randrange(n_certificados)}'),
+        'POST /certificados': lambda c, rng: c.post('/certificados', json=item_certificado(
+            rng.randint(1, n_usuarios), rng)),
+        'GET /certificados/<id>': lambda c, rng: c.get(f'/certificados/{rng.randint(1, n_certificados)}'),
+        'GET /certificados/buscar': lambda c, rng: c.get(
+            f'/certificados/buscar?q={rng.choice(BUSQUEDAS)}&limit=50'),
+        'GET /usuarios': lambda c, rng: c.get('/usuarios', headers=admin),
+        'GET /reportes/mensual': lambda c, rng: c.get('/reportes/mensual?desde=2024-01&hasta=2024-12', headers=admin),
+        'GET /certificados/<id>/archivo': lambda c, rng: c.get(
+            f'/certificados/{rng.randint(1, min(DESCARGAS_DISTINTAS, n_certificados))}/archivo'),
+    }
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    indice = max(0, min(len(ordenados) - 1, int(round(p / 100 * len(ordenados) + 0.5)) - 1))
+    return ordenados[indice]
+
+
+class ContadorSQL:
+    """Cuenta las sentencias que ejecuta cada hilo."""
+
+    def __init__(self, engine):
+        self._local = threading.local()
+        event.listen(engine, 'before_cursor_execute', self._contar)
+
+    def _contar(self, *args):
+        self._local.n = getattr(self._local, 'n', 0) + 1
+
+    def reiniciar(self):
+        self._local.n = 0
+
+    @property
+    def valor(self):
+        return getattr(self._local, 'n', 0)
+
+
+def correr(app, peticion, n, concurrencia, contador, semilla):
+    """Devuelve (latencias en s, consultas por petición, segundos totales, errores)."""
+    latencias, consultas, errores = [], [], []
+    bloqueo = threading.Lock()
+    repartidas = [n // concurrencia + (1 if i < n % concurrencia else 0) for i in range(concurrencia)]
+
+    def hilo(indice, cantidad):
+        cliente = app.test_client()
+        rng = random.Random(semilla * 1000 + indice)
+        propias = []
+        for _ in range(cantidad):
+            contador.reiniciar()
+            inicio = time.perf_counter()
+            respuesta = peticion(cliente, rng)
+            respuesta.get_data()
+            duracion = time.perf_counter() - inicio
+            propias.append((duracion, contador.valor, respuesta.status_code))
+        with bloqueo:
+            for duracion, n_sql, estado in propias:
+                latencias.append(duracion)
+                consultas.append(n_sql)
+                if estado >= 400:
+                    errores.append(estado)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+        list(pool.map(hilo, range(concurrencia), repartidas))
+    return latencias, consultas, time.perf_counter() - inicio, errores
+
+
+def medir(app, contador, nombre, peticion, n, concurrencia):
+    correr(app, peticion, min(5, n), 1, contador, semilla=0)  # calentamiento
+    latencias, consultas, _, errores = correr(app, peticion, n, 1, contador, semilla=1)
+    latencias_c, _, segundos_c, errores_c = correr(app, peticion, n, concurrencia, contador, semilla=2)
+    return {
+        'peticiones': n,
+        'p50_ms': round(percentil(latencias, 50) * 1000, 3),
+        'p95_ms': round(percentil(latencias, 95) * 1000, 3),
+        'p99_ms': round(percentil(latencias, 99) * 1000, 3),
+        'consultas_por_peticion': round(statistics.mean(consultas), 2),
+        'concurrencia': concurrencia,
+        'p95_concurrente_ms': round(percentil(latencias_c, 95) * 1000, 3),
+        'peticiones_por_segundo': round(n / segundos_c, 1),
+        'errores': len(errores) + len(errores_c),
+    }
+
+
+def comparar(resultados, base, margen):
+    regresiones = []
+    for nombre, actual in resultados.items():
+        anterior = base.get('endpoints', {}).get(nombre)
+        if not anterior:
+            continue
+        if actual['p95_ms'] > anterior['p95_ms'] * (1 + margen):
+            regresiones.append(f"{nombre}: p95 {anterior['p95_ms']} -> {actual['p95_ms']} ms")
+        if actual['peticiones_por_segundo'] < anterior['peticiones_por_segundo'] * (1 - margen):
+            regresiones.append(
+                f"{nombre}: {anterior['peticiones_por_segundo']} -> {actual['peticiones_por_segundo']} pet/s")
+        if actual['consultas_por_peticion'] > anterior['consultas_por_peticion'] + 0.01:
+            regresiones.append(
+                f"{nombre}: consultas {anterior['consultas_por_peticion']} -> {actual['consultas_por_peticion']}")
+        if actual['errores'] > anterior.get('errores', 0):
+            regresiones.append(f"{nombre}: errores {anterior.get('errores', 0)} -> {actual['errores']}")
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--certificados', type=int, default=2000)
+    parser.add_argument('--usuarios', type=int, default=50)
+    parser.add_argument('--peticiones', type=int, default=100)
+    parser.add_argument('--peticiones-login', type=int, default=20,
+                        help='El login es caro a propósito (hash de contraseña): se mide con menos peticiones')
+    parser.add_argument('--concurrencia', type=int, default=8)
+    parser.add_argument('--solo', action='append', help='Medir solo este endpoint (se puede repetir)')
+    parser.add_argument('--margen', type=float, default=0.25)
+    parser.add_argument('--linea-base', default=LINEA_BASE)
+    parser.add_argument('--guardar', action='store_true', help='Guardar los resultados como línea base')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    directorio = tempfile.mkdtemp(prefix='bench_endpoints_')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(directorio, 'bench.db')
+    os.environ.pop('DATABASE_REPLICAS', None)
+
+    from flask_jwt_extended import create_access_token
+
+    from backend.app import construir_app
+    from backend.modelos import db
+    from backend.servicios import busqueda, reportes
+
+    app = construir_app({
+        'RENDER_PROCESOS': 0,
+        'CONVERSOR_PDF': 'texto',
+        'CERTIFICADOS_DIR': os.path.join(directorio, 'certificados_generados'),
+    })
+
+    with app.app_context():
+        db.create_all()
+        inicio = time.perf_counter()
+        sembrar(db, args.usuarios, args.certificados)
+        with db.engine.begin() as conexion:
+            busqueda.crear_indice(conexion)
+            busqueda.reindexar_todo(conexion)
+            reportes.reconstruir(conexion)
+        print(f"Base sembrada en {time.perf_counter() - inicio:.1f} s "
+              f"({args.usuarios} usuarios, {args.certificados} certificados)")
+        token_admin = create_access_token(identity='1', additional_claims={'rol': 'admin'})
+        contador = ContadorSQL(db.engine)
+
+    resultados = {}
+    for nombre, peticion in escenarios(args.usuarios, args.certificados, token_admin).items():
+        if args.solo and nombre not in args.solo:
+            continue
+        n = args.peticiones_login if nombre == 'POST /login' else args.peticiones
+        resultados[nombre] = medir(app, contador, nombre, peticion, n, args.concurrencia)
+
+    print(f"\n{'endpoint':32} {'p50':>9} {'p95':>9} {'p99':>9} {'SQL':>6} {'pet/s':>8} {'err':>4}")
+    for nombre, r in resultados.items():
+        print(f"{nombre:32} {r['p50_ms']:>7.2f}ms {r['p95_ms']:>7.2f}ms {r['p99_ms']:>7.2f}ms "
+              f"{r['consultas_por_peticion']:>6.1f} {r['peticiones_por_segundo']:>8.1f} {r['errores']:>4}")
+
+    shutil.rmtree(directorio, ignore_errors=True)
+
+    medicion = {
+        'parametros': {k: getattr(args, k) for k in ('certificados', 'usuarios', 'peticiones', 'peticiones_login', 'concurrencia')},
+        'entorno': {'python': platform.python_version(), 'plataforma': platform.platform()},
+        'endpoints': resultados,
+    }
+    if args.guardar:
+        with open(args.linea_base, 'w', encoding='utf-8') as f:
+            json.dump(medicion, f, indent=2, ensure_ascii=False)
+            f.write('\n')
+        print(f"\nLínea base guardada en {args.linea_base}")
+        return
+
+    if not os.path.exists(args.linea_base):
+        print("\nNo hay línea base; use --guardar para crearla")
+        return
+    with open(args.linea_base, encoding='utf-8') as f:
+        base = json.load(f)
+    if base.get('parametros') != medicion['parametros']:
+        print(f"\nAviso: la línea base se midió con otros parámetros: {base.get('parametros')}")
+    regresiones = comparar(resultados, base, args.margen)
+    if regresiones:
+        print(f"\nRegresiones (margen {args.margen:.0%}):")
+        for regresion in regresiones:
+            print(f"  {regresion}")
+        sys.exit(1)
+    print(f"\nSin regresiones respecto de la línea base (margen {args.margen:.0%})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Compara la plantilla precompilada con el recorrido original de python-docx.
+
+Uso (desde API-Proyect1.1/):
+    python -m backend.benchmarks.bench_plantilla [--repeticiones 200]
+"""
+import argparse
+import os
+import re
+import tempfile
+import time
+import zipfile
+
+from docx import Document
+
+from backend import BASE_DIR
+from backend.servicios.plantilla import MARCADOR, PlantillaCompilada
+
+PLANTILLA = os.path.join(BASE_DIR, 'plantillas', 'plantilla_certificado.docx')
+
+
+def renderizar_original(plantilla_path, salida, datos):
+    """El bucle que usaba VistaCertificados.post: párrafos x claves x runs."""
+    doc = Document(plantilla_path)
+    for p in doc.paragraphs:
+        for key, val in datos.items():
+            if f"{{{{{key}}}}}" in p.text:
+                for run in p.runs:
+                    run.text = run.text.replace(f"{{{{{key}}}}}", str(val))
+    doc.save(salida)
+
+
+def marcadores_sin_reemplazar(path):
+    with zipfile.ZipFile(path) as z:
+        texto = z.read('word/document.xml').decode('utf-8')
+    # Los marcadores partidos entre runs no se ven con un regex sobre el XML crudo,
+    # así que se cuenta sobre el texto sin etiquetas.
+    return len(MARCADOR.findall(re.sub(r'<[^>]+>', '', texto)))
+
+
+def medir(nombre, funcion, repeticiones):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    total = time.perf_counter() - inicio
+    print(f"{nombre:<14} {total / repeticiones * 1000:8.3f} ms/documento   ({repeticiones} repeticiones)")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeticiones', type=int, default=200)
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    compilada = PlantillaCompilada(PLANTILLA)
+    print(f"compilación    {(time.perf_counter() - inicio) * 1000:8.3f} ms (una sola vez)")
+
+    datos = {clave: f'valor de {clave}' for clave in compilada.marcadores}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        salida_original = os.path.join(tmp, 'original.docx')
+        salida_compilada = os.path.join(tmp, 'compilada.docx')
+
+        t_original = medir('original', lambda: renderizar_original(PLANTILLA, salida_original, datos), args.repeticiones)
+        t_compilada = medir('precompilada', lambda: compilada.renderizar(datos, salida_compilada), args.repeticiones)
+
+        print(f"aceleración    {t_original / t_compilada:8.1f}x")
+        print(f"marcadores sin reemplazar: original={marcadores_sin_reemplazar(salida_original)} "
+              f"precompilada={marcadores_sin_reemplazar(salida_compilada)}")
+
+
+if __name__ == '__main__':
+    main()
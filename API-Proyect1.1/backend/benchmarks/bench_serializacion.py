@@ -0,0 +1,102 @@
+"""
+Compara schema.dump() de marshmallow con los esquemas compilados (servicios/serializacion.py)
+sobre listas de objetos en memoria, sin base de datos.
+
+Por cada caso verifica primero que el JSON que produciría Flask-RESTful (json.dumps + salto de
+línea) sea idéntico byte a byte, y después mide dump y dump + json.dumps.
+
+Uso (desde API-Proyect1.1/):
+    python -m backend.benchmarks.bench_serializacion [--filas 10000] [--repeticiones 5]
+"""
+from datetime import date, datetime
+import argparse
+import json
+import os
+import sys
+import time
+
+
+def certificados(n):
+    from backend.modelos import (
+        Categoria, Certificado, DetalleServicio, FichaTecnica, OrdenServicio, TipoServicio, Usuario
+    )
+    usuarios = [
+        Usuario(id=i, nombre=f'usuario_{i}', direccion='Calle 1', telefono='3000000000',
+                contrasena_hash='x' * 60, rol_id=2, categorias=[Categoria(id=i, descripcion='c', usuario_id=i)])
+        for i in range(1, 51)
+    ]
+    resultado = []
+    for i in range(1, n + 1):
+        usuario = usuarios[i % len(usuarios)]
+        detalle = DetalleServicio(id=i, precio=1000, nombre_operario='Operário', cantidad_producto='2L',
+                                  fin_servicio='11:00', orden_servicio_id=i)
+        orden = OrdenServicio(id=i, fecha=date(2024, 1 + i % 12, 1), hora='10:00', precaucion='ninguna',
+                              usuario_id=usuario.id, usuario=usuario, tipo_servicio_id=i,
+                              tipo_servicio=TipoServicio(id=i, descripcion='Fumigación'))
+        resultado.append(Certificado(
+            id=i, fecha=orden.fecha, estado='activo', usuario_id=usuario.id, orden_servicio_id=i,
+            orden_servicio=orden,
+            fichas_tecnicas=[
+                FichaTecnica(id=2 * i + k, producto_aplicado=f'Producto {k}', dosis='1ml', ingrediente_activo='X',
+                             certificado_id=i, detalle_servicio_id=i, detalle_servicio=detalle)
+                for k in range(2)
+            ],
+        ))
+    return resultado
+
+
+def medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--filas', type=int, default=10000)
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ.setdefault('DATABASE_URL', 'sqlite://')
+    from backend.modelos import CertificadoSchema, RolSchema, Rol, TrabajoRender, TrabajoRenderSchema, UsuarioPublicoSchema
+    from backend.servicios.serializacion import compilar
+
+    lista = certificados(args.filas)
+    usuarios = [c.orden_servicio.usuario for c in lista]
+    roles = [Rol(id=i, nombre=f'rol_{i}') for i in range(args.filas)]
+    trabajos = [TrabajoRender(id=i, certificado_id=i, estado='terminado', creado=datetime(2024, 1, 1, 10, 30, i % 60),
+                              actualizado=datetime(2024, 1, 1, 10, 31)) for i in range(args.filas)]
+    casos = [
+        ('certificados (árbol completo)', CertificadoSchema(many=True), lista),
+        ('certificados ?fields=id,fecha,estado', CertificadoSchema(only=('id', 'fecha', 'estado'), many=True), lista),
+        ('certificados ?expand=fichas_tecnicas', CertificadoSchema(only=('id', 'fichas_tecnicas'), many=True), lista),
+        ('usuarios', UsuarioPublicoSchema(many=True), usuarios),
+        ('roles', RolSchema(many=True), roles),
+        ('trabajos de render', TrabajoRenderSchema(many=True), trabajos),
+    ]
+
+    a_json = lambda datos: json.dumps(datos) + '\n'
+    diferentes = 0
+    print(f"{args.filas} filas, mejor de {args.repeticiones}\n")
+    print(f"{'caso':40} {'marshmallow':>12} {'compilado':>12} {'x':>6} {'+json marsh.':>13} {'+json comp.':>12} {'x':>6}")
+    for nombre, schema, objetos in casos:
+        compilado = compilar(schema)
+        if a_json(schema.dump(objetos)) != a_json(compilado.dump(objetos)):
+            diferentes += 1
+            print(f"{nombre:40} DIFERENTE")
+            continue
+        t_marsh = medir(lambda: schema.dump(objetos), args.repeticiones)
+        t_comp = medir(lambda: compilado.dump(objetos), args.repeticiones)
+        tj_marsh = medir(lambda: a_json(schema.dump(objetos)), args.repeticiones)
+        tj_comp = medir(lambda: a_json(compilado.dump(objetos)), args.repeticiones)
+        print(f"{nombre:40} {t_marsh * 1000:>10.1f}ms {t_comp * 1000:>10.1f}ms {t_marsh / t_comp:>5.1f}x "
+              f"{tj_marsh * 1000:>11.1f}ms {tj_comp * 1000:>10.1f}ms {tj_marsh / tj_comp:>5.1f}x")
+
+    sys.exit(1 if diferentes else 0)
+
+
+if __name__ == '__main__':
+    main()
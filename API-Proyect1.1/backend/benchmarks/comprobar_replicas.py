@@ -0,0 +1,79 @@
+"""
+Comprueba el enrutamiento a réplicas con dos archivos SQLite: la réplica es una copia de la
+principal a la que luego no le llegan las escrituras, como una réplica atrasada.
+
+- GET /certificados (@solo_lectura) debe ver solo lo que tiene la réplica.
+- Dentro de una petición de solo lectura que escribe, las lecturas siguientes deben ver la
+  escritura (vuelven a la principal).
+- Una vista sin marcar lee siempre de la principal.
+
+Uso (desde API-Proyect1.1/):
+    python -m backend.benchmarks.comprobar_replicas
+"""
+from datetime import date
+import os
+import shutil
+import sys
+import tempfile
+
+
+def main():
+    directorio = tempfile.mkdtemp()
+    principal = os.path.join(directorio, 'principal.db')
+    replica = os.path.join(directorio, 'replica.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{principal}'
+    os.environ['DATABASE_REPLICAS'] = f'sqlite:///{replica}'
+
+    from flask_restful import Api
+
+    from backend import create_app
+    from backend.modelos import db, Certificado, OrdenServicio, Rol, TipoServicio, Usuario
+    from backend.vistas.vista_certificado import VistaCertificados
+
+    app = create_app()
+    Api(app).add_resource(VistaCertificados, '/certificados')
+
+    def certificado(usuario, orden):
+        return Certificado(fecha=date(2024, 1, 1), estado='activo', usuario=usuario, orden_servicio=orden)
+
+    with app.app_context():
+        db.create_all(bind=None)
+        usuario = Usuario(nombre='replica', contrasena_hash='x', rol=Rol(nombre='Admin'))
+        orden = OrdenServicio(fecha=date(2024, 1, 1), usuario=usuario, tipo_servicio=TipoServicio(descripcion='x'))
+        db.session.add(certificado(usuario, orden))
+        db.session.commit()
+        db.engine.dispose()
+        shutil.copyfile(principal, replica)
+        # Esta escritura no llega a la réplica
+        db.session.add(certificado(usuario, orden))
+        db.session.commit()
+        usuario_id, orden_id = usuario.id, orden.id
+
+    fallas = 0
+
+    def comprobar(descripcion, obtenido, esperado):
+        nonlocal fallas
+        ok = obtenido == esperado
+        fallas += not ok
+        print(f"[{'ok' if ok else 'FALLA'}] {descripcion}: {obtenido} (esperado {esperado})")
+
+    respuesta = app.test_client().get('/certificados')
+    comprobar('GET /certificados lee de la réplica', len(respuesta.get_json()['certificados']), 1)
+
+    with app.test_request_context():
+        db.session.info['solo_lectura'] = True
+        comprobar('lectura marcada, antes de escribir', Certificado.query.count(), 1)
+        db.session.add(Certificado(fecha=date(2024, 1, 2), estado='activo', usuario_id=usuario_id, orden_servicio_id=orden_id))
+        db.session.flush()
+        comprobar('lectura marcada, después de escribir (lee lo propio)', Certificado.query.count(), 3)
+        db.session.rollback()
+
+    with app.test_request_context():
+        comprobar('vista sin marcar lee de la principal', Certificado.query.count(), 2)
+
+    shutil.rmtree(directorio, ignore_errors=True)
+    sys.exit(1 if fallas else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Comandos de consola para preparar la base de datos. Antes esto corría al importar app.py,
+en cada worker; ahora se ejecuta una vez, al desplegar:
+
+    FLASK_APP=backend.app flask crear-tablas
+    FLASK_APP=backend.app flask crear-superusuario
+
+Los dos se pueden repetir sin efecto. En una base gestionada con migraciones use
+`flask db upgrade` en lugar de crear-tablas. `flask reindexar-busqueda` reconstruye el
+índice de búsqueda de certificados y `flask reconstruir-reportes` los resúmenes de /reportes
+(después de crearlos o de cargar datos por fuera de la API).
+"""
+import os
+
+import click
+
+from .modelos import db, crear_superusuario
+from .servicios import busqueda, reportes
+from .servicios.catalogo_roles import catalogo_roles
+
+
+def registrar_comandos(app):
+    @app.cli.command('crear-tablas')
+    def crear_tablas():
+        """Crea las tablas que falten (las existentes no se tocan)."""
+        db.create_all()
+        # La tabla de búsqueda (FULLTEXT / FTS5) no es un modelo: create_all no la conoce
+        try:
+            with db.engine.begin() as conexion:
+                busqueda.crear_indice(conexion)
+        except busqueda.BusquedaNoDisponible as e:
+            click.echo(str(e))
+        click.echo('Tablas creadas o ya existentes')
+
+    @app.cli.command('crear-superusuario')
+    @click.option('--nombre', default='superAdministrador', show_default=True)
+    @click.option('--contrasena', default=lambda: os.environ.get('SUPERUSUARIO_CONTRASENA', 'cmc123456'),
+                  help='Por defecto SUPERUSUARIO_CONTRASENA o la contraseña inicial de siempre')
+    def comando_crear_superusuario(nombre, contrasena):
+        """Crea el rol Admin y el superusuario si no existen."""
+        rol_creado, usuario_creado = crear_superusuario(nombre, contrasena)
+        if rol_creado:
+            click.echo('Rol Admin creado')
+            catalogo_roles.refrescar()
+        click.echo('SuperUsuario creado' if usuario_creado else 'SuperUsuario ya existe')
+
+    @app.cli.command('reindexar-busqueda')
+    @click.option('--lote', default=1000, show_default=True)
+    def reindexar_busqueda(lote):
+        """Reescribe el índice de búsqueda de todos los certificados."""
+        with db.engine.begin() as conexion:
+            total = busqueda.reindexar_todo(conexion, lote)
+        click.echo(f'{total} certificados indexados')
+
+    @app.cli.command('reconstruir-reportes')
+    @click.option('--lote', default=1000, show_default=True)
+    def reconstruir_reportes(lote):
+        """Recalcula desde cero las tablas de resumen de los reportes."""
+        with db.engine.begin() as conexion:
+            total = reportes.reconstruir(conexion, lote)
+        click.echo(f'Reportes recalculados con {total} certificados')
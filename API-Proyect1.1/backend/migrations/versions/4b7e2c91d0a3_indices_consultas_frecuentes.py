@@ -0,0 +1,84 @@
+"""indices para las consultas frecuentes
+
+Índices para el login (usuario.nombre), las claves foráneas que recorren los listados,
+la exportación y el borrado de certificados, y los filtros por fecha/estado/usuario.
+
+Las tablas se crearon con db.create_all(), así que esta es la primera migración: solo
+agrega los índices que falten (una base nueva creada con create_all ya los trae).
+En MySQL las FK ya tenían un índice implícito; InnoDB lo descarta solo al crear estos.
+
+Revision ID: 4b7e2c91d0a3
+Revises:
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4b7e2c91d0a3'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+# (nombre, tabla, columnas, único)
+INDICES = [
+    ('ix_usuario_nombre', 'usuario', ['nombre'], True),
+    ('ix_orden_servicio_usuario_id', 'orden_servicio', ['usuario_id'], False),
+    ('ix_detalle_servicio_orden_servicio_id', 'detalle_servicio', ['orden_servicio_id'], False),
+    ('ix_certificado_fecha', 'certificado', ['fecha'], False),
+    ('ix_certificado_orden_servicio_id', 'certificado', ['orden_servicio_id'], False),
+    ('ix_certificado_usuario_id_fecha', 'certificado', ['usuario_id', 'fecha'], False),
+    ('ix_certificado_estado_fecha', 'certificado', ['estado', 'fecha'], False),
+    ('ix_ficha_tecnica_certificado_id', 'ficha_tecnica', ['certificado_id'], False),
+]
+
+
+def _existentes(inspector, tabla):
+    return {indice['name'] for indice in inspector.get_indexes(tabla)}
+
+
+def _nombres_repetidos(conexion):
+    return conexion.execute(sa.text(
+        'SELECT nombre FROM usuario WHERE nombre IS NOT NULL GROUP BY nombre HAVING COUNT(*) > 1'
+    )).scalars().all()
+
+
+def upgrade():
+    conexion = op.get_bind()
+    inspector = sa.inspect(conexion)
+
+    for nombre, tabla, columnas, unico in INDICES:
+        if nombre in _existentes(inspector, tabla):
+            continue
+        if unico and tabla == 'usuario':
+            repetidos = _nombres_repetidos(conexion)
+            if repetidos:
+                # No se puede exigir unicidad sin decidir qué hacer con esas cuentas;
+                # el índice igual acelera el login y la unicidad queda pendiente.
+                logger.warning(
+                    "Hay nombres de usuario repetidos (%s): se crea %s sin UNIQUE",
+                    ', '.join(repetidos), nombre
+                )
+                unico = False
+        op.create_index(nombre, tabla, columnas, unique=unico)
+
+
+def downgrade():
+    conexion = op.get_bind()
+    inspector = sa.inspect(conexion)
+    for nombre, tabla, columnas, _ in reversed(INDICES):
+        if nombre not in _existentes(inspector, tabla):
+            continue
+        if conexion.dialect.name == 'mysql' and any(
+            fk['constrained_columns'][0] == columnas[0] for fk in inspector.get_foreign_keys(tabla)
+        ):
+            # InnoDB no deja borrar el único índice que respalda una FK
+            logger.warning("Se conserva %s: lo usa una clave foránea de %s", nombre, tabla)
+            continue
+        op.drop_index(nombre, table_name=tabla)
@@ -0,0 +1,53 @@
+"""tabla de claves de idempotencia
+
+clave_idempotencia guarda la respuesta de los POST de certificados hechos con la cabecera
+Idempotency-Key (servicios/idempotencia.py); el índice sobre expira es para borrar las vencidas.
+
+Revision ID: 7f3b9d2e6a41
+Revises: e2f94b7a1c58
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7f3b9d2e6a41'
+down_revision = 'e2f94b7a1c58'
+branch_labels = None
+depends_on = None
+
+# (nombre, tabla, columnas, único)
+INDICES = [
+    ('ix_clave_idempotencia_expira', 'clave_idempotencia', ['expira'], False),
+]
+
+
+def _existentes(inspector, tabla):
+    return {indice['name'] for indice in inspector.get_indexes(tabla)}
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'clave_idempotencia' not in inspector.get_table_names():
+        op.create_table(
+            'clave_idempotencia',
+            sa.Column('id', sa.String(length=64), nullable=False),
+            sa.Column('huella', sa.String(length=64), nullable=False),
+            sa.Column('estado', sa.String(length=20), nullable=False),
+            sa.Column('codigo', sa.Integer(), nullable=True),
+            sa.Column('respuesta', sa.Text(), nullable=True),
+            sa.Column('creada', sa.DateTime(), nullable=False),
+            sa.Column('expira', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+        )
+    for nombre, tabla, columnas, unico in INDICES:
+        if nombre not in _existentes(inspector, tabla):
+            op.create_index(nombre, tabla, columnas, unique=unico)
+
+
+def downgrade():
+    for nombre, tabla, _, _ in reversed(INDICES):
+        op.drop_index(nombre, table_name=tabla)
+    op.drop_table('clave_idempotencia')
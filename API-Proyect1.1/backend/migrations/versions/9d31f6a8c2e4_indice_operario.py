@@ -0,0 +1,44 @@
+"""indice para filtrar certificados por operario
+
+GET /certificados?operario= busca las órdenes de servicio con detalles de ese operario;
+con (nombre_operario, orden_servicio_id) la subconsulta se resuelve solo con el índice.
+
+Revision ID: 9d31f6a8c2e4
+Revises: 4b7e2c91d0a3
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d31f6a8c2e4'
+down_revision = '4b7e2c91d0a3'
+branch_labels = None
+depends_on = None
+
+# (nombre, tabla, columnas, único)
+INDICES = [
+    ('ix_detalle_servicio_nombre_operario', 'detalle_servicio', ['nombre_operario', 'orden_servicio_id'], False),
+]
+
+
+def _existentes(inspector, tabla):
+    return {indice['name'] for indice in inspector.get_indexes(tabla)}
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tablas = set(inspector.get_table_names())
+    for nombre, tabla, columnas, unico in INDICES:
+        if tabla in tablas and nombre not in _existentes(inspector, tabla):
+            op.create_index(nombre, tabla, columnas, unique=unico)
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+    tablas = set(inspector.get_table_names())
+    for nombre, tabla, _, _ in reversed(INDICES):
+        if tabla in tablas and nombre in _existentes(inspector, tabla):
+            op.drop_index(nombre, table_name=tabla)
@@ -0,0 +1,56 @@
+"""tabla de trabajos de renderizado
+
+trabajo_render guarda el estado de la generación de cada documento en segundo plano
+(servicios/renderizado.py); POST /certificados y /certificados/lote encolan un trabajo al
+crear cada certificado. Una base creada con db.create_all() ya la tiene: solo se agrega
+el índice si falta.
+
+Revision ID: a3d8f1c6b925
+Revises: 7f3b9d2e6a41
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3d8f1c6b925'
+down_revision = '7f3b9d2e6a41'
+branch_labels = None
+depends_on = None
+
+# (nombre, tabla, columnas, único)
+INDICES = [
+    ('ix_trabajo_render_certificado_id', 'trabajo_render', ['certificado_id'], False),
+]
+
+
+def _existentes(inspector, tabla):
+    return {indice['name'] for indice in inspector.get_indexes(tabla)}
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'trabajo_render' not in inspector.get_table_names():
+        op.create_table(
+            'trabajo_render',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('certificado_id', sa.Integer(), nullable=False),
+            sa.Column('estado', sa.String(length=20), nullable=False),
+            sa.Column('datos', sa.Text(), nullable=True),
+            sa.Column('error', sa.Text(), nullable=True),
+            sa.Column('creado', sa.DateTime(), nullable=True),
+            sa.Column('actualizado', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['certificado_id'], ['certificado.id']),
+            sa.PrimaryKeyConstraint('id'),
+        )
+    for nombre, tabla, columnas, unico in INDICES:
+        if nombre not in _existentes(inspector, tabla):
+            op.create_index(nombre, tabla, columnas, unique=unico)
+
+
+def downgrade():
+    for nombre, tabla, _, _ in reversed(INDICES):
+        op.drop_index(nombre, table_name=tabla)
+    op.drop_table('trabajo_render')
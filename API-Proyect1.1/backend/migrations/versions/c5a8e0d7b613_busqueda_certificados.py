@@ -0,0 +1,40 @@
+"""tabla de busqueda de texto completo de certificados
+
+busqueda_certificado: una fila por certificado con el texto de sus fichas técnicas,
+detalles y orden de servicio. En MySQL con índice FULLTEXT, en SQLite como tabla FTS5.
+Después de migrar, `flask reindexar-busqueda` la rellena con los certificados existentes.
+
+Revision ID: c5a8e0d7b613
+Revises: 9d31f6a8c2e4
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5a8e0d7b613'
+down_revision = '9d31f6a8c2e4'
+branch_labels = None
+depends_on = None
+
+DDL = {
+    'mysql': (
+        'CREATE TABLE IF NOT EXISTS busqueda_certificado ('
+        ' certificado_id INTEGER NOT NULL PRIMARY KEY,'
+        ' texto TEXT,'
+        ' FULLTEXT INDEX ft_busqueda_certificado_texto (texto)'
+        ') ENGINE=InnoDB DEFAULT CHARSET=utf8mb4'
+    ),
+    'sqlite': 'CREATE VIRTUAL TABLE IF NOT EXISTS busqueda_certificado USING fts5(texto)',
+}
+
+
+def upgrade():
+    dialecto = op.get_bind().dialect.name
+    if dialecto in DDL:
+        op.execute(DDL[dialecto])
+
+
+def downgrade():
+    op.execute('DROP TABLE IF EXISTS busqueda_certificado')
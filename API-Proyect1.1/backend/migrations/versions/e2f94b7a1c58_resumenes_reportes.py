@@ -0,0 +1,47 @@
+"""tablas de resumen para los reportes
+
+resumen_mensual, resumen_operario y resumen_tipo_servicio: cantidades e ingresos por mes,
+mantenidos en la misma transacción que los certificados (servicios/reportes.py).
+Después de migrar, `flask reconstruir-reportes` los calcula con los certificados existentes.
+
+Revision ID: e2f94b7a1c58
+Revises: c5a8e0d7b613
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2f94b7a1c58'
+down_revision = 'c5a8e0d7b613'
+branch_labels = None
+depends_on = None
+
+# (tabla, columna de la clave junto al mes, su longitud, columna con la cantidad)
+RESUMENES = [
+    ('resumen_mensual', 'estado', 45, 'certificados'),
+    ('resumen_operario', 'nombre_operario', 100, 'trabajos'),
+    ('resumen_tipo_servicio', 'descripcion', 45, 'trabajos'),
+]
+
+
+def upgrade():
+    tablas = set(sa.inspect(op.get_bind()).get_table_names())
+    for tabla, clave, longitud, cantidad in RESUMENES:
+        if tabla in tablas:
+            continue
+        op.create_table(
+            tabla,
+            sa.Column('mes', sa.Date(), nullable=False),
+            sa.Column(clave, sa.String(length=longitud), nullable=False),
+            sa.Column(cantidad, sa.Integer(), nullable=False),
+            sa.Column('ingresos', sa.BigInteger(), nullable=False),
+            sa.PrimaryKeyConstraint('mes', clave),
+        )
+
+
+def downgrade():
+    for tabla, _, _, _ in reversed(RESUMENES):
+        op.drop_table(tabla)
@@ -1 +1,2 @@
-from .modelos import *
\ No newline at end of file
+from .modelos import *
+from .sesion import solo_lectura, en_primaria
\ No newline at end of file
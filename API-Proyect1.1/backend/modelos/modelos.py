@@ -1,9 +1,12 @@
-from werkzeug.security import generate_password_hash, check_password_hash
 from marshmallow_sqlalchemy import SQLAlchemyAutoSchema
-from flask_sqlalchemy import SQLAlchemy
 from marshmallow import fields
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime
 
-db = SQLAlchemy()
+from ..servicios.contrasenas import politica_contrasenas
+from .sesion import SQLAlchemyEnrutado
+
+db = SQLAlchemyEnrutado()
 
 detalle_servicio_has_orden_servicio = db.Table(
     'detalle_servicio_has_orden_servicio',
@@ -23,7 +26,7 @@ class Rol(db.Model):
 class Usuario(db.Model):
     __tablename__ = 'usuario'
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    nombre = db.Column(db.String(45))
+    nombre = db.Column(db.String(45), unique=True, index=True)  # clave del login
     direccion = db.Column(db.String(45))
     telefono = db.Column(db.String(15))
     contrasena_hash = db.Column(db.String(255))
@@ -37,10 +40,14 @@ class Usuario(db.Model):
 
     @contrasena.setter
     def contrasena(self, password):
-        self.contrasena_hash = generate_password_hash(password)
+        self.contrasena_hash = politica_contrasenas.generar(password)
 
     def verificar_contrasena(self, password):
-        return check_password_hash(self.contrasena_hash, password)
+        """Verifica la contraseña y, si es correcta, actualiza un hash de una política anterior."""
+        valida, hash_nuevo = politica_contrasenas.verificar(self.contrasena_hash, password)
+        if hash_nuevo:
+            self.contrasena_hash = hash_nuevo
+        return valida
 
     def __repr__(self):
         return f'<Usuario {self.nombre}>'
@@ -63,7 +70,7 @@ class OrdenServicio(db.Model):
     fecha = db.Column(db.Date)
     hora = db.Column(db.String(45))
     precaucion = db.Column(db.String(255))
-    usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'))
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), index=True)
 
     tipo_servicio_id = db.Column(db.Integer, db.ForeignKey('tipo_servicio.id'), nullable=False)  
 
@@ -89,13 +96,17 @@ class TipoServicio(db.Model):
 
 class DetalleServicio(db.Model):
     __tablename__ = 'detalle_servicio'
+    # Filtro ?operario= de GET /certificados: del nombre a las órdenes sin leer la tabla
+    __table_args__ = (
+        db.Index('ix_detalle_servicio_nombre_operario', 'nombre_operario', 'orden_servicio_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     precio = db.Column(db.Integer)
     nombre_operario = db.Column(db.String(100))
     cantidad_producto = db.Column(db.String(100))
     fin_servicio = db.Column(db.String(50))
 
-    orden_servicio_id = db.Column(db.Integer, db.ForeignKey('orden_servicio.id'), nullable=False)
+    orden_servicio_id = db.Column(db.Integer, db.ForeignKey('orden_servicio.id'), nullable=False, index=True)
     orden_servicio = db.relationship('OrdenServicio', backref='detalles_servicio', lazy=True)
     fichas_tecnicas = db.relationship('FichaTecnica', backref='detalle_servicio', lazy=True)
 
@@ -105,11 +116,16 @@ class DetalleServicio(db.Model):
 
 class Certificado(db.Model):
     __tablename__ = 'certificado'
+    # usuario_id no lleva índice propio: lo cubre el prefijo de ix_certificado_usuario_id_fecha
+    __table_args__ = (
+        db.Index('ix_certificado_usuario_id_fecha', 'usuario_id', 'fecha'),
+        db.Index('ix_certificado_estado_fecha', 'estado', 'fecha'),
+    )
     id = db.Column(db.Integer, primary_key=True)
-    fecha = db.Column(db.Date)
+    fecha = db.Column(db.Date, index=True)
     estado = db.Column(db.String(45))
     usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=False)
-    orden_servicio_id = db.Column(db.Integer, db.ForeignKey('orden_servicio.id'), nullable=False)
+    orden_servicio_id = db.Column(db.Integer, db.ForeignKey('orden_servicio.id'), nullable=False, index=True)
 
     fichas_tecnicas = db.relationship('FichaTecnica', backref='certificado', lazy=True)
     usuario = db.relationship('Usuario', backref='certificados', lazy=True)
@@ -125,12 +141,76 @@ class FichaTecnica(db.Model):
     dosis = db.Column(db.String(45))
     ingrediente_activo = db.Column(db.String(45))
 
-    certificado_id = db.Column(db.Integer, db.ForeignKey('certificado.id'), nullable=False)
+    certificado_id = db.Column(db.Integer, db.ForeignKey('certificado.id'), nullable=False, index=True)
     detalle_servicio_id = db.Column(db.Integer, db.ForeignKey('detalle_servicio.id'))
 
     def __repr__(self):
         return f'<FichaTecnica {self.id}: {self.producto_aplicado}>'
 
+class TrabajoRender(db.Model):
+    __tablename__ = 'trabajo_render'
+    id = db.Column(db.Integer, primary_key=True)
+    certificado_id = db.Column(db.Integer, db.ForeignKey('certificado.id'), nullable=False, index=True)
+    estado = db.Column(db.String(20), nullable=False, default='pendiente')  # pendiente, procesando, terminado, fallido
+    datos = db.Column(db.Text)  # JSON con los valores de la plantilla
+    error = db.Column(db.Text)
+    creado = db.Column(db.DateTime, default=datetime.utcnow)
+    actualizado = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    certificado = db.relationship('Certificado', lazy=True)
+
+    def __repr__(self):
+        return f'<TrabajoRender {self.id}: {self.estado}>'
+
+class ClaveIdempotencia(db.Model):
+    """Respuesta guardada de un POST con Idempotency-Key (servicios/idempotencia.py)."""
+    __tablename__ = 'clave_idempotencia'
+    id = db.Column(db.String(64), primary_key=True)  # sha256 de método, ruta y clave
+    huella = db.Column(db.String(64), nullable=False)  # sha256 del cuerpo de la petición
+    estado = db.Column(db.String(20), nullable=False)  # en_curso, terminada
+    codigo = db.Column(db.Integer)
+    respuesta = db.Column(db.Text)  # JSON
+    creada = db.Column(db.DateTime, nullable=False)
+    expira = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f'<ClaveIdempotencia {self.id[:12]}: {self.estado}>'
+
+# ----------------- Resúmenes para reportes -----------------
+# Se actualizan en la misma transacción que los certificados (servicios/reportes.py);
+# `flask reconstruir-reportes` los recalcula desde cero. mes es el primer día del mes.
+
+class ResumenMensual(db.Model):
+    __tablename__ = 'resumen_mensual'
+    mes = db.Column(db.Date, primary_key=True)
+    estado = db.Column(db.String(45), primary_key=True)
+    certificados = db.Column(db.Integer, nullable=False, default=0)
+    ingresos = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<ResumenMensual {self.mes} {self.estado}>'
+
+class ResumenOperario(db.Model):
+    __tablename__ = 'resumen_operario'
+    mes = db.Column(db.Date, primary_key=True)
+    nombre_operario = db.Column(db.String(100), primary_key=True)
+    trabajos = db.Column(db.Integer, nullable=False, default=0)
+    ingresos = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<ResumenOperario {self.mes} {self.nombre_operario}>'
+
+class ResumenTipoServicio(db.Model):
+    __tablename__ = 'resumen_tipo_servicio'
+    # Por descripción: cada orden de servicio crea su propio TipoServicio
+    mes = db.Column(db.Date, primary_key=True)
+    descripcion = db.Column(db.String(45), primary_key=True)
+    trabajos = db.Column(db.Integer, nullable=False, default=0)
+    ingresos = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<ResumenTipoServicio {self.mes} {self.descripcion}>'
+
 # ----------------- Esquemas de serialización -----------------
 
 class CategoriaSchema(SQLAlchemyAutoSchema):
@@ -167,6 +247,12 @@ class UsuarioSchema(SQLAlchemyAutoSchema):
         include_fk = True
         load_instance = True
 
+class UsuarioPublicoSchema(UsuarioSchema):
+    """Usuario sin contraseña ni categorías, con las claves siempre en este orden (listados)."""
+    class Meta(UsuarioSchema.Meta):
+        fields = ('id', 'nombre', 'direccion', 'telefono', 'rol_id')
+        ordered = True
+
 class OrdenServicioSchema(SQLAlchemyAutoSchema):
     tipos_servicio = fields.Nested(TipoServicioSchema, many=True)
     usuario = fields.Nested(UsuarioSchema)
@@ -185,6 +271,13 @@ class CertificadoSchema(SQLAlchemyAutoSchema):
         include_fk = True
         load_instance = True
 
+class TrabajoRenderSchema(SQLAlchemyAutoSchema):
+    class Meta:
+        model = TrabajoRender
+        include_fk = True
+        load_instance = True
+        exclude = ('datos',)
+
 class RolSchema(SQLAlchemyAutoSchema):
     class Meta:
         model = Rol
@@ -193,25 +286,33 @@ class RolSchema(SQLAlchemyAutoSchema):
 
 # ----------------- Crear superusuario -----------------
 
-def crear_superusuario():
+def crear_superusuario(nombre="superAdministrador", contrasena="cmc123456"):
+    """
+    Crea el rol Admin y el superusuario si no existen; se puede correr cuantas veces se quiera.
+    Si otro proceso crea el mismo usuario a la vez, el índice único de usuario.nombre rechaza
+    el segundo INSERT y se toma como ya existente. Devuelve (rol_creado, usuario_creado).
+    """
+    rol_creado = usuario_creado = False
     superuser_role = Rol.query.filter_by(nombre="Admin").first()
     if not superuser_role:
         superuser_role = Rol(nombre="Admin")
         db.session.add(superuser_role)
         db.session.commit()
-        print("Rol Admin creado")
+        rol_creado = True
 
-    if not Usuario.query.filter_by(nombre="superAdministrador").first():
+    if not Usuario.query.filter_by(nombre=nombre).first():
         superuser = Usuario(
-            nombre="superAdministrador",
+            nombre=nombre,
             direccion="sena complejo sur",
             telefono="123456789",
-            contrasena="cmc123456",
+            contrasena=contrasena,
             rol_id=superuser_role.id
         )
         db.session.add(superuser)
-        db.session.commit()
-        print("SuperUsuario creado")
-    else:
-        print("SuperUsuario ya existe")
+        try:
+            db.session.commit()
+            usuario_creado = True
+        except IntegrityError:
+            db.session.rollback()
+    return rol_creado, usuario_creado
 
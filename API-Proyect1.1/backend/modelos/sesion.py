@@ -0,0 +1,84 @@
+"""
+Sesión con réplicas de lectura.
+
+Las vistas marcadas con @solo_lectura leen de una de las réplicas configuradas en
+REPLICAS (claves de SQLALCHEMY_BINDS); todo lo demás va a la base principal. Dentro de una
+misma petición se leen las propias escrituras: en cuanto la sesión escribe algo (flush o
+UPDATE/DELETE masivo) el resto de la petición vuelve a la principal. Se elige una réplica
+por petición para que todas sus lecturas vean el mismo estado.
+"""
+from contextlib import contextmanager
+from functools import wraps
+import random
+
+from flask_sqlalchemy import SQLAlchemy, SignallingSession, get_state
+from sqlalchemy import event, orm
+from sqlalchemy.sql.dml import UpdateBase
+
+
+class SesionEnrutada(SignallingSession):
+    def get_bind(self, mapper=None, clause=None):
+        if isinstance(clause, UpdateBase):
+            self.info['escribio'] = True
+        replica = self._replica()
+        if replica is not None:
+            return replica
+        return super().get_bind(mapper, clause)
+
+    def _replica(self):
+        if (not self.info.get('solo_lectura') or self.info.get('escribio')
+                or self.info.get('primaria') or self._flushing):
+            return None
+        replicas = self.app.config.get('REPLICAS')
+        if not replicas:
+            return None
+        clave = self.info.get('replica')
+        if clave is None:
+            clave = self.info['replica'] = random.choice(replicas)
+        return get_state(self.app).db.get_engine(self.app, bind=clave)
+
+
+@event.listens_for(SesionEnrutada, 'after_flush')
+def _marcar_escritura(sesion, contexto):
+    sesion.info['escribio'] = True
+
+
+class SQLAlchemyEnrutado(SQLAlchemy):
+    def create_session(self, options):
+        return orm.sessionmaker(class_=SesionEnrutada, db=self, **options)
+
+    def create_engine(self, sa_url, engine_opts):
+        # SQLALCHEMY_ENGINE_OPTIONS vale para todos los binds, pero los pools que usa SQLite
+        # no aceptan tamaño ni desborde
+        if sa_url.drivername.startswith('sqlite'):
+            engine_opts = {k: v for k, v in engine_opts.items()
+                           if k not in ('pool_size', 'max_overflow', 'pool_timeout')}
+        return super().create_engine(sa_url, engine_opts)
+
+
+def solo_lectura(funcion):
+    """Marca una vista (o método de Resource) como de solo lectura: puede leer de una réplica."""
+    @wraps(funcion)
+    def envoltura(*args, **kwargs):
+        from . import db
+
+        db.session.info['solo_lectura'] = True
+        return funcion(*args, **kwargs)
+    return envoltura
+
+
+@contextmanager
+def en_primaria():
+    """
+    Fuerza lecturas en la principal aunque la vista sea de solo lectura; para lo que se
+    guarda en cachés del proceso, donde el retraso de una réplica duraría todo el TTL.
+    """
+    from . import db
+
+    info = db.session.info
+    anterior = info.get('primaria')
+    info['primaria'] = True
+    try:
+        yield
+    finally:
+        info['primaria'] = anterior
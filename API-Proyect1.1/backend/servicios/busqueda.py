@@ -0,0 +1,243 @@
+"""
+Búsqueda de texto completo sobre los certificados.
+
+La tabla busqueda_certificado guarda, por certificado, el texto buscable: producto aplicado,
+ingrediente activo y dosis de sus fichas técnicas, nombre del operario de los detalles de su
+orden de servicio y la precaución de la orden. En MySQL es una tabla InnoDB con índice
+FULLTEXT; en SQLite (desarrollo y pruebas) una tabla virtual FTS5 cuyo rowid es el id del
+certificado. La crea la migración o `flask crear-tablas`; `flask reindexar-busqueda` la
+rellena con los datos existentes.
+
+El índice se mantiene solo: la sesión anota qué certificados, fichas, detalles u órdenes se
+crearon, modificaron o borraron, y justo antes del commit se reescriben las filas afectadas
+en la misma transacción (una consulta para leer los textos y una para escribirlos).
+"""
+import logging
+import re
+
+from sqlalchemy import bindparam, event, inspect, null, or_, select, text, union_all
+
+from ..modelos import db, Certificado, DetalleServicio, FichaTecnica, OrdenServicio
+from ..modelos.sesion import SesionEnrutada
+
+logger = logging.getLogger(__name__)
+
+TABLA = 'busqueda_certificado'
+
+DDL = {
+    'mysql': (
+        f'CREATE TABLE IF NOT EXISTS {TABLA} ('
+        ' certificado_id INTEGER NOT NULL PRIMARY KEY,'
+        ' texto TEXT,'
+        f' FULLTEXT INDEX ft_{TABLA}_texto (texto)'
+        ') ENGINE=InnoDB DEFAULT CHARSET=utf8mb4'
+    ),
+    'sqlite': f'CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA} USING fts5(texto)',
+}
+# Columna con el id del certificado en cada motor
+COLUMNA_ID = {'mysql': 'certificado_id', 'sqlite': 'rowid'}
+
+ESCRIBIR = {
+    'mysql': text(
+        f'INSERT INTO {TABLA} (certificado_id, texto) VALUES (:id, :texto) '
+        'ON DUPLICATE KEY UPDATE texto = VALUES(texto)'
+    ),
+    'sqlite': text(f'INSERT OR REPLACE INTO {TABLA} (rowid, texto) VALUES (:id, :texto)'),
+}
+
+BUSCAR = {
+    'mysql': text(
+        f'SELECT certificado_id AS id, MATCH (texto) AGAINST (:consulta IN BOOLEAN MODE) AS puntaje '
+        f'FROM {TABLA} WHERE MATCH (texto) AGAINST (:consulta IN BOOLEAN MODE) '
+        'ORDER BY puntaje DESC, certificado_id LIMIT :limite OFFSET :desde'
+    ),
+    # bm25() es menor cuanto más relevante
+    'sqlite': text(
+        f'SELECT rowid AS id, -bm25({TABLA}) AS puntaje FROM {TABLA} WHERE {TABLA} MATCH :consulta '
+        'ORDER BY puntaje DESC, rowid LIMIT :limite OFFSET :desde'
+    ),
+}
+
+# Claves de session.info con lo que falta reindexar
+PENDIENTES = 'busqueda_certificados'
+ORDENES_PENDIENTES = 'busqueda_ordenes'
+
+# Motor -> ¿existe la tabla? (se pregunta una vez por motor)
+_disponible = {}
+
+
+class BusquedaNoDisponible(Exception):
+    """El motor no soporta la búsqueda o la tabla no está creada."""
+
+
+def _dialecto(conexion):
+    return conexion.dialect.name
+
+
+def crear_indice(conexion):
+    dialecto = _dialecto(conexion)
+    if dialecto not in DDL:
+        raise BusquedaNoDisponible(f'Búsqueda de texto no soportada en {dialecto}')
+    conexion.execute(text(DDL[dialecto]))
+    _disponible.pop(conexion.engine, None)
+
+
+def indice_disponible(conexion):
+    motor = conexion.engine
+    if motor not in _disponible:
+        _disponible[motor] = _dialecto(conexion) in DDL and inspect(conexion).has_table(TABLA)
+        if not _disponible[motor]:
+            logger.warning("No existe la tabla %s: la búsqueda de certificados no se actualiza", TABLA)
+    return _disponible[motor]
+
+
+def terminos(consulta):
+    """Palabras de la consulta (sin operadores), para armar la expresión de cada motor."""
+    return re.findall(r'\w+', consulta or '')
+
+
+def _expresion(dialecto, palabras):
+    # Todas las palabras, cada una como prefijo: 'cipermet pedro' encuentra 'Cipermetrina ... Pedro'
+    if dialecto == 'mysql':
+        return ' '.join(f'+{p}*' for p in palabras)
+    return ' AND '.join(f'"{p}"*' for p in palabras)
+
+
+def buscar(consulta, limite, desde=0):
+    """
+    Ids de certificados que contienen todas las palabras de ``consulta``, del más relevante
+    al menos relevante. Devuelve [(id, puntaje)] con hasta ``limite`` elementos.
+    """
+    conexion = db.session.connection(bind_arguments={'mapper': Certificado.__mapper__})
+    dialecto = _dialecto(conexion)
+    if dialecto not in BUSCAR or not indice_disponible(conexion):
+        raise BusquedaNoDisponible('La búsqueda de texto no está disponible en esta base de datos')
+    palabras = terminos(consulta)
+    if not palabras:
+        return []
+    filas = conexion.execute(BUSCAR[dialecto], {
+        'consulta': _expresion(dialecto, palabras), 'limite': limite, 'desde': desde
+    })
+    return [(fila.id, float(fila.puntaje)) for fila in filas]
+
+
+def _textos(conexion, certificados, ordenes):
+    """{certificado_id: texto} para los certificados dados y los de las órdenes dadas."""
+    objetivo = select(Certificado.id, Certificado.orden_servicio_id).where(or_(
+        Certificado.id.in_(bindparam('certificados', expanding=True)),
+        Certificado.orden_servicio_id.in_(bindparam('ordenes', expanding=True)),
+    )).subquery()
+    fragmentos = union_all(
+        select(objetivo.c.id, OrdenServicio.precaucion, null(), null())
+        .join(OrdenServicio, OrdenServicio.id == objetivo.c.orden_servicio_id),
+        select(objetivo.c.id, DetalleServicio.nombre_operario, null(), null())
+        .join(DetalleServicio, DetalleServicio.orden_servicio_id == objetivo.c.orden_servicio_id),
+        select(objetivo.c.id, FichaTecnica.producto_aplicado, FichaTecnica.ingrediente_activo, FichaTecnica.dosis)
+        .join(FichaTecnica, FichaTecnica.certificado_id == objetivo.c.id),
+    )
+    textos = {}
+    filas = conexion.execute(fragmentos, {'certificados': list(certificados) or [-1], 'ordenes': list(ordenes) or [-1]})
+    for certificado_id, *partes in filas:
+        palabras = textos.setdefault(certificado_id, [])
+        palabras.extend(p for p in partes if p and p not in palabras)
+    return {certificado_id: ' '.join(partes) for certificado_id, partes in textos.items()}
+
+
+def reindexar(conexion, certificados=(), ordenes=()):
+    """Reescribe las filas de búsqueda de esos certificados (y de los de esas órdenes)."""
+    dialecto = _dialecto(conexion)
+    certificados = set(certificados)
+    textos = _textos(conexion, certificados, ordenes)
+    if textos:
+        conexion.execute(ESCRIBIR[dialecto], [{'id': i, 'texto': t} for i, t in textos.items()])
+    # Los que ya no existen: todo certificado existente sale al menos en la fila de su orden
+    borrados = certificados - set(textos)
+    if borrados:
+        conexion.execute(
+            text(f'DELETE FROM {TABLA} WHERE {COLUMNA_ID[dialecto]} IN :ids')
+            .bindparams(bindparam('ids', expanding=True)),
+            {'ids': list(borrados)}
+        )
+    return len(textos)
+
+
+def reindexar_todo(conexion, lote=1000):
+    """Reconstruye el índice completo, por lotes de ids. Devuelve cuántos certificados indexó."""
+    total = 0
+    ultimo = 0
+    while True:
+        ids = conexion.execute(
+            select(Certificado.id).where(Certificado.id > ultimo).order_by(Certificado.id).limit(lote)
+        ).scalars().all()
+        if not ids:
+            return total
+        total += reindexar(conexion, ids)
+        ultimo = ids[-1]
+
+
+# --- mantenimiento automático desde la sesión ---
+
+# Modelo -> (columnas con texto indexado, clave que dice a qué certificado u orden pertenece)
+INDEXADOS = {
+    Certificado: ((), 'orden_servicio_id'),
+    FichaTecnica: (('producto_aplicado', 'ingrediente_activo', 'dosis'), 'certificado_id'),
+    DetalleServicio: (('nombre_operario',), 'orden_servicio_id'),
+    OrdenServicio: (('precaucion',), 'id'),
+}
+
+
+def _afectados(objeto, clave, nuevo_o_borrado):
+    """Valores de ``clave`` (el actual y, si cambió, el anterior) de un objeto a reindexar."""
+    if nuevo_o_borrado:
+        return {getattr(objeto, clave)}
+    historia = inspect(objeto).attrs[clave].history
+    return set(historia.added) | set(historia.deleted) | set(historia.unchanged)
+
+
+@event.listens_for(SesionEnrutada, 'after_flush')
+def _anotar_cambios(sesion, contexto):
+    certificados = sesion.info.setdefault(PENDIENTES, set())
+    ordenes = sesion.info.setdefault(ORDENES_PENDIENTES, set())
+    for objetos, nuevo_o_borrado in ((sesion.new, True), (sesion.deleted, True), (sesion.dirty, False)):
+        for objeto in objetos:
+            columnas, clave = INDEXADOS.get(type(objeto), (None, None))
+            if clave is None:
+                continue
+            if not nuevo_o_borrado:
+                # Un certificado que cambia de estado no cambia su texto
+                estado = inspect(objeto)
+                if not any(estado.attrs[c].history.has_changes() for c in columnas + (clave,)):
+                    continue
+            if isinstance(objeto, Certificado):
+                certificados.add(objeto.id)
+            elif isinstance(objeto, FichaTecnica):
+                certificados.update(_afectados(objeto, clave, nuevo_o_borrado))
+            else:
+                ordenes.update(_afectados(objeto, clave, nuevo_o_borrado))
+    certificados.discard(None)
+    ordenes.discard(None)
+
+
+@event.listens_for(SesionEnrutada, 'before_commit')
+def _actualizar_indice(sesion):
+    # commit() hace su flush después de este evento; se adelanta para ver todos los cambios
+    sesion.flush()
+    certificados = sesion.info.pop(PENDIENTES, None)
+    ordenes = sesion.info.pop(ORDENES_PENDIENTES, None)
+    if not certificados and not ordenes:
+        return
+    conexion = sesion.connection(bind_arguments={'mapper': Certificado.__mapper__})
+    if indice_disponible(conexion):
+        reindexar(conexion, certificados or (), ordenes or ())
+
+
+@event.listens_for(SesionEnrutada, 'after_soft_rollback')
+def _descartar_pendientes(sesion, transaccion_anterior):
+    sesion.info.pop(PENDIENTES, None)
+    sesion.info.pop(ORDENES_PENDIENTES, None)
+
+
+def incluir_en_migraciones(objeto, nombre, tipo, reflejado, comparado_con):
+    """include_object de Flask-Migrate: autogenerate no debe proponer borrar esta tabla
+    (ni las tablas internas que crea FTS5), que no es un modelo."""
+    return not (tipo == 'table' and nombre.startswith(TABLA))
@@ -0,0 +1,128 @@
+"""
+Caché acotada de documentos generados (certificados_generados/).
+
+Cada archivo se nombra Certificado_<id>_<version>.<ext>, donde la versión es un hash de los
+datos con los que se renderizó: si los datos cambian, el nombre cambia y nunca se sirve un
+documento viejo. PUT/DELETE invalidan explícitamente los archivos del certificado y, cuando
+el directorio supera CERTIFICADOS_CACHE_MAX_BYTES, se eliminan los menos usados (LRU según
+la fecha de modificación, que se actualiza en cada descarga para que todos los procesos la vean).
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+PREFIJO = 'Certificado_'
+# Cada cuánto se vuelve a leer el directorio para ver lo que agregaron otros procesos
+RESINCRONIZAR_CADA = 60
+
+
+def version_datos(datos):
+    """Hash corto y estable de los datos de un documento."""
+    contenido = json.dumps(datos, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(contenido.encode('utf-8')).hexdigest()[:12]
+
+
+class CacheDocumentos:
+    def __init__(self, app=None):
+        self.directorio = None
+        self.max_bytes = None
+        self._lock = threading.Lock()
+        self._indice = None  # ruta -> (tamaño, último uso)
+        self._total = 0
+        self._sincronizado = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.directorio = app.config['CERTIFICADOS_DIR']
+        self.max_bytes = app.config['CERTIFICADOS_CACHE_MAX_BYTES']
+        app.extensions['cache_documentos'] = self
+
+    def ruta(self, certificado_id, version, extension='docx'):
+        return os.path.join(self.directorio, f"{PREFIJO}{certificado_id}_{version}.{extension}")
+
+    def ruta_heredada(self, certificado_id, extension='docx'):
+        """Nombre usado antes de versionar los archivos (Certificado_<id>.<ext>)."""
+        return os.path.join(self.directorio, f"{PREFIJO}{certificado_id}.{extension}")
+
+    def _es_documento(self, nombre):
+        return nombre.startswith(PREFIJO) and not nombre.endswith('.tmp')
+
+    def _sincronizar(self):
+        indice = {}
+        total = 0
+        if os.path.isdir(self.directorio):
+            for entrada in os.scandir(self.directorio):
+                if entrada.is_file() and self._es_documento(entrada.name):
+                    stat = entrada.stat()
+                    indice[entrada.path] = (stat.st_size, stat.st_mtime)
+                    total += stat.st_size
+        self._indice = indice
+        self._total = total
+        self._sincronizado = time.monotonic()
+
+    def _asegurar_indice(self):
+        if self._indice is None or time.monotonic() - self._sincronizado > RESINCRONIZAR_CADA:
+            self._sincronizar()
+
+    def obtener(self, ruta):
+        """Devuelve la ruta si el archivo existe (marcándolo como usado) o None."""
+        try:
+            os.utime(ruta)
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            self._asegurar_indice()
+            if ruta in self._indice:
+                self._indice[ruta] = (self._indice[ruta][0], time.time())
+        return ruta
+
+    def registrar(self, ruta):
+        """Registra un archivo recién escrito y desaloja los menos usados si se pasa del límite."""
+        tamano = os.path.getsize(ruta)
+        with self._lock:
+            self._asegurar_indice()
+            anterior = self._indice.get(ruta)
+            if anterior:
+                self._total -= anterior[0]
+            self._indice[ruta] = (tamano, time.time())
+            self._total += tamano
+            if self._total > self.max_bytes:
+                self._desalojar(proteger=ruta)
+
+    def _desalojar(self, proteger):
+        for ruta, (tamano, _) in sorted(self._indice.items(), key=lambda e: e[1][1]):
+            if self._total <= self.max_bytes:
+                break
+            if ruta == proteger:
+                continue
+            self._eliminar(ruta)
+            logger.info("Documento desalojado de la caché: %s (%s bytes)", ruta, tamano)
+
+    def _eliminar(self, ruta):
+        try:
+            os.remove(ruta)
+        except FileNotFoundError:
+            pass
+        entrada = self._indice.pop(ruta, None)
+        if entrada:
+            self._total -= entrada[0]
+
+    def invalidar(self, certificado_id):
+        """Elimina todas las versiones (y los archivos sin versión) de un certificado."""
+        if not os.path.isdir(self.directorio):
+            return
+        prefijos = (f"{PREFIJO}{certificado_id}_", f"{PREFIJO}{certificado_id}.")
+        with self._lock:
+            self._asegurar_indice()
+            for entrada in os.scandir(self.directorio):
+                if entrada.name.startswith(prefijos) and not entrada.name.endswith('.tmp'):
+                    self._eliminar(entrada.path)
+
+
+cache_documentos = CacheDocumentos()
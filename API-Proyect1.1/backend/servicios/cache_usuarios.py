@@ -0,0 +1,102 @@
+"""
+Caché por proceso de los usuarios autenticados (con el nombre del rol), por id.
+
+Casi todas las lecturas autenticadas piden el mismo puñado de usuarios; con esta caché la
+mayoría no necesita ir a la base de datos. Cada entrada vence a los USUARIOS_CACHE_TTL
+segundos, lo que acota lo que otro proceso puede ver desactualizado, y cuando hay más de
+USUARIOS_CACHE_MAXIMO se descarta la usada hace más tiempo. Las vistas que modifican un
+usuario lo invalidan explícitamente en este proceso.
+"""
+from collections import OrderedDict
+import threading
+import time
+
+from sqlalchemy.orm import joinedload
+
+from ..modelos import Usuario, en_primaria
+
+
+def datos_usuario(usuario):
+    return {
+        'id': usuario.id,
+        'nombre': usuario.nombre,
+        'direccion': usuario.direccion,
+        'telefono': usuario.telefono,
+        'rol_id': usuario.rol_id,
+        'rol': usuario.rol.nombre if usuario.rol else None,
+    }
+
+
+class CacheUsuarios:
+    def __init__(self, app=None):
+        self.ttl = 60
+        self.maximo = 1024
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()  # id -> (vence, datos)
+        self.aciertos = 0
+        self.fallos = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = app.config['USUARIOS_CACHE_TTL']
+        self.maximo = app.config['USUARIOS_CACHE_MAXIMO']
+        app.extensions['cache_usuarios'] = self
+
+    def guardar(self, usuario):
+        """Guarda un usuario ya cargado (por ejemplo en el login) y devuelve sus datos."""
+        datos = datos_usuario(usuario)
+        if self.maximo <= 0:
+            return datos
+        with self._lock:
+            self._entradas[usuario.id] = (time.monotonic() + self.ttl, datos)
+            self._entradas.move_to_end(usuario.id)
+            while len(self._entradas) > self.maximo:
+                self._entradas.popitem(last=False)
+        return datos
+
+    def obtener(self, usuario_id):
+        """Datos del usuario (dict) o None si no existe."""
+        try:
+            usuario_id = int(usuario_id)
+        except (TypeError, ValueError):
+            return None
+
+        with self._lock:
+            entrada = self._entradas.get(usuario_id)
+            if entrada is not None and entrada[0] > time.monotonic():
+                self._entradas.move_to_end(usuario_id)
+                self.aciertos += 1
+                return entrada[1]
+            self.fallos += 1
+
+        # Lo que entra a la caché se lee de la principal: el retraso de una réplica duraría el TTL
+        with en_primaria():
+            usuario = Usuario.query.options(joinedload(Usuario.rol)).filter_by(id=usuario_id).first()
+        if usuario is None:
+            self.invalidar(usuario_id)
+            return None
+        return self.guardar(usuario)
+
+    def invalidar(self, usuario_id):
+        with self._lock:
+            self._entradas.pop(int(usuario_id), None)
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def estadisticas(self):
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'tasa_aciertos': round(self.aciertos / consultas, 4) if consultas else None,
+                'entradas': len(self._entradas),
+                'maximo': self.maximo,
+                'ttl': self.ttl,
+            }
+
+
+cache_usuarios = CacheUsuarios()
@@ -0,0 +1,75 @@
+"""
+Catálogo de roles en memoria.
+
+La tabla rol tiene unas pocas filas que casi nunca cambian: se carga entera al arrancar y se
+vuelve a cargar cuando la modifica este proceso (VistaRol.put) o cuando pasan ROLES_CACHE_TTL
+segundos, para ver los cambios hechos por otros procesos. El ETag es un hash del contenido,
+así que todos los procesos calculan el mismo para los mismos roles.
+"""
+import hashlib
+import json
+import threading
+import time
+
+from ..modelos import Rol, RolSchema, en_primaria
+from .serializacion import compilar
+
+roles_schema = compilar(RolSchema(many=True))
+
+
+class CatalogoRoles:
+    def __init__(self, app=None):
+        self.ttl = 300
+        self._lock = threading.Lock()
+        self._roles = None
+        self._por_id = {}
+        self._por_nombre = {}
+        self._etag = None
+        self._vence = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = app.config['ROLES_CACHE_TTL']
+        app.extensions['catalogo_roles'] = self
+
+    def refrescar(self):
+        """Vuelve a leer la tabla rol (requiere contexto de aplicación)."""
+        with en_primaria():
+            roles = roles_schema.dump(Rol.query.order_by(Rol.id).all())
+        contenido = json.dumps(roles, sort_keys=True, ensure_ascii=False)
+        with self._lock:
+            self._roles = roles
+            self._por_id = {r['id']: r for r in roles}
+            # Los nombres se comparan sin distinguir mayúsculas, como en los claims del JWT
+            self._por_nombre = {(r['nombre'] or '').lower(): r for r in roles}
+            self._etag = hashlib.sha1(contenido.encode('utf-8')).hexdigest()
+            self._vence = time.monotonic() + self.ttl
+        return roles
+
+    def _vigente(self):
+        if self._roles is None or time.monotonic() > self._vence:
+            self.refrescar()
+
+    def todos(self):
+        self._vigente()
+        return self._roles
+
+    @property
+    def etag(self):
+        self._vigente()
+        return self._etag
+
+    def por_id(self, rol_id):
+        self._vigente()
+        try:
+            return self._por_id.get(int(rol_id))
+        except (TypeError, ValueError):
+            return None
+
+    def por_nombre(self, nombre):
+        self._vigente()
+        return self._por_nombre.get((nombre or '').lower())
+
+
+catalogo_roles = CatalogoRoles()
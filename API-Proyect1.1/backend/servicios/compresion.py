@@ -0,0 +1,176 @@
+"""
+Compresión de respuestas negociada con Accept-Encoding (brotli o gzip).
+
+Respuestas generadas (JSON de /certificados, /usuarios, exportación NDJSON/CSV, /metrics):
+se comprimen al salir si su tipo está en COMPRESION_TIPOS y miden al menos
+COMPRESION_MINIMO bytes. En las respuestas en streaming se leen trozos hasta juntar ese
+mínimo: si el cuerpo termina antes se envía tal cual, y si no se sigue comprimiendo trozo a
+trozo, con un flush por trozo para que el cliente reciba los datos a medida que se generan.
+El ETag de una respuesta comprimida pasa a ser débil (If-None-Match usa comparación débil).
+
+Documentos generados (certificados_generados/): los de COMPRESION_ARCHIVOS se comprimen una
+sola vez, al nivel máximo, junto al original (Certificado_<id>_<version>.pdf.gz / .pdf.br),
+y las descargas repetidas envían esa variante sin recomprimir. Las variantes son parte de la
+caché de documentos: cuentan para su límite, se invalidan con el original y, si se desalojan,
+se vuelven a crear en la siguiente descarga. Con ENTREGA_ARCHIVOS 'x-accel' las sirve
+nginx con `gzip_static on;` (y `brotli_static on;` del módulo ngx_brotli) en la ubicación
+interna.
+
+El DOCX no está en COMPRESION_ARCHIVOS por defecto: ya es un ZIP y gzip le quita menos de
+un 10 %. brotli es opcional (`pip install brotli`); sin él solo se ofrece gzip.
+"""
+import os
+import threading
+import zlib
+
+from flask import request
+
+from .cache_documentos import cache_documentos
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Extensión de las variantes precomprimidas de cada codificación
+SUFIJOS = {'br': '.br', 'gzip': '.gz'}
+# Niveles de las variantes precomprimidas: se comprimen una sola vez
+NIVEL_ARCHIVOS = {'br': 11, 'gzip': 9}
+
+
+def codificaciones_disponibles():
+    """En orden de preferencia."""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def _compresor(codificacion, nivel):
+    """(comprimir trozo, vaciar sin terminar, terminar) para una codificación."""
+    if codificacion == 'br':
+        compresor = brotli.Compressor(quality=nivel)
+        return compresor.process, compresor.flush, compresor.finish
+    # wbits 31: formato gzip, con mtime 0 (mismo contenido, mismos bytes)
+    compresor = zlib.compressobj(nivel, zlib.DEFLATED, 31)
+    return compresor.compress, lambda: compresor.flush(zlib.Z_SYNC_FLUSH), compresor.flush
+
+
+def comprimir(datos, codificacion, nivel):
+    comprimir_trozo, _, terminar = _compresor(codificacion, nivel)
+    return comprimir_trozo(datos) + terminar()
+
+
+class Compresion:
+    def __init__(self, app=None):
+        self.app = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.after_request(self._comprimir_respuesta)
+        app.extensions['compresion'] = self
+
+    def _nivel(self, codificacion):
+        return self.app.config['COMPRESION_NIVEL_BROTLI' if codificacion == 'br' else 'COMPRESION_NIVEL_GZIP']
+
+    def negociar(self):
+        """La codificación preferida que acepta el cliente, o None."""
+        mejor, calidad_mejor = None, 0
+        for codificacion in codificaciones_disponibles():
+            calidad = request.accept_encodings.quality(codificacion)
+            if calidad > calidad_mejor:
+                mejor, calidad_mejor = codificacion, calidad
+        return mejor
+
+    # --- respuestas generadas ---
+
+    def _comprimible(self, respuesta):
+        return (
+            200 <= respuesta.status_code < 300 and respuesta.status_code not in (204, 206)
+            and not respuesta.direct_passthrough
+            and 'Content-Encoding' not in respuesta.headers
+            and respuesta.mimetype in self.app.config['COMPRESION_TIPOS']
+            and not respuesta.cache_control.no_transform
+        )
+
+    def _comprimir_respuesta(self, respuesta):
+        if not self._comprimible(respuesta):
+            return respuesta
+        respuesta.vary.add('Accept-Encoding')
+        codificacion = self.negociar()
+        if codificacion is None:
+            return respuesta
+
+        minimo = self.app.config['COMPRESION_MINIMO']
+        nivel = self._nivel(codificacion)
+        if not respuesta.is_streamed:
+            datos = respuesta.get_data()
+            if len(datos) < minimo:
+                return respuesta
+            respuesta.set_data(comprimir(datos, codificacion, nivel))
+        else:
+            original = respuesta.response
+            trozos = respuesta.iter_encoded()
+            inicio, tamano = [], 0
+            for trozo in trozos:
+                inicio.append(trozo)
+                tamano += len(trozo)
+                if tamano >= minimo:
+                    break
+            else:
+                # Terminó antes del mínimo: se envía sin comprimir
+                if hasattr(original, 'close'):
+                    original.close()
+                respuesta.set_data(b''.join(inicio))
+                return respuesta
+            respuesta.response = self._flujo_comprimido(codificacion, nivel, inicio, trozos, original)
+            respuesta.headers.pop('Content-Length', None)
+
+        respuesta.headers['Content-Encoding'] = codificacion
+        etag, debil = respuesta.get_etag()
+        if etag and not debil:
+            respuesta.set_etag(etag, weak=True)
+        return respuesta
+
+    def _flujo_comprimido(self, codificacion, nivel, inicio, trozos, original):
+        comprimir_trozo, vaciar, terminar = _compresor(codificacion, nivel)
+        try:
+            yield comprimir_trozo(b''.join(inicio)) + vaciar()
+            for trozo in trozos:
+                yield comprimir_trozo(trozo) + vaciar()
+            yield terminar()
+        finally:
+            if hasattr(original, 'close'):
+                original.close()
+
+    # --- documentos precomprimidos ---
+
+    def _precomprimible(self, ruta):
+        return os.path.splitext(ruta)[1].lstrip('.').lower() in self.app.config['COMPRESION_ARCHIVOS']
+
+    def codificacion_documento(self, ruta):
+        """Codificación con la que se enviaría el documento a este cliente (None: tal cual)."""
+        return self.negociar() if self._precomprimible(ruta) else None
+
+    def _escribir_variante(self, ruta, codificacion):
+        destino = ruta + SUFIJOS[codificacion]
+        temporal = f"{destino}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(ruta, 'rb') as f:
+            datos = comprimir(f.read(), codificacion, NIVEL_ARCHIVOS[codificacion])
+        with open(temporal, 'wb') as f:
+            f.write(datos)
+        os.replace(temporal, destino)
+        cache_documentos.registrar(destino)
+        return destino
+
+    def precomprimir(self, ruta):
+        """Escribe las variantes de un documento recién generado (si su tipo lo amerita)."""
+        if self._precomprimible(ruta):
+            for codificacion in codificaciones_disponibles():
+                self._escribir_variante(ruta, codificacion)
+
+    def variante(self, ruta, codificacion):
+        """Ruta de la variante comprimida de un documento; la crea si no existe o se desalojó."""
+        return cache_documentos.obtener(ruta + SUFIJOS[codificacion]) or self._escribir_variante(ruta, codificacion)
+
+
+compresion = Compresion()
@@ -0,0 +1,141 @@
+"""
+Hash y verificación de contraseñas con una política configurable.
+
+CONTRASENA_METODO sigue el formato de Werkzeug: 'pbkdf2:<hash>:<iteraciones>' o
+'scrypt:<n>:<r>:<p>' (los hashes scrypt son compatibles con Werkzeug >= 2.3). Al iniciar
+sesión, si el hash guardado no corresponde a la política actual (otro algoritmo, menos
+iteraciones) se devuelve uno nuevo para reemplazarlo sin que el usuario haga nada.
+
+PBKDF2 y scrypt liberan el GIL, así que el trabajo se hace en un pool de hilos acotado
+(CONTRASENA_HILOS) con una cola limitada (CONTRASENA_COLA): una ráfaga de inicios de sesión
+ocupa como máximo esos hilos y lo que no cabe se rechaza enseguida en lugar de bloquear a
+todos los workers. Con CONTRASENA_HILOS = 0 se calcula en el hilo de la petición.
+"""
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as TiempoAgotado
+import hashlib
+import hmac
+import secrets
+import threading
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+SCRYPT_POR_DEFECTO = (2 ** 15, 8, 1)
+LARGO_SAL = 16
+
+
+class HashSaturado(Exception):
+    """No hay lugar en la cola de hash de contraseñas o la espera superó el límite."""
+
+
+def normalizar_metodo(metodo):
+    """Completa los parámetros omitidos: 'pbkdf2:sha256' -> 'pbkdf2:sha256:260000'."""
+    partes = metodo.split(':')
+    if partes[0] == 'pbkdf2':
+        algoritmo = partes[1] if len(partes) > 1 and partes[1] else 'sha256'
+        iteraciones = int(partes[2]) if len(partes) > 2 and partes[2] else DEFAULT_PBKDF2_ITERATIONS
+        return f'pbkdf2:{algoritmo}:{iteraciones}'
+    if partes[0] == 'scrypt':
+        n, r, p = (int(v) for v in partes[1:4]) if len(partes) == 4 else SCRYPT_POR_DEFECTO
+        return f'scrypt:{n}:{r}:{p}'
+    raise ValueError(f"Método de hash no soportado: {metodo}")
+
+
+def _scrypt(contrasena, sal, metodo):
+    n, r, p = (int(v) for v in metodo.split(':')[1:4])
+    return hashlib.scrypt(
+        contrasena.encode('utf-8'), salt=sal.encode('utf-8'), n=n, r=r, p=p, maxmem=132 * n * r * p
+    ).hex()
+
+
+def generar_hash(contrasena, metodo):
+    metodo = normalizar_metodo(metodo)
+    if metodo.startswith('scrypt:'):
+        sal = secrets.token_urlsafe(LARGO_SAL)[:LARGO_SAL]
+        return f'{metodo}${sal}${_scrypt(contrasena, sal, metodo)}'
+    return generate_password_hash(contrasena, method=metodo, salt_length=LARGO_SAL)
+
+
+def verificar_hash(contrasena_hash, contrasena):
+    if not contrasena_hash:
+        return False
+    if contrasena_hash.startswith('scrypt:') and contrasena_hash.count('$') == 2:
+        metodo, sal, valor = contrasena_hash.split('$', 2)
+        try:
+            return hmac.compare_digest(_scrypt(contrasena, sal, metodo), valor)
+        except ValueError:
+            return False
+    return check_password_hash(contrasena_hash, contrasena)
+
+
+class PoliticaContrasenas:
+    def __init__(self, app=None):
+        self.app = None
+        self._pool = None
+        self._cupos = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        # Falla al arrancar y no en el primer login si el método está mal escrito
+        normalizar_metodo(app.config['CONTRASENA_METODO'])
+        app.extensions['politica_contrasenas'] = self
+
+    def _config(self, clave, defecto):
+        # Sin app (scripts, shell) se usan los valores por defecto y se calcula en línea
+        return self.app.config.get(clave, defecto) if self.app is not None else defecto
+
+    @property
+    def metodo(self):
+        return normalizar_metodo(self._config('CONTRASENA_METODO', 'pbkdf2:sha256'))
+
+    def _ejecutar(self, funcion, *argumentos):
+        hilos = self._config('CONTRASENA_HILOS', 0)
+        if not hilos:
+            return funcion(*argumentos)
+
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    # Cupos = los que se están calculando + los que esperan en la cola
+                    self._cupos = threading.BoundedSemaphore(hilos + self._config('CONTRASENA_COLA', 32))
+                    self._pool = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix='contrasenas')
+
+        if not self._cupos.acquire(blocking=False):
+            raise HashSaturado('Demasiados inicios de sesión en curso, intente de nuevo')
+        try:
+            futuro = self._pool.submit(funcion, *argumentos)
+        except Exception:
+            self._cupos.release()
+            raise
+        futuro.add_done_callback(lambda _: self._cupos.release())
+
+        espera = self._config('CONTRASENA_ESPERA', 10)
+        try:
+            return futuro.result(timeout=espera)
+        except TiempoAgotado:
+            raise HashSaturado(f'La verificación de la contraseña superó {espera} s')
+
+    def generar(self, contrasena):
+        """Hash de ``contrasena`` con la política actual."""
+        return self._ejecutar(generar_hash, contrasena, self.metodo)
+
+    def verificar(self, contrasena_hash, contrasena):
+        """
+        Devuelve (válida, hash_nuevo). hash_nuevo no es None cuando la contraseña es correcta
+        pero el hash guardado usa una política anterior y conviene reemplazarlo.
+        """
+        metodo = self.metodo
+
+        def verificar_y_actualizar():
+            if not verificar_hash(contrasena_hash, contrasena):
+                return False, None
+            if contrasena_hash.split('$', 1)[0] != metodo:
+                return True, generar_hash(contrasena, metodo)
+            return True, None
+
+        return self._ejecutar(verificar_y_actualizar)
+
+
+politica_contrasenas = PoliticaContrasenas()
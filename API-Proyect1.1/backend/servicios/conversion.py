@@ -0,0 +1,286 @@
+"""
+Conversión DOCX -> PDF con backends intercambiables (CONVERSOR_PDF):
+
+- 'libreoffice': pool de procesos unoserver (LibreOffice headless) que quedan calientes entre
+  conversiones; cada conversión usa unoconvert contra un proceso libre del pool.
+- 'docx2pdf': el comportamiento anterior; necesita Microsoft Word (Windows/macOS).
+- 'texto': PDF mínimo en Python puro con el texto del documento, para pruebas y desarrollo.
+
+Las peticiones concurrentes por el mismo archivo se agrupan en una sola conversión, hay un
+límite de conversiones simultáneas (CONVERSION_PROCESOS) y un tiempo máximo (CONVERSION_TIMEOUT).
+"""
+from concurrent.futures import Future, TimeoutError as TiempoAgotado
+import atexit
+import logging
+import os
+import queue
+import re
+import shutil
+import socket
+import subprocess
+import threading
+import time
+import zipfile
+
+from .metricas import metricas
+
+logger = logging.getLogger(__name__)
+
+
+class ErrorConversion(Exception):
+    """La conversión falló o no pudo empezar a tiempo."""
+
+
+def _temporal(destino):
+    return f"{destino}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+class ConversorDocx2Pdf:
+    def convertir(self, origen, destino, timeout):
+        from docx2pdf import convert
+
+        temporal = _temporal(destino) + '.pdf'
+        convert(origen, temporal)
+        os.replace(temporal, destino)
+
+    def cerrar(self):
+        pass
+
+
+class ConversorTexto:
+    """Genera un PDF de texto plano (Helvetica, A4) con los párrafos del DOCX."""
+
+    LINEAS_POR_PAGINA = 50
+
+    def _parrafos(self, origen):
+        with zipfile.ZipFile(origen) as z:
+            xml = z.read('word/document.xml').decode('utf-8')
+        for parrafo in re.findall(r'<w:p[ >].*?</w:p>', xml, flags=re.S):
+            texto = ''.join(re.findall(r'<w:t(?: [^>]*)?>([^<]*)</w:t>', parrafo))
+            yield (texto.replace('&lt;', '<').replace('&gt;', '>')
+                   .replace('&quot;', '"').replace('&apos;', "'").replace('&amp;', '&'))
+
+    @staticmethod
+    def _escapar(texto):
+        texto = texto.encode('cp1252', 'replace').decode('cp1252')
+        return texto.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+    def convertir(self, origen, destino, timeout):
+        lineas = list(self._parrafos(origen)) or ['']
+        paginas = [lineas[i:i + self.LINEAS_POR_PAGINA] for i in range(0, len(lineas), self.LINEAS_POR_PAGINA)]
+
+        objetos = [
+            b'<< /Type /Catalog /Pages 2 0 R >>',
+            None,  # páginas, se completa al final
+            b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>',
+        ]
+        hijos = []
+        for pagina in paginas:
+            contenido = ['BT /F1 10 Tf 14 TL 50 800 Td']
+            contenido += [f'({self._escapar(linea)}) Tj T*' for linea in pagina]
+            contenido.append('ET')
+            flujo = '\n'.join(contenido).encode('cp1252')
+            objetos.append(b'<< /Length %d >>\nstream\n' % len(flujo) + flujo + b'\nendstream')
+            objetos.append(
+                b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+                b'/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>' % len(objetos)
+            )
+            hijos.append(len(objetos))
+        objetos[1] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (
+            b' '.join(b'%d 0 R' % n for n in hijos), len(hijos)
+        )
+
+        salida = bytearray(b'%PDF-1.4\n')
+        posiciones = []
+        for numero, objeto in enumerate(objetos, start=1):
+            posiciones.append(len(salida))
+            salida += b'%d 0 obj\n' % numero + objeto + b'\nendobj\n'
+        inicio_xref = len(salida)
+        salida += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objetos) + 1)
+        salida += b''.join(b'%010d 00000 n \n' % p for p in posiciones)
+        salida += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objetos) + 1, inicio_xref)
+
+        temporal = _temporal(destino)
+        with open(temporal, 'wb') as f:
+            f.write(salida)
+        os.replace(temporal, destino)
+
+    def cerrar(self):
+        pass
+
+
+class _ProcesoUnoserver:
+    """Un LibreOffice headless servido por unoserver en un puerto propio."""
+
+    def __init__(self, indice, puerto_base, directorio_perfiles):
+        self.puerto = puerto_base + 2 * indice
+        self.puerto_uno = puerto_base + 2 * indice + 1
+        self.perfil = os.path.join(directorio_perfiles, f'perfil_{indice}')
+        self.proceso = None
+
+    def _listo(self):
+        try:
+            with socket.create_connection(('127.0.0.1', self.puerto), timeout=0.5):
+                return True
+        except OSError:
+            return False
+
+    def asegurar(self, timeout):
+        if self.proceso is not None and self.proceso.poll() is None:
+            return
+        if self._listo():
+            # Otro worker del servidor ya levantó este puerto: se comparte
+            return
+        if shutil.which('unoserver') is None:
+            raise ErrorConversion("No se encontró 'unoserver'; instale LibreOffice y el paquete unoserver")
+        os.makedirs(self.perfil, exist_ok=True)
+        self.proceso = subprocess.Popen(
+            [
+                'unoserver', '--interface', '127.0.0.1',
+                '--port', str(self.puerto), '--uno-port', str(self.puerto_uno),
+                '--user-installation', f'file://{os.path.abspath(self.perfil)}',
+            ],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        limite = time.monotonic() + timeout
+        while not self._listo():
+            if self.proceso.poll() is not None or time.monotonic() > limite:
+                self.cerrar()
+                raise ErrorConversion('LibreOffice no arrancó a tiempo')
+            time.sleep(0.2)
+
+    def convertir(self, origen, destino, timeout):
+        self.asegurar(timeout)
+        temporal = _temporal(destino) + '.pdf'
+        try:
+            subprocess.run(
+                ['unoconvert', '--host', '127.0.0.1', '--port', str(self.puerto),
+                 '--convert-to', 'pdf', origen, temporal],
+                check=True, timeout=timeout, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+            )
+        except subprocess.TimeoutExpired:
+            # Un LibreOffice colgado no se reutiliza
+            self.cerrar()
+            raise ErrorConversion(f'La conversión superó {timeout} s')
+        except subprocess.CalledProcessError as e:
+            raise ErrorConversion(e.stderr.decode('utf-8', 'replace').strip() or 'unoconvert falló')
+        os.replace(temporal, destino)
+
+    def cerrar(self):
+        if self.proceso is not None and self.proceso.poll() is None:
+            self.proceso.terminate()
+            try:
+                self.proceso.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.proceso.kill()
+        self.proceso = None
+
+
+class ConversorLibreOffice:
+    def __init__(self, procesos, puerto_base, directorio_perfiles):
+        self._libres = queue.Queue()
+        self._todos = [_ProcesoUnoserver(i, puerto_base, directorio_perfiles) for i in range(procesos)]
+        for proceso in self._todos:
+            self._libres.put(proceso)
+
+    def convertir(self, origen, destino, timeout):
+        try:
+            proceso = self._libres.get(timeout=timeout)
+        except queue.Empty:
+            raise ErrorConversion('No hay procesos de conversión libres')
+        try:
+            proceso.convertir(origen, destino, timeout)
+        finally:
+            self._libres.put(proceso)
+
+    def cerrar(self):
+        for proceso in self._todos:
+            proceso.cerrar()
+
+
+class ConversorPDF:
+    """Fachada: límite de concurrencia, tiempo máximo y deduplicación por archivo destino."""
+
+    def __init__(self, app=None):
+        self.app = None
+        self._backend = None
+        self._semaforo = None
+        self._lock = threading.Lock()
+        self._en_curso = {}  # destino -> Future
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self._semaforo = threading.BoundedSemaphore(app.config['CONVERSION_PROCESOS'])
+        app.extensions['conversor_pdf'] = self
+
+    @property
+    def timeout(self):
+        return self.app.config['CONVERSION_TIMEOUT']
+
+    def _crear_backend(self):
+        nombre = self.app.config['CONVERSOR_PDF']
+        if nombre == 'libreoffice':
+            return ConversorLibreOffice(
+                self.app.config['CONVERSION_PROCESOS'],
+                self.app.config['LIBREOFFICE_PUERTO_BASE'],
+                self.app.config['LIBREOFFICE_PERFILES_DIR'],
+            )
+        if nombre == 'docx2pdf':
+            return ConversorDocx2Pdf()
+        if nombre == 'texto':
+            return ConversorTexto()
+        raise ErrorConversion(f"Conversor PDF desconocido: {nombre}")
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    self._backend = self._crear_backend()
+                    atexit.register(self._backend.cerrar)
+        return self._backend
+
+    def convertir(self, origen, destino):
+        """
+        Convierte ``origen`` a ``destino``. Si otra petición ya está convirtiendo el mismo
+        destino, espera ese resultado en lugar de lanzar una segunda conversión.
+        """
+        with self._lock:
+            futuro = self._en_curso.get(destino)
+            lider = futuro is None
+            if lider:
+                futuro = Future()
+                self._en_curso[destino] = futuro
+
+        if not lider:
+            try:
+                return futuro.result(timeout=self.timeout)
+            except TiempoAgotado:
+                raise ErrorConversion(f'La conversión superó {self.timeout} s')
+
+        try:
+            if not self._semaforo.acquire(timeout=self.timeout):
+                raise ErrorConversion('Demasiadas conversiones en curso, intente de nuevo')
+            inicio = time.perf_counter()
+            resultado = 'fallido'
+            try:
+                self.backend.convertir(origen, destino, self.timeout)
+                resultado = 'terminado'
+                logger.info("PDF generado en %.2f s: %s", time.perf_counter() - inicio, destino)
+            finally:
+                self._semaforo.release()
+                metricas.observar('pdf_conversion_duracion_segundos', time.perf_counter() - inicio,
+                                  resultado=resultado)
+            futuro.set_result(destino)
+            return destino
+        except Exception as e:
+            futuro.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._en_curso.pop(destino, None)
+
+
+conversor_pdf = ConversorPDF()
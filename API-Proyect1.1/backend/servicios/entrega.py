@@ -0,0 +1,99 @@
+"""
+Entrega de documentos generados.
+
+Los archivos de la caché están versionados por nombre (Certificado_<id>_<version>.<ext>), así
+que ese nombre sirve como ETag fuerte: una descarga repetida se responde con 304 sin tocar el
+disco ni regenerar nada. No se envía Last-Modified: la caché actualiza el mtime de los
+archivos en cada acierto (orden LRU), así que no identifica la versión. If-Modified-Since
+nunca da 304 e If-Range con fecha entrega el archivo completo. Según ENTREGA_ARCHIVOS el
+cuerpo lo envía:
+
+- 'flask': send_file de Flask (respuestas condicionales y por rangos incluidas).
+- 'x-accel': nginx, con X-Accel-Redirect hacia ENTREGA_X_ACCEL_PREFIJO. nginx agrega su propio
+  Last-Modified con el mtime; en la ubicación interna conviene `if_modified_since off;`.
+- 'x-sendfile': Apache/lighttpd, con X-Sendfile y la ruta absoluta.
+
+Con 'flask', si el cliente acepta brotli o gzip se envía la variante precomprimida del
+documento (servicios/compresion.py), con su propio ETag: la misma versión comprimida es otra
+representación y los rangos se cuentan sobre los bytes comprimidos.
+"""
+import mimetypes
+import os
+
+from flask import current_app, request, send_file
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
+
+from .compresion import compresion
+
+
+def etag_documento(ruta):
+    return os.path.basename(ruta)
+
+
+def _representacion(ruta):
+    """(codificación o None, ETag) de lo que se le enviaría a este cliente."""
+    etag = etag_documento(ruta)
+    if current_app.config['ENTREGA_ARCHIVOS'] != 'flask':
+        return None, etag
+    codificacion = compresion.codificacion_documento(ruta)
+    return codificacion, (f'{etag}-{codificacion}' if codificacion else etag)
+
+
+def _cabeceras_cache(respuesta, etag):
+    respuesta.set_etag(etag)
+    respuesta.vary.add('Accept-Encoding')
+    # La URL de descarga no cambia cuando el documento sí, así que se revalida siempre
+    respuesta.cache_control.private = True
+    respuesta.cache_control.no_cache = True
+    return respuesta
+
+
+def no_modificado(ruta):
+    """Respuesta 304 si el cliente ya tiene esta versión del documento; None si no."""
+    if ruta is None:
+        return None
+    _, etag = _representacion(ruta)
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    return _cabeceras_cache(current_app.response_class(status=304), etag)
+
+
+def _enviar_archivo(ruta, nombre_descarga, etag, mimetype=None):
+    """send_file con If-None-Match, Range e If-Range evaluados solo con el ETag (sin Last-Modified)."""
+    respuesta = send_file(
+        ruta, as_attachment=True, download_name=nombre_descarga, mimetype=mimetype, conditional=False, etag=etag
+    )
+    respuesta.headers.pop('Last-Modified', None)
+    try:
+        return respuesta.make_conditional(request, accept_ranges=True, complete_length=respuesta.content_length)
+    except RequestedRangeNotSatisfiable:
+        respuesta.close()
+        raise
+
+
+def enviar_documento(ruta, nombre_descarga):
+    codificacion, etag = _representacion(ruta)
+    modo = current_app.config['ENTREGA_ARCHIVOS']
+
+    if modo in ('x-accel', 'x-sendfile'):
+        mimetype = mimetypes.guess_type(nombre_descarga)[0] or 'application/octet-stream'
+        respuesta = current_app.response_class(mimetype=mimetype)
+        if modo == 'x-accel':
+            relativa = os.path.relpath(ruta, current_app.config['CERTIFICADOS_DIR']).replace(os.sep, '/')
+            respuesta.headers['X-Accel-Redirect'] = current_app.config['ENTREGA_X_ACCEL_PREFIJO'] + relativa
+        else:
+            respuesta.headers['X-Sendfile'] = os.path.abspath(ruta)
+        respuesta.headers['Content-Disposition'] = f'attachment; filename={nombre_descarga}'
+        return _cabeceras_cache(respuesta, etag)
+
+    if codificacion:
+        respuesta = _enviar_archivo(
+            compresion.variante(ruta, codificacion), nombre_descarga, etag,
+            mimetype=mimetypes.guess_type(nombre_descarga)[0]
+        )
+        respuesta.headers['Content-Encoding'] = codificacion
+    else:
+        respuesta = _enviar_archivo(ruta, nombre_descarga, etag)
+    respuesta.vary.add('Accept-Encoding')
+    respuesta.cache_control.private = True
+    return respuesta
@@ -0,0 +1,161 @@
+"""
+Idempotency-Key para los POST que crean certificados.
+
+Con la cabecera `Idempotency-Key`, la primera petición reserva la clave (una fila
+'en_curso' en clave_idempotencia, confirmada en su propia transacción para que la vean las
+demás), hace el trabajo y guarda su respuesta. Un reintento con la misma clave:
+
+- si la primera terminó, recibe la misma respuesta (con `Idempotent-Replayed: true`) sin
+  volver a escribir nada ni encolar otro documento;
+- si todavía está en curso, espera hasta IDEMPOTENCIA_ESPERA segundos a que termine y si
+  no, recibe 409 con Retry-After;
+- si el cuerpo es distinto, recibe 422: la clave ya se usó para otra cosa.
+
+Las respuestas 5xx no se guardan (la clave se libera y el reintento vuelve a intentarlo).
+Una reserva 'en_curso' de más de IDEMPOTENCIA_BLOQUEO segundos se considera abandonada (el
+proceso murió) y otra petición puede tomarla. Las claves vencen a los IDEMPOTENCIA_VENTANA
+segundos; las vencidas se borran de a poco, como mucho una vez por minuto y por proceso.
+"""
+from datetime import datetime, timedelta
+from functools import wraps
+import hashlib
+import json
+import logging
+import time
+
+from flask import current_app, request
+from flask_restful.utils import unpack
+from sqlalchemy import and_, delete, or_, select
+from sqlalchemy.exc import IntegrityError
+from werkzeug.wrappers import Response
+
+from ..modelos import db, ClaveIdempotencia
+from .metricas import metricas
+
+logger = logging.getLogger(__name__)
+
+CABECERA = 'Idempotency-Key'
+LONGITUD_MAXIMA = 255
+EN_CURSO = 'en_curso'
+TERMINADA = 'terminada'
+# Segundos entre lecturas mientras se espera a la petición original
+INTERVALO_ESPERA = 0.1
+LIMPIAR_CADA = 60
+
+# Para los swag_from de las vistas con @idempotente
+PARAMETRO_IDEMPOTENCIA = {
+    'name': CABECERA, 'in': 'header', 'type': 'string', 'required': False,
+    'description': 'Clave única por operación: los reintentos con la misma clave reciben la respuesta original'
+}
+
+_proxima_limpieza = 0.0
+
+
+def _sha256(datos):
+    return hashlib.sha256(datos).hexdigest()
+
+
+def _limpiar_vencidas(conexion, ahora):
+    global _proxima_limpieza
+    if time.monotonic() < _proxima_limpieza:
+        return
+    _proxima_limpieza = time.monotonic() + LIMPIAR_CADA
+    tabla = ClaveIdempotencia.__table__
+    conexion.execute(delete(tabla).where(tabla.c.expira < ahora))
+
+
+def _reservar(clave_id, huella):
+    """True si esta petición se quedó con la clave (nueva, vencida o abandonada)."""
+    tabla = ClaveIdempotencia.__table__
+    ahora = datetime.utcnow()
+    fila = {
+        'huella': huella, 'estado': EN_CURSO, 'codigo': None, 'respuesta': None, 'creada': ahora,
+        'expira': ahora + timedelta(seconds=current_app.config['IDEMPOTENCIA_VENTANA']),
+    }
+    try:
+        with db.engine.begin() as conexion:
+            _limpiar_vencidas(conexion, ahora)
+            conexion.execute(tabla.insert().values(id=clave_id, **fila))
+        return True
+    except IntegrityError:
+        pass
+    abandonada = ahora - timedelta(seconds=current_app.config['IDEMPOTENCIA_BLOQUEO'])
+    with db.engine.begin() as conexion:
+        resultado = conexion.execute(
+            tabla.update()
+            .where(tabla.c.id == clave_id,
+                   or_(tabla.c.expira < ahora, and_(tabla.c.estado == EN_CURSO, tabla.c.creada < abandonada)))
+            .values(**fila)
+        )
+    return resultado.rowcount == 1
+
+
+def _leer(clave_id):
+    tabla = ClaveIdempotencia.__table__
+    with db.engine.connect() as conexion:
+        return conexion.execute(
+            select(tabla.c.huella, tabla.c.estado, tabla.c.codigo, tabla.c.respuesta).where(tabla.c.id == clave_id)
+        ).first()
+
+
+def _guardar(clave_id, datos, codigo):
+    tabla = ClaveIdempotencia.__table__
+    with db.engine.begin() as conexion:
+        conexion.execute(
+            tabla.update().where(tabla.c.id == clave_id)
+            .values(estado=TERMINADA, codigo=codigo, respuesta=json.dumps(datos, ensure_ascii=False))
+        )
+
+
+def _liberar(clave_id):
+    tabla = ClaveIdempotencia.__table__
+    with db.engine.begin() as conexion:
+        conexion.execute(delete(tabla).where(tabla.c.id == clave_id, tabla.c.estado == EN_CURSO))
+
+
+def idempotente(funcion):
+    """Decorador para el método de un Resource que responde (datos, código[, cabeceras])."""
+    @wraps(funcion)
+    def envoltura(*args, **kwargs):
+        clave = request.headers.get(CABECERA)
+        if clave is None:
+            return funcion(*args, **kwargs)
+        if not clave.strip() or len(clave) > LONGITUD_MAXIMA:
+            return {'message': f'{CABECERA} debe tener entre 1 y {LONGITUD_MAXIMA} caracteres'}, 400
+
+        clave_id = _sha256(f'{request.method} {request.path}\n{clave}'.encode('utf-8'))
+        huella = _sha256(request.get_data())
+        limite = time.monotonic() + current_app.config['IDEMPOTENCIA_ESPERA']
+        while not _reservar(clave_id, huella):
+            fila = _leer(clave_id)
+            if fila is None:
+                continue  # la original falló y liberó la clave: se reintenta la reserva
+            if fila.huella != huella:
+                metricas.incrementar('idempotencia_peticiones_total', resultado='conflicto')
+                return {'message': f'La {CABECERA} ya se usó con otro cuerpo de petición'}, 422
+            if fila.estado == TERMINADA:
+                metricas.incrementar('idempotencia_peticiones_total', resultado='repetida')
+                return json.loads(fila.respuesta), fila.codigo, {'Idempotent-Replayed': 'true'}
+            if time.monotonic() >= limite:
+                metricas.incrementar('idempotencia_peticiones_total', resultado='en_curso')
+                return ({'message': f'Hay una petición con esta {CABECERA} en curso'}, 409,
+                        {'Retry-After': str(max(1, round(current_app.config['IDEMPOTENCIA_ESPERA'])))})
+            time.sleep(INTERVALO_ESPERA)
+
+        metricas.incrementar('idempotencia_peticiones_total', resultado='nueva')
+        try:
+            respuesta = funcion(*args, **kwargs)
+        except BaseException:
+            _liberar(clave_id)
+            raise
+        datos, codigo, _ = unpack(respuesta)
+        if isinstance(datos, Response) or codigo >= 500:
+            _liberar(clave_id)
+            return respuesta
+        try:
+            _guardar(clave_id, datos, codigo)
+        except Exception:
+            # El trabajo ya está hecho: se responde igual; un reintento esperará hasta el bloqueo
+            logger.exception("No se pudo guardar la respuesta de la %s", CABECERA)
+        return respuesta
+    return envoltura
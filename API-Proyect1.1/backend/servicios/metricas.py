@@ -0,0 +1,242 @@
+"""
+Métricas en formato de texto de Prometheus, expuestas en /metrics.
+
+Cada proceso acumula en memoria contadores, histogramas y medidores (un lock y unas sumas
+por petición). Con varios workers (gunicorn) cada uno tiene sus propios valores y el scrape
+cae en uno solo; si METRICAS_DIR apunta a un directorio compartido, cada proceso vuelca su
+estado ahí (como mucho cada METRICAS_INTERVALO segundos, al terminar una petición) y
+/metrics suma los archivos de todos. Los medidores de procesos que ya no existen no se suman;
+sus contadores sí, para que los totales no retrocedan. El directorio debe vaciarse al
+desplegar, igual que con el modo multiproceso de prometheus_client.
+
+Si METRICAS_TOKEN tiene valor, /metrics exige `Authorization: Bearer <token>`.
+"""
+from bisect import bisect_left
+import glob
+import json
+import os
+import threading
+import time
+
+from flask import Response, g, request
+
+# Límites superiores (segundos) de los histogramas; el último cubo (+Inf) es implícito
+CUBOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+DESCRIPCIONES = {
+    'http_peticiones_total': ('counter', 'Peticiones atendidas por método, ruta y código de estado'),
+    'http_peticion_duracion_segundos': ('histogram', 'Duración de las peticiones por método y ruta'),
+    'http_peticiones_en_curso': ('gauge', 'Peticiones que se están atendiendo ahora'),
+    'docx_render_duracion_segundos': ('histogram', 'Duración de la generación de documentos DOCX'),
+    'pdf_conversion_duracion_segundos': ('histogram', 'Duración de las conversiones DOCX a PDF'),
+    'db_pool_conexiones': ('gauge', 'Conexiones del pool de SQLAlchemy por bind y estado'),
+    'cache_usuarios_consultas_total': ('counter', 'Consultas a la caché de usuarios por resultado'),
+    'cache_usuarios_entradas': ('gauge', 'Usuarios guardados en la caché'),
+    'idempotencia_peticiones_total': ('counter', 'Peticiones con Idempotency-Key por resultado'),
+    'proceso_arranque_segundos': ('gauge', 'Tiempo de importación de la aplicación en cada proceso'),
+}
+
+
+def _etiquetas(etiquetas, extra=None):
+    pares = list(etiquetas) + ([extra] if extra else [])
+    if not pares:
+        return ''
+    escapar = lambda v: str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{k}="{escapar(v)}"' for k, v in pares) + '}'
+
+
+def _numero(valor):
+    return repr(float(valor)) if valor != int(valor) else str(int(valor))
+
+
+def _proceso_vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class Metricas:
+    def __init__(self, app=None):
+        self.app = None
+        self._lock = threading.Lock()
+        self._contadores = {}   # (nombre, etiquetas) -> valor
+        self._medidores = {}    # (nombre, etiquetas) -> valor
+        self._histogramas = {}  # (nombre, etiquetas) -> [cuentas por cubo..., +Inf, suma]
+        self._proximo_volcado = 0.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.before_request(self._inicio_peticion)
+        app.after_request(self._estado_respuesta)
+        app.teardown_request(self._fin_peticion)
+        app.add_url_rule('/metrics', 'metricas', self.vista)
+        app.extensions['metricas'] = self
+
+    # --- registro ---
+
+    def incrementar(self, nombre, valor=1, **etiquetas):
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self._lock:
+            self._contadores[clave] = self._contadores.get(clave, 0) + valor
+
+    def sumar_medidor(self, nombre, valor, **etiquetas):
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self._lock:
+            self._medidores[clave] = self._medidores.get(clave, 0) + valor
+
+    def observar(self, nombre, segundos, **etiquetas):
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        cubo = bisect_left(CUBOS, segundos)
+        with self._lock:
+            valores = self._histogramas.get(clave)
+            if valores is None:
+                valores = self._histogramas[clave] = [0] * (len(CUBOS) + 2)
+            valores[cubo] += 1
+            valores[-1] += segundos
+
+    # --- middleware ---
+
+    def _ruta(self):
+        # La plantilla de la ruta y no la URL, para no crear una serie por cada id
+        return request.url_rule.rule if request.url_rule else 'sin_ruta'
+
+    def _inicio_peticion(self):
+        g.metricas_inicio = time.perf_counter()
+        self.sumar_medidor('http_peticiones_en_curso', 1, metodo=request.method, ruta=self._ruta())
+
+    def _estado_respuesta(self, respuesta):
+        g.metricas_estado = respuesta.status_code
+        return respuesta
+
+    def _fin_peticion(self, error=None):
+        inicio = g.pop('metricas_inicio', None)
+        if inicio is None:
+            return
+        metodo, ruta = request.method, self._ruta()
+        self.observar('http_peticion_duracion_segundos', time.perf_counter() - inicio, metodo=metodo, ruta=ruta)
+        self.sumar_medidor('http_peticiones_en_curso', -1, metodo=metodo, ruta=ruta)
+        estado = g.pop('metricas_estado', 500)
+        self.incrementar('http_peticiones_total', metodo=metodo, ruta=ruta, estado=estado)
+        if self.app.config['METRICAS_DIR'] and time.monotonic() >= self._proximo_volcado:
+            self.volcar()
+
+    # --- exposición ---
+
+    def _muestras_del_momento(self):
+        """Medidores que se leen al exportar: pools de conexiones, caché de usuarios, arranque."""
+        from ..modelos import db
+        from .cache_usuarios import cache_usuarios
+
+        medidores = {}
+        binds = [None] + list(self.app.config.get('REPLICAS') or [])
+        for bind in binds:
+            pool = db.get_engine(self.app, bind=bind).pool
+            if not hasattr(pool, 'checkedout'):
+                continue
+            estados = {'en_uso': pool.checkedout(), 'libres': pool.checkedin()}
+            if hasattr(pool, 'overflow'):
+                estados['tamano'] = pool.size()
+                estados['desborde'] = max(0, pool.overflow())
+            for estado, valor in estados.items():
+                medidores[('db_pool_conexiones', (('bind', bind or 'principal'), ('estado', estado)))] = valor
+
+        estadisticas = cache_usuarios.estadisticas()
+        medidores[('cache_usuarios_entradas', ())] = estadisticas['entradas']
+        contadores = {
+            ('cache_usuarios_consultas_total', (('resultado', 'acierto'),)): estadisticas['aciertos'],
+            ('cache_usuarios_consultas_total', (('resultado', 'fallo'),)): estadisticas['fallos'],
+        }
+        arranque = self.app.extensions.get('arranque')
+        if arranque:
+            medidores[('proceso_arranque_segundos', ())] = arranque['segundos']
+        return contadores, medidores
+
+    def estado(self):
+        """Copia del estado de este proceso, lista para serializar."""
+        contadores, medidores = self._muestras_del_momento()
+        with self._lock:
+            contadores.update(self._contadores)
+            medidores.update(self._medidores)
+            histogramas = {clave: list(valores) for clave, valores in self._histogramas.items()}
+        a_lista = lambda d: [[nombre, [list(par) for par in etiquetas], valor] for (nombre, etiquetas), valor in d.items()]
+        return {
+            'pid': os.getpid(),
+            'contadores': a_lista(contadores),
+            'medidores': a_lista(medidores),
+            'histogramas': a_lista(histogramas),
+        }
+
+    def volcar(self):
+        directorio = self.app.config['METRICAS_DIR']
+        self._proximo_volcado = time.monotonic() + self.app.config['METRICAS_INTERVALO']
+        os.makedirs(directorio, exist_ok=True)
+        destino = os.path.join(directorio, f'{os.getpid()}.json')
+        # Temporal por hilo: una petición y /metrics pueden volcar a la vez
+        temporal = f'{destino}.{threading.get_ident()}.tmp'
+        with open(temporal, 'w') as f:
+            json.dump(self.estado(), f)
+        os.replace(temporal, destino)
+
+    def _estados(self):
+        directorio = self.app.config['METRICAS_DIR']
+        if not directorio:
+            return [self.estado()]
+        self.volcar()
+        estados = []
+        for archivo in glob.glob(os.path.join(directorio, '*.json')):
+            try:
+                with open(archivo) as f:
+                    estados.append(json.load(f))
+            except (OSError, ValueError):
+                continue  # otro proceso lo está reemplazando
+        return estados
+
+    def exportar(self):
+        """Texto de exposición de Prometheus con la suma de todos los procesos."""
+        series = {}  # nombre -> {etiquetas: valor}
+        for estado in self._estados():
+            vivo = estado['pid'] == os.getpid() or _proceso_vivo(estado['pid'])
+            for tipo in ('contadores', 'histogramas', 'medidores'):
+                if tipo == 'medidores' and not vivo:
+                    continue
+                for nombre, etiquetas, valor in estado[tipo]:
+                    clave = tuple(tuple(par) for par in etiquetas)
+                    por_etiquetas = series.setdefault(nombre, {})
+                    if tipo == 'histogramas':
+                        actual = por_etiquetas.setdefault(clave, [0] * len(valor))
+                        por_etiquetas[clave] = [a + b for a, b in zip(actual, valor)]
+                    else:
+                        por_etiquetas[clave] = por_etiquetas.get(clave, 0) + valor
+
+        lineas = []
+        for nombre in sorted(series):
+            tipo, ayuda = DESCRIPCIONES.get(nombre, ('untyped', ''))
+            lineas.append(f'# HELP {nombre} {ayuda}')
+            lineas.append(f'# TYPE {nombre} {tipo}')
+            for etiquetas, valor in sorted(series[nombre].items()):
+                if tipo != 'histogram':
+                    lineas.append(f'{nombre}{_etiquetas(etiquetas)} {_numero(valor)}')
+                    continue
+                acumulado = 0
+                for limite, cuenta in zip(CUBOS + (float('inf'),), valor[:-1]):
+                    acumulado += cuenta
+                    le = '+Inf' if limite == float('inf') else repr(limite)
+                    lineas.append(f'{nombre}_bucket{_etiquetas(etiquetas, ("le", le))} {acumulado}')
+                lineas.append(f'{nombre}_sum{_etiquetas(etiquetas)} {_numero(valor[-1])}')
+                lineas.append(f'{nombre}_count{_etiquetas(etiquetas)} {acumulado}')
+        return '\n'.join(lineas) + '\n'
+
+    def vista(self):
+        token = self.app.config['METRICAS_TOKEN']
+        if token and request.headers.get('Authorization') != f'Bearer {token}':
+            return {'message': 'No autorizado'}, 401
+        return Response(self.exportar(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+metricas = Metricas()
@@ -0,0 +1,110 @@
+from flask import current_app, request
+from sqlalchemy import or_, text
+
+
+class ParametroInvalido(ValueError):
+    """Error de validación de un parámetro de consulta (se responde con 400)."""
+
+
+def _entero(nombre, valor, minimo):
+    try:
+        numero = int(valor)
+    except (TypeError, ValueError):
+        raise ParametroInvalido(f"El parámetro '{nombre}' debe ser un número entero")
+    if numero < minimo:
+        raise ParametroInvalido(f"El parámetro '{nombre}' debe ser mayor o igual a {minimo}")
+    return numero
+
+
+def parametros_cursor(convertir_valor=None):
+    """
+    Lee ``after`` y ``limit`` de la query string.
+    Devuelve (after, limite); ``after`` es None en la primera página.
+
+    Al ordenar por una columna no única el cursor es ``valor,id`` (el que devuelve
+    paginar_keyset); ``convertir_valor`` interpreta el valor y after queda como (valor, id).
+    """
+    limite_defecto = current_app.config.get('PAGINACION_LIMITE_DEFECTO', 50)
+    limite_maximo = current_app.config.get('PAGINACION_LIMITE_MAXIMO', 500)
+
+    after = request.args.get('after')
+    if after in (None, ''):
+        after = None
+    elif convertir_valor is None:
+        after = _entero('after', after, 0)
+    else:
+        valor, _, ultimo_id = after.rpartition(',')
+        try:
+            after = (convertir_valor(valor), _entero('after', ultimo_id, 0))
+        except (ParametroInvalido, ValueError):
+            raise ParametroInvalido("El parámetro 'after' debe ser el cursor 'siguiente' de la página anterior")
+
+    limite = request.args.get('limit')
+    limite = _entero('limit', limite, 1) if limite not in (None, '') else limite_defecto
+    return after, min(limite, limite_maximo)
+
+
+def paginar_keyset(query, columna_id, after, limite, columna_orden=None, descendente=False):
+    """
+    Paginación por cursor sobre una columna única y creciente (normalmente el id).
+    Pide ``limite + 1`` filas para saber si hay una página siguiente sin hacer COUNT.
+    Devuelve (items, siguiente_cursor).
+
+    Con ``columna_orden`` se ordena por (columna_orden, id) y el cursor es ``valor,id`` de la
+    última fila. La condición se escribe como ``col >= v AND (col > v OR id > i)`` para que
+    el índice de la columna sirva como rango. Las filas con columna_orden NULL no se incluyen.
+    """
+    if columna_orden is None:
+        if after is not None:
+            query = query.filter(columna_id < after if descendente else columna_id > after)
+        orden = [columna_id]
+    else:
+        query = query.filter(columna_orden.isnot(None))
+        if after is not None:
+            valor, ultimo_id = after
+            if descendente:
+                query = query.filter(columna_orden <= valor, or_(columna_orden < valor, columna_id < ultimo_id))
+            else:
+                query = query.filter(columna_orden >= valor, or_(columna_orden > valor, columna_id > ultimo_id))
+        orden = [columna_orden, columna_id]
+    filas = query.order_by(*[c.desc() if descendente else c for c in orden]).limit(limite + 1).all()
+
+    siguiente = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        siguiente = getattr(filas[-1], columna_id.key)
+        if columna_orden is not None:
+            valor = getattr(filas[-1], columna_orden.key)
+            siguiente = f"{valor.isoformat() if hasattr(valor, 'isoformat') else valor},{siguiente}"
+    return filas, siguiente
+
+
+def _filas_estimadas(sesion, tabla):
+    """Filas de la tabla según las estadísticas del motor (sin recorrerla), o None."""
+    if sesion.get_bind().dialect.name != 'mysql':
+        return None
+    return sesion.execute(
+        text('SELECT TABLE_ROWS FROM information_schema.TABLES '
+             'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :tabla'),
+        {'tabla': tabla}
+    ).scalar()
+
+
+def contar(query, modo, tabla=None):
+    """
+    Total de filas de ``query`` para ``?total=``. Devuelve (total, aproximado).
+
+    - 'exacto': COUNT(*) completo.
+    - 'aproximado': sin filtros (``tabla`` dada) usa las estadísticas de MySQL; si no, cuenta
+      como mucho CONTEO_MAXIMO filas y, si hay más, devuelve ese máximo como aproximado.
+    """
+    query = query.order_by(None)
+    if modo == 'exacto':
+        return query.count(), False
+    if tabla is not None:
+        estimado = _filas_estimadas(query.session, tabla)
+        if estimado is not None:
+            return int(estimado), True
+    maximo = current_app.config.get('CONTEO_MAXIMO', 10000)
+    total = query.limit(maximo + 1).count()
+    return min(total, maximo), total > maximo
@@ -0,0 +1,153 @@
+"""
+Perfilado de una petición puntual en producción.
+
+Si PERFILADO_TOKEN tiene valor, una petición con la cabecera `X-Perfilar: <token>` (o el
+parámetro `?perfilar=<token>`) se ejecuta bajo cProfile y con una línea de tiempo de las
+sentencias SQL que hizo. El resultado se guarda en PERFILADO_DIR:
+
+- `<nombre>.prof`: estadísticas de cProfile (pstats, snakeviz, etc.).
+- `<nombre>.json`: resumen, funciones más costosas y línea de tiempo SQL.
+
+y la respuesta lleva la cabecera X-Perfil con el nombre. Con `perfilar_salida=inline` la
+respuesta se reemplaza por ese resumen en JSON (la petición se ejecuta igual, con sus efectos).
+
+Sin PERFILADO_TOKEN no se registra nada: ni hooks de Flask ni eventos de SQLAlchemy.
+"""
+from datetime import datetime
+import cProfile
+import hmac
+import io
+import json
+import logging
+import os
+import pstats
+import re
+import threading
+import time
+
+from flask import g, jsonify, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+CABECERA = 'X-Perfilar'
+PARAMETRO = 'perfilar'
+
+
+class Perfilador:
+    def __init__(self, app=None):
+        self.app = None
+        self._local = threading.local()
+        self._eventos_registrados = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['perfilador'] = self
+        if not app.config['PERFILADO_TOKEN']:
+            return
+        app.before_request(self._iniciar)
+        app.after_request(self._terminar)
+        app.teardown_request(self._descartar)
+        if not self._eventos_registrados:
+            event.listen(Engine, 'before_cursor_execute', self._antes_sql)
+            event.listen(Engine, 'after_cursor_execute', self._despues_sql)
+            self._eventos_registrados = True
+
+    def _autorizada(self):
+        token = request.headers.get(CABECERA) or request.args.get(PARAMETRO)
+        return bool(token) and hmac.compare_digest(token, self.app.config['PERFILADO_TOKEN'])
+
+    # --- línea de tiempo SQL (solo el hilo de la petición perfilada) ---
+
+    def _antes_sql(self, conexion, cursor, sentencia, parametros, contexto, varias):
+        sql = getattr(self._local, 'sql', None)
+        if sql is not None:
+            self._local.inicio_sql = time.perf_counter()
+
+    def _despues_sql(self, conexion, cursor, sentencia, parametros, contexto, varias):
+        sql = getattr(self._local, 'sql', None)
+        if sql is None:
+            return
+        fin = time.perf_counter()
+        inicio = getattr(self._local, 'inicio_sql', fin)
+        sql.append({
+            'inicio_ms': round((inicio - self._local.inicio) * 1000, 3),
+            'duracion_ms': round((fin - inicio) * 1000, 3),
+            'filas': cursor.rowcount,
+            'sentencia': ' '.join(sentencia.split())[:1000],
+        })
+
+    # --- hooks de la petición ---
+
+    def _iniciar(self):
+        if not self._autorizada():
+            return
+        perfil = cProfile.Profile()
+        try:
+            perfil.enable()
+        except ValueError:
+            # Otro perfilador ya está activo en este proceso
+            logger.warning("No se pudo perfilar %s %s: hay otro perfilador activo", request.method, request.path)
+            return
+        g.perfil = perfil
+        self._local.inicio = time.perf_counter()
+        self._local.sql = []
+
+    def _detener(self):
+        perfil = g.pop('perfil', None)
+        if perfil is None:
+            return None, None
+        perfil.disable()
+        sql, self._local.sql = self._local.sql, None
+        return perfil, sql
+
+    def _descartar(self, error=None):
+        # Si la petición terminó con una excepción after_request no llegó a correr
+        self._detener()
+
+    def _terminar(self, respuesta):
+        perfil, sql = self._detener()
+        if perfil is None:
+            return respuesta
+        duracion = time.perf_counter() - self._local.inicio
+
+        texto = io.StringIO()
+        estadisticas = pstats.Stats(perfil, stream=texto)
+        estadisticas.sort_stats('cumulative').print_stats(self.app.config['PERFILADO_FUNCIONES'])
+        resumen = {
+            'metodo': request.method,
+            'ruta': request.path,
+            # Sin el token
+            'parametros': {k: v for k, v in request.args.items() if k not in (PARAMETRO, 'perfilar_salida')},
+            'estado': respuesta.status_code,
+            'duracion_ms': round(duracion * 1000, 3),
+            'sql_consultas': len(sql),
+            'sql_duracion_ms': round(sum(s['duracion_ms'] for s in sql), 3),
+            'funciones': texto.getvalue(),
+            'sql': sql,
+        }
+
+        nombre = '{}_{}_{}_{}'.format(
+            datetime.now().strftime('%Y%m%d-%H%M%S-%f'), request.method,
+            re.sub(r'[^A-Za-z0-9]+', '-', request.path).strip('-') or 'raiz', os.getpid()
+        )
+        directorio = self.app.config['PERFILADO_DIR']
+        try:
+            os.makedirs(directorio, exist_ok=True)
+            estadisticas.dump_stats(os.path.join(directorio, f'{nombre}.prof'))
+            with open(os.path.join(directorio, f'{nombre}.json'), 'w', encoding='utf-8') as f:
+                json.dump(resumen, f, indent=2, ensure_ascii=False)
+        except OSError:
+            logger.exception("No se pudo guardar el perfil %s", nombre)
+        logger.info("Perfil %s: %.1f ms, %d consultas SQL", nombre, duracion * 1000, len(sql))
+
+        if request.args.get('perfilar_salida') == 'inline':
+            respuesta = jsonify(resumen)
+        respuesta.headers['X-Perfil'] = nombre
+        return respuesta
+
+
+perfilador = Perfilador()
@@ -0,0 +1,154 @@
+"""
+Plantilla DOCX precompilada.
+
+La plantilla se lee una sola vez: en cada parte de texto (cuerpo, tablas, encabezados, pies,
+notas) se unen los marcadores {{clave}} que Word partió en varios runs, y el XML resultante
+se guarda cortado en segmentos alrededor de cada marcador. Renderizar es solo intercalar los
+valores escapados entre esos segmentos y copiar el resto del ZIP tal cual.
+"""
+from xml.sax.saxutils import escape
+import os
+import re
+import threading
+import zipfile
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+XML_NS = 'http://www.w3.org/XML/1998/namespace'
+W_P = f'{{{W_NS}}}p'
+W_T = f'{{{W_NS}}}t'
+
+PARTES_TEXTO = re.compile(r'^word/(document|header\d*|footer\d*|footnotes|endnotes)\.xml$')
+MARCADOR = re.compile(r'\{\{\s*([A-Za-z0-9_]+)\s*\}\}')
+
+
+def _unir_marcadores(raiz):
+    """
+    Deja cada marcador completo dentro de un único <w:t>, aunque Word lo haya repartido
+    entre varios runs (por ejemplo alrededor de una marca de ortografía).
+    Devuelve cuántos marcadores se encontraron.
+    """
+    # Agrupar los <w:t> por su párrafo más cercano (los cuadros de texto tienen párrafos anidados)
+    parrafos = {}
+    for nodo in raiz.iter(W_T):
+        padre = nodo.getparent()
+        while padre is not None and padre.tag != W_P:
+            padre = padre.getparent()
+        if padre is not None:
+            parrafos.setdefault(padre, []).append(nodo)
+
+    total = 0
+    for nodos in parrafos.values():
+        textos = [n.text or '' for n in nodos]
+        texto = ''.join(textos)
+        if '{{' not in texto:
+            continue
+
+        inicios = []
+        posicion = 0
+        for t in textos:
+            inicios.append(posicion)
+            posicion += len(t)
+
+        def nodo_en(pos):
+            for i in range(len(nodos) - 1, -1, -1):
+                if inicios[i] <= pos:
+                    return i
+            return 0
+
+        coincidencias = list(MARCADOR.finditer(texto))
+        total += len(coincidencias)
+        # De atrás hacia adelante, para que los desplazamientos previos sigan siendo válidos
+        for m in reversed(coincidencias):
+            a = nodo_en(m.start())
+            b = nodo_en(m.end() - 1)
+            marcador = '{{' + m.group(1) + '}}'
+            if a == b:
+                t = nodos[a].text
+                nodos[a].text = t[:m.start() - inicios[a]] + marcador + t[m.end() - inicios[a]:]
+            else:
+                nodos[a].text = nodos[a].text[:m.start() - inicios[a]] + marcador
+                for k in range(a + 1, b):
+                    nodos[k].text = ''
+                nodos[b].text = nodos[b].text[m.end() - inicios[b]:]
+            nodos[a].set(f'{{{XML_NS}}}space', 'preserve')
+    return total
+
+
+class PlantillaCompilada:
+    """Plantilla DOCX lista para renderizar sin volver a analizar el XML."""
+
+    def __init__(self, path):
+        self.path = path
+        stat = os.stat(path)
+        self.firma = (stat.st_mtime_ns, stat.st_size)
+        # [(ZipInfo, bytes)] para partes estáticas o [(ZipInfo, [segmentos])] para partes con marcadores
+        self.partes = []
+        # clave -> partes donde aparece (ej. {'fecha': ['word/document.xml']})
+        self.marcadores = {}
+
+        with zipfile.ZipFile(path) as origen:
+            for info in origen.infolist():
+                contenido = origen.read(info.filename)
+                if PARTES_TEXTO.match(info.filename):
+                    segmentos = self._compilar_parte(info.filename, contenido)
+                    if segmentos is not None:
+                        self.partes.append((info, segmentos))
+                        continue
+                self.partes.append((info, contenido))
+
+    def _compilar_parte(self, nombre, contenido):
+        # lxml solo hace falta al compilar, que ocurre una vez por proceso de renderizado
+        from lxml import etree
+
+        raiz = etree.fromstring(contenido)
+        if not _unir_marcadores(raiz):
+            return None
+        xml = etree.tostring(raiz, xml_declaration=True, encoding='UTF-8', standalone=True).decode('utf-8')
+
+        # Segmentos alternados: texto fijo, clave, texto fijo, clave, ..., texto fijo
+        segmentos = []
+        ultimo = 0
+        for m in MARCADOR.finditer(xml):
+            segmentos.append(xml[ultimo:m.start()])
+            segmentos.append(m.group(1))
+            self.marcadores.setdefault(m.group(1), [])
+            if nombre not in self.marcadores[m.group(1)]:
+                self.marcadores[m.group(1)].append(nombre)
+            ultimo = m.end()
+        segmentos.append(xml[ultimo:])
+        return segmentos
+
+    def renderizar(self, datos, salida):
+        """Escribe el DOCX con los valores de ``datos``; los marcadores sin valor quedan intactos."""
+        valores = {clave: escape(str(valor)) for clave, valor in datos.items()}
+        with zipfile.ZipFile(salida, 'w', zipfile.ZIP_DEFLATED) as destino:
+            for info, contenido in self.partes:
+                if isinstance(contenido, list):
+                    partes = contenido[:]
+                    for i in range(1, len(partes), 2):
+                        clave = partes[i]
+                        partes[i] = valores.get(clave, '{{' + clave + '}}')
+                    contenido = ''.join(partes).encode('utf-8')
+                destino.writestr(info, contenido)
+        return salida
+
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def obtener_plantilla(path):
+    """
+    Devuelve la plantilla compilada, recompilándola solo si el archivo cambió
+    (se compara mtime y tamaño en cada llamada, que es un stat barato).
+    """
+    stat = os.stat(path)
+    firma = (stat.st_mtime_ns, stat.st_size)
+    plantilla = _cache.get(path)
+    if plantilla is None or plantilla.firma != firma:
+        with _lock:
+            plantilla = _cache.get(path)
+            if plantilla is None or plantilla.firma != firma:
+                plantilla = PlantillaCompilada(path)
+                _cache[path] = plantilla
+    return plantilla
@@ -0,0 +1,226 @@
+"""
+Generación de los documentos DOCX fuera del hilo de la petición.
+
+Cada certificado tiene un registro TrabajoRender (pendiente -> procesando -> terminado/fallido)
+que se crea en la misma transacción que el certificado. Al confirmar, el trabajo se envía a
+un pool de procesos: generar el DOCX es trabajo de CPU y así escala con los núcleos sin
+bloquear a los workers WSGI.
+"""
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import traceback
+
+from ..modelos import db, TrabajoRender
+from .cache_documentos import cache_documentos, version_datos
+from .compresion import compresion
+from .conversion import conversor_pdf
+from .metricas import metricas
+from .plantilla import obtener_plantilla
+
+logger = logging.getLogger(__name__)
+
+PENDIENTE = 'pendiente'
+PROCESANDO = 'procesando'
+TERMINADO = 'terminado'
+FALLIDO = 'fallido'
+
+
+def precompilar_plantilla(plantilla_path):
+    """Inicializador de cada proceso del pool: compila la plantilla antes del primer trabajo."""
+    if os.path.exists(plantilla_path):
+        obtener_plantilla(plantilla_path)
+
+
+def renderizar_documento(plantilla_path, salida_path, datos):
+    """
+    Reemplaza los marcadores {{clave}} de la plantilla y guarda el DOCX.
+    Se ejecuta en un proceso del pool, por eso es una función de módulo sin estado;
+    la plantilla compilada queda en caché dentro de cada proceso.
+    """
+    if not os.path.exists(plantilla_path):
+        raise FileNotFoundError(f"Plantilla no encontrada en: {plantilla_path}")
+
+    # Se escribe a un temporal y se renombra para no servir nunca un archivo a medias
+    os.makedirs(os.path.dirname(salida_path), exist_ok=True)
+    temporal = f"{salida_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    obtener_plantilla(plantilla_path).renderizar(datos, temporal)
+    os.replace(temporal, salida_path)
+    return salida_path
+
+
+class ColaRenderizado:
+    """
+    Pool de renderizado con estado persistente en la tabla trabajo_render.
+
+    RENDER_PROCESOS fija el número de procesos; con 0 el documento se genera en el mismo
+    hilo de la petición (útil en desarrollo y pruebas).
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._procesos = None
+        self._despachador = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['cola_renderizado'] = self
+
+    @property
+    def plantilla_path(self):
+        return self.app.config['PLANTILLA_CERTIFICADO']
+
+    def _datos(self, trabajo):
+        datos = json.loads(trabajo.datos)
+        datos.setdefault('id_certificado', trabajo.certificado_id)
+        return datos
+
+    def ruta_documento(self, trabajo):
+        """Ruta del DOCX en la caché para la versión actual de los datos del trabajo."""
+        return cache_documentos.ruta(trabajo.certificado_id, version_datos(self._datos(trabajo)))
+
+    def ultimo_trabajo(self, certificado_id):
+        return (
+            TrabajoRender.query
+            .filter_by(certificado_id=certificado_id)
+            .order_by(TrabajoRender.id.desc())
+            .first()
+        )
+
+    def _ejecutores(self):
+        # Se crean al primer uso: importar la app no debe lanzar procesos
+        if self._procesos is None:
+            workers = self.app.config['RENDER_PROCESOS']
+            self._procesos = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=precompilar_plantilla,
+                initargs=(self.plantilla_path,)
+            )
+            # Un hilo por proceso: el hilo marca el trabajo como 'procesando' justo antes de
+            # que un proceso quede libre para él, y escribe el resultado al terminar.
+            self._despachador = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='render')
+        return self._procesos, self._despachador
+
+    def crear_trabajo(self, certificado, datos):
+        """Agrega el trabajo a la sesión actual; se confirma junto con el certificado."""
+        trabajo = TrabajoRender(certificado=certificado, estado=PENDIENTE, datos=json.dumps(datos))
+        db.session.add(trabajo)
+        return trabajo
+
+    def actualizar_datos(self, certificado, cambios, datos_actuales):
+        """
+        Aplica cambios a los datos del documento de un certificado (en la sesión actual).
+        El archivo no se regenera aquí: se hará en la próxima descarga.
+
+        Los certificados anteriores a los trabajos de renderizado no tienen datos guardados:
+        ``datos_actuales()`` los arma desde la base y se crea su primer trabajo con ellos.
+        """
+        trabajo = self.ultimo_trabajo(certificado.id)
+        if trabajo is None:
+            trabajo = self.crear_trabajo(certificado, datos_actuales())
+        datos = json.loads(trabajo.datos)
+        datos.update(cambios)
+        trabajo.datos = json.dumps(datos)
+        trabajo.estado = PENDIENTE
+        trabajo.error = None
+        return trabajo
+
+    def enviar(self, trabajo_id):
+        """Envía un trabajo ya confirmado en la base de datos."""
+        if not self.app.config['RENDER_PROCESOS']:
+            self._ejecutar(trabajo_id, en_linea=True)
+            return
+        _, despachador = self._ejecutores()
+        despachador.submit(self._ejecutar_en_contexto, trabajo_id)
+
+    def _ejecutar_en_contexto(self, trabajo_id):
+        with self.app.app_context():
+            self._ejecutar(trabajo_id)
+
+    def _ejecutar(self, trabajo_id, en_linea=False):
+        trabajo = TrabajoRender.query.get(trabajo_id)
+        if trabajo is None:
+            # El certificado se eliminó antes de que el trabajo empezara
+            return FALLIDO, 'El trabajo de renderizado no existe'
+        trabajo.estado = PROCESANDO
+        db.session.commit()
+
+        ruta = self.ruta_documento(trabajo)
+        argumentos = (self.plantilla_path, ruta, self._datos(trabajo))
+        inicio = time.perf_counter()
+        try:
+            if en_linea:
+                renderizar_documento(*argumentos)
+            else:
+                procesos, _ = self._ejecutores()
+                procesos.submit(renderizar_documento, *argumentos).result()
+            cache_documentos.registrar(ruta)
+            compresion.precomprimir(ruta)
+            estado, error = TERMINADO, None
+        except Exception as e:
+            logger.error("Error al generar el documento del trabajo %s:\n%s", trabajo_id, traceback.format_exc())
+            estado, error = FALLIDO, str(e)
+        metricas.observar('docx_render_duracion_segundos', time.perf_counter() - inicio, resultado=estado)
+
+        trabajo = TrabajoRender.query.get(trabajo_id)
+        if trabajo is not None:
+            trabajo.estado = estado
+            trabajo.error = error
+            db.session.commit()
+        return estado, error
+
+    def ruta_vigente(self, certificado_id):
+        """
+        Ruta que tendría el DOCX vigente, sin generarlo (sirve para responder 304 antes de
+        tocar el disco). Devuelve None si el certificado no tiene documento.
+        """
+        trabajo = self.ultimo_trabajo(certificado_id)
+        if trabajo is None:
+            heredada = cache_documentos.ruta_heredada(certificado_id)
+            return heredada if os.path.exists(heredada) else None
+        return self.ruta_documento(trabajo)
+
+    def documento(self, certificado_id):
+        """
+        Ruta del DOCX vigente de un certificado. Si no está en la caché (nunca se generó,
+        fue invalidado o desalojado) se vuelve a generar en este momento y se espera el
+        resultado. Devuelve None si el certificado no tiene documento.
+        """
+        trabajo = self.ultimo_trabajo(certificado_id)
+        if trabajo is None:
+            # Certificados creados antes de los trabajos de renderizado
+            return cache_documentos.obtener(cache_documentos.ruta_heredada(certificado_id))
+
+        ruta = cache_documentos.obtener(self.ruta_documento(trabajo))
+        if ruta:
+            return ruta
+
+        estado, error = self._ejecutar(trabajo.id, en_linea=not self.app.config['RENDER_PROCESOS'])
+        if estado != TERMINADO:
+            raise RuntimeError(error)
+        return self.ruta_documento(trabajo)
+
+    def documento_pdf(self, certificado_id):
+        """
+        Igual que documento() pero en PDF. El PDF comparte nombre (y por lo tanto versión)
+        con el DOCX del que sale. Puede lanzar ErrorConversion.
+        """
+        ruta_docx = self.documento(certificado_id)
+        if not ruta_docx:
+            return None
+        ruta_pdf = os.path.splitext(ruta_docx)[0] + '.pdf'
+        if not cache_documentos.obtener(ruta_pdf):
+            conversor_pdf.convertir(ruta_docx, ruta_pdf)
+            cache_documentos.registrar(ruta_pdf)
+            compresion.precomprimir(ruta_pdf)
+        return ruta_pdf
+
+
+cola_renderizado = ColaRenderizado()
@@ -0,0 +1,232 @@
+"""
+Resúmenes para los reportes de gestión.
+
+resumen_mensual (mes, estado), resumen_operario (mes, nombre_operario) y
+resumen_tipo_servicio (mes, descripción) guardan cuántos certificados o trabajos hubo y los
+ingresos (suma de DetalleServicio.precio de su orden). Los endpoints de /reportes leen solo
+estas tablas, que tienen a lo sumo unas decenas de filas por mes.
+
+Se mantienen con deltas: antes de cada flush se resta lo que aportaban los certificados
+que cambian (leído de la base, todavía sin el cambio), después del flush se suma lo que
+aportan ahora, y justo antes del commit las diferencias se aplican con un upsert
+(columna = columna + delta) en la misma transacción. Cambiar el estado de un certificado
+mueve su aporte de una fila a otra; borrarlo lo resta. La resta se lee con SELECT ... FOR
+UPDATE, y PUT/DELETE /certificados/<id> bloquean la fila antes de cambiarla: dos transacciones
+sobre el mismo certificado no pueden restar las dos el mismo aporte anterior.
+
+Lo que se modifique por fuera de la sesión (SQL a mano, bulk update) no se ve:
+`flask reconstruir-reportes` recalcula todo desde cero.
+"""
+from collections import defaultdict
+
+from sqlalchemy import delete, event, inspect, or_, select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from ..modelos import (
+    Certificado, DetalleServicio, OrdenServicio, ResumenMensual, ResumenOperario, ResumenTipoServicio,
+    TipoServicio
+)
+from ..modelos.sesion import SesionEnrutada
+
+# Resumen -> columna con la cantidad (la otra es siempre ingresos)
+CANTIDAD = {ResumenMensual: 'certificados', ResumenOperario: 'trabajos', ResumenTipoServicio: 'trabajos'}
+
+# Modelo -> (columnas que cambian los resúmenes, atributo con el id, tipo de id)
+DEPENDENCIAS = {
+    Certificado: (('fecha', 'estado', 'orden_servicio_id'), 'id', 'certificados'),
+    OrdenServicio: (('tipo_servicio_id',), 'id', 'ordenes'),
+    DetalleServicio: (('precio', 'nombre_operario', 'orden_servicio_id'), 'orden_servicio_id', 'ordenes'),
+}
+
+# Claves de session.info
+DELTAS = 'reportes_deltas'
+AFECTADOS = 'reportes_afectados'
+
+INSERTAR = {'mysql': mysql.insert, 'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+_upserts = {}
+
+
+def _consulta(condicion):
+    """Una fila por (certificado, detalle de su orden), con lo necesario para calcular su aporte."""
+    return (
+        select(Certificado.id, Certificado.fecha, Certificado.estado, TipoServicio.descripcion,
+               DetalleServicio.id, DetalleServicio.nombre_operario, DetalleServicio.precio)
+        .join(OrdenServicio, OrdenServicio.id == Certificado.orden_servicio_id)
+        .outerjoin(TipoServicio, TipoServicio.id == OrdenServicio.tipo_servicio_id)
+        .outerjoin(DetalleServicio, DetalleServicio.orden_servicio_id == OrdenServicio.id)
+        .where(condicion, Certificado.fecha.isnot(None))
+    )
+
+
+def aportes(filas, signo=1, deltas=None):
+    """
+    Suma a ``deltas`` ({(resumen, clave primaria): [cantidad, ingresos]}) lo que aportan los
+    certificados de ``filas`` (resultado de _consulta), multiplicado por ``signo``.
+    """
+    deltas = defaultdict(lambda: [0, 0]) if deltas is None else deltas
+    certificados = {}
+    for certificado_id, fecha, estado, tipo, detalle_id, operario, precio in filas:
+        operarios = certificados.setdefault(
+            certificado_id, (fecha.replace(day=1), (estado or '', tipo or ''), {})
+        )[2]
+        if detalle_id is not None:
+            operarios[operario or ''] = operarios.get(operario or '', 0) + (precio or 0)
+
+    def sumar(clave, ingresos):
+        delta = deltas[clave]
+        delta[0] += signo
+        delta[1] += signo * ingresos
+
+    for mes, (estado, tipo), operarios in certificados.values():
+        ingresos = sum(operarios.values())
+        sumar((ResumenMensual, (mes, estado)), ingresos)
+        sumar((ResumenTipoServicio, (mes, tipo)), ingresos)
+        for operario, ingresos_operario in operarios.items():
+            sumar((ResumenOperario, (mes, operario)), ingresos_operario)
+    return deltas
+
+
+def _filas_en_memoria(certificados):
+    """Las mismas filas de _consulta, armadas con objetos recién creados (sin consultar la base)."""
+    for certificado in certificados:
+        if certificado.fecha is None:
+            continue
+        orden = certificado.orden_servicio
+        tipo = orden.tipo_servicio.descripcion if orden.tipo_servicio is not None else None
+        base = (certificado.id, certificado.fecha, certificado.estado, tipo)
+        if not orden.detalles_servicio:
+            yield base + (None, None, None)
+        for detalle in orden.detalles_servicio:
+            yield base + (detalle.id, detalle.nombre_operario, detalle.precio)
+
+
+def _aportes_de(conexion, afectados, signo, deltas):
+    condiciones = []
+    if afectados['certificados']:
+        condiciones.append(Certificado.id.in_(sorted(afectados['certificados'])))
+    if afectados['ordenes']:
+        condiciones.append(Certificado.orden_servicio_id.in_(sorted(afectados['ordenes'])))
+    if condiciones:
+        consulta = _consulta(or_(*condiciones))
+        if signo < 0:
+            # Lectura con bloqueo: en MySQL (REPEATABLE READ) ve lo último confirmado, no la
+            # foto del inicio de la transacción, y espera a quien esté cambiando los mismos certificados
+            consulta = consulta.with_for_update(of=Certificado)
+        aportes(conexion.execute(consulta), signo, deltas)
+
+
+def _upsert(dialecto, resumen):
+    clave = (dialecto, resumen)
+    if clave not in _upserts:
+        tabla = resumen.__table__
+        cantidad = CANTIDAD[resumen]
+        sentencia = INSERTAR[dialecto](tabla)
+        if dialecto == 'mysql':
+            sentencia = sentencia.on_duplicate_key_update({
+                cantidad: tabla.c[cantidad] + sentencia.inserted[cantidad],
+                'ingresos': tabla.c.ingresos + sentencia.inserted.ingresos,
+            })
+        else:
+            sentencia = sentencia.on_conflict_do_update(index_elements=list(tabla.primary_key), set_={
+                cantidad: tabla.c[cantidad] + sentencia.excluded[cantidad],
+                'ingresos': tabla.c.ingresos + sentencia.excluded.ingresos,
+            })
+        _upserts[clave] = sentencia
+    return _upserts[clave]
+
+
+def aplicar(conexion, deltas):
+    """Suma los deltas a las tablas de resumen: un upsert (executemany) por tabla."""
+    filas = defaultdict(list)
+    for (resumen, clave), (cantidad, ingresos) in deltas.items():
+        if cantidad or ingresos:
+            columnas = [columna.key for columna in resumen.__table__.primary_key]
+            filas[resumen].append({**dict(zip(columnas, clave)), CANTIDAD[resumen]: cantidad, 'ingresos': ingresos})
+    for resumen, valores in filas.items():
+        conexion.execute(_upsert(conexion.dialect.name, resumen), valores)
+
+
+def reconstruir(conexion, lote=1000):
+    """Vacía los resúmenes y los recalcula recorriendo los certificados por lotes de ids."""
+    for resumen in CANTIDAD:
+        conexion.execute(delete(resumen.__table__))
+    deltas = defaultdict(lambda: [0, 0])
+    total = 0
+    ultimo = 0
+    while True:
+        ids = conexion.execute(
+            select(Certificado.id).where(Certificado.id > ultimo).order_by(Certificado.id).limit(lote)
+        ).scalars().all()
+        if not ids:
+            break
+        # Cada lote trae todos los detalles de sus certificados: ninguno queda partido
+        aportes(conexion.execute(_consulta(Certificado.id.between(ids[0], ids[-1]))), deltas=deltas)
+        total += len(ids)
+        ultimo = ids[-1]
+    aplicar(conexion, deltas)
+    return total
+
+
+# --- mantenimiento automático desde la sesión ---
+
+def _afectados(sesion):
+    """Certificados y órdenes persistentes cuyo aporte puede cambiar en este flush."""
+    afectados = {'certificados': set(), 'ordenes': set()}
+    for objetos, cambio in ((sesion.dirty, 'modificado'), (sesion.deleted, 'borrado'), (sesion.new, 'nuevo')):
+        for objeto in objetos:
+            columnas, atributo, tipo = DEPENDENCIAS.get(type(objeto), (None, None, None))
+            if tipo is None:
+                continue
+            if cambio == 'nuevo':
+                # Lo nuevo solo cambia aportes ya guardados si es un detalle de una orden existente
+                orden = getattr(objeto, 'orden_servicio', None) if isinstance(objeto, DetalleServicio) else None
+                if orden is not None and inspect(orden).persistent:
+                    afectados['ordenes'].add(orden.id)
+                continue
+            estado = inspect(objeto)
+            if cambio == 'modificado' and not any(estado.attrs[c].history.has_changes() for c in columnas):
+                continue
+            # Antes y después de cambiar de orden hay que recalcular las dos
+            historia = estado.attrs[atributo].history
+            afectados[tipo].update(historia.added, historia.deleted, historia.unchanged)
+    for ids in afectados.values():
+        ids.discard(None)
+    return afectados
+
+
+@event.listens_for(SesionEnrutada, 'before_flush')
+def _restar_aportes(sesion, contexto, instancias):
+    afectados = _afectados(sesion)
+    sesion.info[AFECTADOS] = afectados
+    if afectados['certificados'] or afectados['ordenes']:
+        deltas = sesion.info.setdefault(DELTAS, defaultdict(lambda: [0, 0]))
+        _aportes_de(sesion.connection(bind_arguments={'mapper': Certificado.__mapper__}), afectados, -1, deltas)
+
+
+@event.listens_for(SesionEnrutada, 'after_flush')
+def _sumar_aportes(sesion, contexto):
+    afectados = sesion.info.pop(AFECTADOS, None) or {'certificados': set(), 'ordenes': set()}
+    nuevos = [o for o in sesion.new if isinstance(o, Certificado)]
+    # Un certificado nuevo con su orden nueva (POST /certificados) está completo en memoria
+    en_memoria = [c for c in nuevos if c.orden_servicio in sesion.new]
+    afectados['certificados'].update(c.id for c in nuevos if c not in en_memoria)
+    if not (en_memoria or afectados['certificados'] or afectados['ordenes']):
+        return
+    deltas = sesion.info.setdefault(DELTAS, defaultdict(lambda: [0, 0]))
+    aportes(_filas_en_memoria(en_memoria), 1, deltas)
+    _aportes_de(sesion.connection(bind_arguments={'mapper': Certificado.__mapper__}), afectados, 1, deltas)
+
+
+@event.listens_for(SesionEnrutada, 'before_commit')
+def _aplicar_deltas(sesion):
+    # commit() hace su flush después de este evento; se adelanta para ver todos los cambios
+    sesion.flush()
+    deltas = sesion.info.pop(DELTAS, None)
+    if deltas:
+        aplicar(sesion.connection(bind_arguments={'mapper': Certificado.__mapper__}), deltas)
+
+
+@event.listens_for(SesionEnrutada, 'after_soft_rollback')
+def _descartar_deltas(sesion, transaccion_anterior):
+    sesion.info.pop(DELTAS, None)
+    sesion.info.pop(AFECTADOS, None)
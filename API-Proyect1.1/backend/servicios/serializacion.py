@@ -0,0 +1,99 @@
+"""
+Serialización compilada de los esquemas de marshmallow.
+
+schema.dump() recorre por cada objeto y cada campo la maquinaria genérica de marshmallow
+(get_attribute, serialize, el esquema anidado de turno...). compilar(schema) genera una
+sola vez el código Python equivalente para ese esquema concreto: una función por esquema
+que arma el diccionario leyendo los atributos directamente, con los anidados llamando a su
+propia función compilada.
+
+El resultado es el mismo diccionario, con las mismas claves en el mismo orden (se toma de
+schema.dump_fields de la misma instancia), así que el JSON que sale es idéntico byte a byte.
+Los tipos de campo que no se reconocen, y los esquemas con @pre_dump/@post_dump, se siguen
+serializando con marshmallow.
+"""
+import itertools
+
+from marshmallow import fields, missing, utils
+from marshmallow.decorators import POST_DUMP, PRE_DUMP
+
+_contador = itertools.count()
+
+
+def _texto(valor):
+    return valor if type(valor) is str else utils.ensure_text_type(valor)
+
+
+def _entero(valor):
+    return valor if type(valor) is int else int(valor)
+
+
+class EsquemaCompilado:
+    """Reemplazo de un esquema para dump(): mismo resultado, sin la maquinaria por campo."""
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.many = schema.many
+        self._volcar = _compilar_objeto(schema)
+
+    def dump(self, obj, *, many=None):
+        many = self.many if many is None else many
+        if many:
+            volcar = self._volcar
+            return [volcar(o) for o in obj]
+        return self._volcar(obj)
+
+
+def _compilar_objeto(schema):
+    """Devuelve una función objeto -> dict para una instancia de esquema (sin ``many``)."""
+    if schema._has_processors(PRE_DUMP) or schema._has_processors(POST_DUMP):
+        return lambda obj: schema.dump(obj, many=False)
+
+    # Los atributos se leen directamente solo si se sabe que el modelo los tiene
+    modelo = getattr(schema.opts, 'model', None)
+    entorno = {'_missing': missing, '_texto': _texto, '_entero': _entero}
+    lineas = ['def volcar(obj):', '    d = {}']
+    for nombre, campo in schema.dump_fields.items():
+        clave = repr(campo.data_key if campo.data_key is not None else nombre)
+        atributo = campo.attribute or nombre
+        tipo = type(campo)
+        if modelo is not None and atributo.isidentifier() and not hasattr(modelo, atributo):
+            # marshmallow omite la clave cuando el objeto no tiene el atributo
+            continue
+        simple = modelo is not None and atributo.isidentifier()
+
+        if simple and tipo is fields.Integer and not campo.as_string:
+            lineas.append(f'    v = obj.{atributo}')
+            lineas.append(f'    d[{clave}] = None if v is None else _entero(v)')
+        elif simple and tipo is fields.String:
+            lineas.append(f'    v = obj.{atributo}')
+            lineas.append(f'    d[{clave}] = None if v is None else _texto(v)')
+        elif simple and tipo in (fields.Date, fields.DateTime) and campo.format in (None, 'iso'):
+            lineas.append(f'    v = obj.{atributo}')
+            lineas.append(f'    d[{clave}] = None if v is None else v.isoformat()')
+        elif simple and tipo is fields.Nested:
+            anidado = campo.schema
+            funcion = f'_anidado_{next(_contador)}'
+            entorno[funcion] = _compilar_objeto(anidado)
+            lineas.append(f'    v = obj.{atributo}')
+            if anidado.many or campo.many:
+                lineas.append(f'    d[{clave}] = None if v is None else [{funcion}(x) for x in v]')
+            else:
+                lineas.append(f'    d[{clave}] = None if v is None else {funcion}(v)')
+        else:
+            # Cualquier otro campo: marshmallow, con el mismo acceso a atributos que dump()
+            variable = f'_campo_{next(_contador)}'
+            entorno[variable] = campo
+            entorno['_acceso'] = schema.get_attribute
+            lineas.append(f'    v = {variable}.serialize({nombre!r}, obj, accessor=_acceso)')
+            lineas.append('    if v is not _missing:')
+            lineas.append(f'        d[{clave}] = v')
+    lineas.append('    return d')
+
+    codigo = '\n'.join(lineas)
+    exec(compile(codigo, f'<volcar {type(schema).__name__}>', 'exec'), entorno)
+    return entorno['volcar']
+
+
+def compilar(schema):
+    return EsquemaCompilado(schema)
@@ -1,3 +1,6 @@
 from .vista_rol import *
 from .vista_certificado import *
+from .vista_exportacion import *
 from .vistas_usuarios import *
+from .vista_busqueda import *
+from .vista_reportes import *
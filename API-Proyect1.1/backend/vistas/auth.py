@@ -1,7 +1,11 @@
 from flask import request, jsonify, Blueprint, current_app
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.exc import IntegrityError
 from flask_jwt_extended import create_access_token
-from ..modelos import db, Usuario, Rol
+from sqlalchemy.orm import joinedload
+from ..modelos import db, Usuario
+from ..servicios.cache_usuarios import cache_usuarios
+from ..servicios.catalogo_roles import catalogo_roles
+from ..servicios.contrasenas import HashSaturado
 
 auth_blueprint = Blueprint('auth', __name__)
 
@@ -10,7 +14,7 @@ def registro():
     data = request.get_json()
     try:
         rol_nombre = data['rol']
-        rol = Rol.query.filter_by(nombre=rol_nombre).first()
+        rol = catalogo_roles.por_nombre(rol_nombre)
         if not rol:
             return {"mensaje": f"No existe el rol {rol_nombre}"}, 400
 
@@ -18,8 +22,8 @@ def registro():
             nombre=data['nombre'],
             direccion=data['direccion'],
             telefono=data['telefono'],
-            contrasena_hash=generate_password_hash(data['contrasena']),
-            rol_id=rol.id
+            contrasena=data['contrasena'],
+            rol_id=rol['id']
         )
         db.session.add(nuevo)
         db.session.commit()
@@ -27,6 +31,12 @@ def registro():
         return {"mensaje": "Usuario registrado exitosamente"}, 201
     except KeyError as e:
         return {"mensaje": f"Falta el campo: {e}"}, 400
+    except HashSaturado as e:
+        db.session.rollback()
+        return {"mensaje": str(e)}, 503, {'Retry-After': '1'}
+    except IntegrityError:
+        db.session.rollback()
+        return {"mensaje": f"Ya existe un usuario con el nombre {data['nombre']}"}, 409
     except Exception as e:
         db.session.rollback()
         return {"mensaje": "Error al registrar", "error": str(e)}, 500
@@ -38,10 +48,18 @@ def login():
     if not data or 'nombre' not in data or 'contrasena' not in data:
         return {"mensaje": "Faltan nombre o contraseña"}, 400
 
-    usuario = Usuario.query.filter_by(nombre=data['nombre']).first()
+    usuario = Usuario.query.options(joinedload(Usuario.rol)).filter_by(nombre=data['nombre']).first()
+
+    try:
+        valida = usuario is not None and usuario.verificar_contrasena(data['contrasena'])
+    except HashSaturado as e:
+        return {"mensaje": str(e)}, 503, {'Retry-After': '1'}
 
-    if usuario and check_password_hash(usuario.contrasena_hash, data['contrasena']):
-        rol_nombre = usuario.get_rol_nombre()
+    if valida:
+        if db.session.is_modified(usuario):
+            # El hash se actualizó a la política vigente
+            db.session.commit()
+        rol_nombre = cache_usuarios.guardar(usuario)['rol']
         token = create_access_token(identity=str(usuario.id),
                                     additional_claims={'rol': rol_nombre})
         return jsonify({
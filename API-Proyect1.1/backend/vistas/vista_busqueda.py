@@ -0,0 +1,65 @@
+from flask import request
+from flask_restful import Resource
+from backend.modelos import solo_lectura
+from backend.servicios import busqueda
+from backend.servicios.paginacion import ParametroInvalido, parametros_cursor
+from flasgger.utils import swag_from
+
+
+class VistaBuscarCertificados(Resource):
+    @swag_from({
+        'tags': ['Certificados'],
+        'parameters': [
+            {'name': 'q', 'in': 'query', 'type': 'string', 'required': True,
+             'description': 'Palabras a buscar (todas, como prefijo) en producto aplicado, ingrediente '
+                            'activo, dosis, nombre del operario y precaución'},
+            {'name': 'after', 'in': 'query', 'type': 'integer', 'required': False,
+             'description': "Cursor: el valor 'siguiente' de la página anterior"},
+            {'name': 'limit', 'in': 'query', 'type': 'integer', 'required': False}
+        ],
+        'responses': {
+            200: {
+                'description': 'Ids de certificados, del más relevante al menos relevante',
+                'schema': {
+                    'type': 'object',
+                    'properties': {
+                        'resultados': {
+                            'type': 'array',
+                            'items': {
+                                'type': 'object',
+                                'properties': {
+                                    'id': {'type': 'integer'},
+                                    'puntaje': {'type': 'number'}
+                                }
+                            }
+                        },
+                        'siguiente': {'type': 'integer', 'description': 'Cursor para la página siguiente (null si no hay más)'}
+                    }
+                }
+            },
+            400: {'description': 'Falta q o parámetros de paginación inválidos'},
+            501: {'description': 'La base de datos no tiene el índice de búsqueda'}
+        }
+    })
+    @solo_lectura
+    def get(self):
+        consulta = request.args.get('q', '')
+        try:
+            # En la búsqueda el cursor es la cantidad de resultados ya devueltos
+            desde, limite = parametros_cursor()
+        except ParametroInvalido as e:
+            return {'message': str(e)}, 400
+        if not busqueda.terminos(consulta):
+            return {'message': "El parámetro 'q' debe tener al menos una palabra"}, 400
+
+        desde = desde or 0
+        try:
+            encontrados = busqueda.buscar(consulta, limite + 1, desde)
+        except busqueda.BusquedaNoDisponible as e:
+            return {'message': str(e)}, 501
+
+        siguiente = desde + limite if len(encontrados) > limite else None
+        return {
+            'resultados': [{'id': certificado_id, 'puntaje': round(puntaje, 6)} for certificado_id, puntaje in encontrados[:limite]],
+            'siguiente': siguiente
+        }, 200
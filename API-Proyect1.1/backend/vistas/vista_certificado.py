@@ -1,33 +1,436 @@
-from flask import request, send_file
+from flask import current_app, request, send_file
 from flask_restful import Resource
-from backend.modelos import db, Certificado, CertificadoSchema, OrdenServicio, TipoServicio, DetalleServicio, FichaTecnica, Usuario
+from backend.modelos import db, solo_lectura, Certificado, CertificadoSchema, OrdenServicio, TipoServicio, DetalleServicio, FichaTecnica, Usuario, TrabajoRender, TrabajoRenderSchema
+from ..servicios.paginacion import ParametroInvalido, contar, parametros_cursor, paginar_keyset
+from ..servicios.cache_documentos import cache_documentos
+from ..servicios.idempotencia import PARAMETRO_IDEMPOTENCIA, idempotente
+from ..servicios.renderizado import cola_renderizado
+from ..servicios.serializacion import compilar
 from flasgger.utils import swag_from
+from sqlalchemy import select
+from sqlalchemy.orm import load_only, selectinload
+from functools import lru_cache
 from marshmallow import ValidationError
-from docx import Document
+from datetime import date
 import traceback
 import os
 
-certificado_schema = CertificadoSchema()
-certificados_schema = CertificadoSchema(many=True)
+certificado_schema = compilar(CertificadoSchema())
+certificados_schema = compilar(CertificadoSchema(many=True))
+trabajo_render_schema = compilar(TrabajoRenderSchema())
+
+
+COLUMNAS_CERTIFICADO = ('id', 'fecha', 'estado', 'usuario_id', 'orden_servicio_id')
+RELACIONES_CERTIFICADO = ('orden_servicio', 'fichas_tecnicas')
+
+
+def _lista_parametro(nombre):
+    valor = request.args.get(nombre)
+    if valor is None:
+        return None
+    return [v.strip() for v in valor.split(',') if v.strip()]
+
+
+def proyeccion_certificado():
+    """
+    Interpreta ``?fields=`` y ``?expand=``.
+    Devuelve (columnas, relaciones) como tuplas ordenadas. Sin ninguno de los dos
+    parámetros se devuelve el árbol completo, como antes.
+    """
+    campos = _lista_parametro('fields')
+    expandir = _lista_parametro('expand')
+    if campos is None and expandir is None:
+        return COLUMNAS_CERTIFICADO, RELACIONES_CERTIFICADO
+
+    desconocidos = [c for c in (campos or []) if c not in COLUMNAS_CERTIFICADO + RELACIONES_CERTIFICADO]
+    if desconocidos:
+        raise ParametroInvalido(f"Campos desconocidos en 'fields': {', '.join(desconocidos)}")
+    desconocidos = [r for r in (expandir or []) if r not in RELACIONES_CERTIFICADO]
+    if desconocidos:
+        raise ParametroInvalido(f"Relaciones desconocidas en 'expand': {', '.join(desconocidos)}")
+
+    # Nombrar una relación en 'fields' equivale a expandirla
+    pedidos = set(campos or COLUMNAS_CERTIFICADO) | set(expandir or [])
+    columnas = tuple(c for c in COLUMNAS_CERTIFICADO if c in pedidos)
+    relaciones = tuple(r for r in RELACIONES_CERTIFICADO if r in pedidos)
+    return columnas, relaciones
+
+
+def opciones_carga_certificado(columnas=COLUMNAS_CERTIFICADO, relaciones=RELACIONES_CERTIFICADO):
+    """
+    Carga solo las columnas y relaciones pedidas. Las relaciones se traen con un número
+    fijo de consultas (una por relación), sin importar cuántos certificados tenga la página.
+    """
+    # El id siempre hace falta para el cursor, y la FK para cargar la orden de servicio
+    necesarias = set(columnas) | {'id'}
+    if 'orden_servicio' in relaciones:
+        necesarias.add('orden_servicio_id')
+    opciones = [load_only(*[getattr(Certificado, c) for c in COLUMNAS_CERTIFICADO if c in necesarias])]
+
+    if 'orden_servicio' in relaciones:
+        opciones.append(
+            selectinload(Certificado.orden_servicio)
+            .selectinload(OrdenServicio.usuario)
+            .selectinload(Usuario.categorias)
+        )
+    if 'fichas_tecnicas' in relaciones:
+        opciones.append(
+            selectinload(Certificado.fichas_tecnicas).selectinload(FichaTecnica.detalle_servicio)
+        )
+    return opciones
+
+
+@lru_cache(maxsize=64)
+def esquema_certificado(columnas=COLUMNAS_CERTIFICADO, relaciones=RELACIONES_CERTIFICADO, many=False):
+    """Esquema compilado restringido a la proyección pedida (se reutiliza entre peticiones)."""
+    if columnas == COLUMNAS_CERTIFICADO and relaciones == RELACIONES_CERTIFICADO:
+        return certificados_schema if many else certificado_schema
+    return compilar(CertificadoSchema(only=columnas + relaciones, many=many))
+
+
+ORDENES_CERTIFICADO = ('id', '-id', 'fecha', '-fecha')
+MODOS_TOTAL = ('aproximado', 'exacto')
+
+
+def _fecha_parametro(nombre):
+    valor = request.args.get(nombre)
+    if not valor:
+        return None
+    try:
+        return date.fromisoformat(valor)
+    except ValueError:
+        raise ParametroInvalido(f"El parámetro '{nombre}' debe tener formato AAAA-MM-DD")
+
+
+def filtros_certificado():
+    """
+    Interpreta ``?estado=``, ``?usuario_id=`` (listas separadas por coma), ``?fecha_desde=``,
+    ``?fecha_hasta=`` (inclusive) y ``?operario=``. Devuelve los criterios para filter().
+    Todos pueden usar un índice: (estado, fecha), (usuario_id, fecha), fecha, y para el
+    operario (nombre_operario, orden_servicio_id) en detalle_servicio.
+    """
+    filtros = []
+    estados = _lista_parametro('estado')
+    if estados:
+        filtros.append(Certificado.estado.in_(estados))
+
+    usuarios = _lista_parametro('usuario_id')
+    if usuarios:
+        try:
+            filtros.append(Certificado.usuario_id.in_([int(u) for u in usuarios]))
+        except ValueError:
+            raise ParametroInvalido("El parámetro 'usuario_id' debe ser una lista de enteros separados por coma")
+
+    desde, hasta = _fecha_parametro('fecha_desde'), _fecha_parametro('fecha_hasta')
+    if desde:
+        filtros.append(Certificado.fecha >= desde)
+    if hasta:
+        filtros.append(Certificado.fecha <= hasta)
+
+    operario = request.args.get('operario')
+    if operario:
+        # Semi-join por la orden de servicio: un certificado aparece una vez aunque la orden
+        # tenga varios detalles del mismo operario
+        filtros.append(Certificado.orden_servicio_id.in_(
+            select(DetalleServicio.orden_servicio_id).where(DetalleServicio.nombre_operario == operario)
+        ))
+    return filtros
+
+
+def orden_certificado():
+    """Interpreta ``?sort=`` (id, -id, fecha, -fecha). Devuelve (columna_orden, descendente)."""
+    orden = request.args.get('sort') or 'id'
+    if orden not in ORDENES_CERTIFICADO:
+        raise ParametroInvalido(f"El parámetro 'sort' debe ser uno de: {', '.join(ORDENES_CERTIFICADO)}")
+    columna = Certificado.fecha if orden.lstrip('-') == 'fecha' else None
+    return columna, orden.startswith('-')
+
+
+CAMPOS_CERTIFICADO = ('fecha', 'estado', 'usuario_id', 'orden_servicio', 'detalle_servicio', 'fichas_tecnicas')
+CAMPOS_ORDEN = ('fecha', 'hora', 'precaucion', 'usuario_id', 'tipo_servicio')
+CAMPOS_DETALLE = ('precio', 'nombre_operario', 'cantidad_producto', 'fin_servicio')
+CAMPOS_FICHA = ('producto_aplicado', 'dosis', 'ingrediente_activo')
+CAMPOS_TIPO_SERVICIO = {c.key for c in TipoServicio.__table__.columns} - {'id'}
+
+
+def _fecha(valor):
+    if isinstance(valor, date):
+        return valor
+    return date.fromisoformat(valor)
+
+
+def _certificado_bloqueado(id):
+    """
+    El certificado con su fila bloqueada (SELECT ... FOR UPDATE) hasta el commit: dos PUT o
+    DELETE sobre el mismo certificado se esperan y cada uno calcula el delta de los reportes
+    sobre lo que dejó el anterior.
+    """
+    return Certificado.query.filter_by(id=id).with_for_update().populate_existing().first()
+
+
+def _faltantes(datos, campos, prefijo=''):
+    return [f"Falta el campo: {prefijo}{c}" for c in campos if c not in datos]
+
+
+def _es_entero(valor):
+    return isinstance(valor, int) and not isinstance(valor, bool)
+
+
+def _es_fecha(valor):
+    if isinstance(valor, date):
+        return True
+    if not isinstance(valor, str):
+        return False
+    try:
+        date.fromisoformat(valor)
+    except ValueError:
+        return False
+    return True
+
+
+# (comprobación, descripción) de los campos escalares; None solo donde la columna lo admite
+ENTERO = (_es_entero, 'un número entero')
+ENTERO_O_NULO = (lambda v: v is None or _es_entero(v), 'un número entero')
+TEXTO = (lambda v: isinstance(v, str), 'un texto')
+TEXTO_O_NULO = (lambda v: v is None or isinstance(v, str), 'un texto')
+FECHA = (_es_fecha, 'una fecha con formato AAAA-MM-DD')
+
+TIPOS_CERTIFICADO = {'fecha': FECHA, 'estado': TEXTO_O_NULO, 'usuario_id': ENTERO}
+TIPOS_ORDEN = {'fecha': FECHA, 'hora': TEXTO_O_NULO, 'precaucion': TEXTO_O_NULO, 'usuario_id': ENTERO}
+TIPOS_DETALLE = {
+    'precio': ENTERO_O_NULO, 'nombre_operario': TEXTO_O_NULO,
+    'cantidad_producto': TEXTO_O_NULO, 'fin_servicio': TEXTO_O_NULO
+}
+TIPOS_FICHA = {'producto_aplicado': TEXTO, 'dosis': TEXTO_O_NULO, 'ingrediente_activo': TEXTO_O_NULO}
+TIPOS_TIPO_SERVICIO = {
+    c.key: TEXTO_O_NULO if isinstance(c.type, db.String) else ENTERO_O_NULO
+    for c in TipoServicio.__table__.columns if c.key in CAMPOS_TIPO_SERVICIO
+}
+
+
+def _tipos_invalidos(datos, tipos, prefijo=''):
+    return [
+        f"{prefijo}{campo} debe ser {descripcion}"
+        for campo, (valido, descripcion) in tipos.items()
+        if campo in datos and not valido(datos[campo])
+    ]
+
+
+def validar_certificado(data):
+    """
+    Valida la estructura del JSON de un certificado sin tocar la base de datos: campos
+    obligatorios y tipo de los valores escalares.
+    Devuelve una lista de errores (vacía si es válido).
+    """
+    if not isinstance(data, dict):
+        return ["Se esperaba un objeto JSON"]
+    errores = _faltantes(data, CAMPOS_CERTIFICADO) + _tipos_invalidos(data, TIPOS_CERTIFICADO)
+
+    orden = data.get('orden_servicio')
+    if 'orden_servicio' in data:
+        if isinstance(orden, dict):
+            errores += _faltantes(orden, CAMPOS_ORDEN, 'orden_servicio.')
+            errores += _tipos_invalidos(orden, TIPOS_ORDEN, 'orden_servicio.')
+            tipo = orden.get('tipo_servicio')
+            if 'tipo_servicio' in orden and not isinstance(tipo, dict):
+                errores.append("orden_servicio.tipo_servicio debe ser un objeto")
+            elif isinstance(tipo, dict):
+                errores += [f"Campo desconocido: orden_servicio.tipo_servicio.{c}" for c in tipo if c not in CAMPOS_TIPO_SERVICIO]
+                errores += _tipos_invalidos(tipo, TIPOS_TIPO_SERVICIO, 'orden_servicio.tipo_servicio.')
+        else:
+            errores.append("orden_servicio debe ser un objeto")
+
+    detalle = data.get('detalle_servicio')
+    if 'detalle_servicio' in data:
+        if isinstance(detalle, dict):
+            errores += _faltantes(detalle, CAMPOS_DETALLE, 'detalle_servicio.')
+            errores += _tipos_invalidos(detalle, TIPOS_DETALLE, 'detalle_servicio.')
+        else:
+            errores.append("detalle_servicio debe ser un objeto")
+
+    fichas = data.get('fichas_tecnicas')
+    if 'fichas_tecnicas' in data:
+        if isinstance(fichas, list):
+            for i, ficha in enumerate(fichas):
+                if isinstance(ficha, dict):
+                    errores += _faltantes(ficha, CAMPOS_FICHA, f'fichas_tecnicas[{i}].')
+                    errores += _tipos_invalidos(ficha, TIPOS_FICHA, f'fichas_tecnicas[{i}].')
+                else:
+                    errores.append(f"fichas_tecnicas[{i}] debe ser un objeto")
+        else:
+            errores.append("fichas_tecnicas debe ser una lista")
+    return errores
+
+
+def usuarios_por_id(ids):
+    """Resuelve varios usuarios con una sola consulta. Devuelve {id: Usuario}."""
+    ids = {i for i in ids if i is not None}
+    if not ids:
+        return {}
+    return {u.id: u for u in Usuario.query.filter(Usuario.id.in_(ids))}
+
+
+def construir_certificado(data):
+    """
+    Arma el grafo TipoServicio -> OrdenServicio -> DetalleServicio/Certificado -> FichaTecnica
+    enlazado por relaciones, para que un único flush resuelva las llaves foráneas.
+    """
+    orden = data['orden_servicio']
+    orden_servicio = OrdenServicio(
+        fecha=_fecha(orden['fecha']),
+        hora=orden['hora'],
+        precaucion=orden['precaucion'],
+        usuario_id=orden['usuario_id'],
+        tipo_servicio=TipoServicio(**orden['tipo_servicio'])
+    )
+
+    detalle = data['detalle_servicio']
+    DetalleServicio(
+        precio=detalle['precio'],
+        nombre_operario=detalle['nombre_operario'],
+        cantidad_producto=detalle['cantidad_producto'],
+        fin_servicio=detalle['fin_servicio'],
+        orden_servicio=orden_servicio
+    )
+
+    return Certificado(
+        fecha=_fecha(data['fecha']),
+        estado=data['estado'],
+        usuario_id=data['usuario_id'],
+        orden_servicio=orden_servicio,
+        fichas_tecnicas=[
+            FichaTecnica(
+                producto_aplicado=ficha['producto_aplicado'],
+                dosis=ficha['dosis'],
+                ingrediente_activo=ficha['ingrediente_activo']
+            )
+            for ficha in data['fichas_tecnicas']
+        ]
+    )
+
+
+def datos_docx(certificado, usuario, data):
+    """Valores que se reemplazan en los marcadores {{clave}} de la plantilla."""
+    datos = {
+        'fecha': certificado.fecha.strftime('%Y-%m-%d') if certificado.fecha else 'N/A',
+        'cliente': usuario.nombre,
+        'representante': getattr(usuario.rep_legal, 'nombre', 'N/A') if hasattr(usuario, 'rep_legal') else 'N/A',
+        'telefono': getattr(usuario, 'telefono', 'N/A'),
+        'nit': getattr(usuario, 'nit', 'N/A'),
+        'direccion': getattr(usuario, 'direccion', 'N/A'),
+        'descripcion_servicio': data['orden_servicio']['tipo_servicio'].get('descripcion', 'N/A')
+    }
+
+    for i, ficha in enumerate(data['fichas_tecnicas'][:3], start=1):
+        datos[f'producto_{i}'] = ficha['producto_aplicado']
+        datos[f'ingrediente_{i}'] = ficha['ingrediente_activo']
+        datos[f'dosis_{i}'] = ficha['dosis']
+        datos[f'categoria_{i}'] = ficha.get('categoria_toxica', 'N/A')
+        datos[f'lugar_{i}'] = ficha.get('lugar_aplicado', 'N/A')
+        datos[f'presentacion_{i}'] = ficha.get('presentacion', 'N/A')
+    return datos
+
+
+def datos_docx_de_certificado(certificado):
+    """datos_docx armado desde la base, para certificados creados sin trabajo de renderizado."""
+    tipo = certificado.orden_servicio.tipo_servicio if certificado.orden_servicio else None
+    data = {
+        'orden_servicio': {'tipo_servicio': {'descripcion': tipo.descripcion} if tipo and tipo.descripcion else {}},
+        'fichas_tecnicas': [
+            {'producto_aplicado': f.producto_aplicado, 'ingrediente_activo': f.ingrediente_activo, 'dosis': f.dosis}
+            for f in sorted(certificado.fichas_tecnicas, key=lambda f: f.id)
+        ],
+    }
+    return datos_docx(certificado, Usuario.query.get(certificado.usuario_id), data)
+
 
 class VistaCertificados(Resource):
     @swag_from({
         'tags': ['Certificados'],
+        'parameters': [
+            {'name': 'after', 'in': 'query', 'type': 'string', 'required': False,
+             'description': "Cursor: el valor 'siguiente' de la página anterior (el id, o 'fecha,id' al ordenar por fecha)"},
+            {'name': 'limit', 'in': 'query', 'type': 'integer', 'required': False,
+             'description': 'Cantidad máxima de certificados por página'},
+            {'name': 'fields', 'in': 'query', 'type': 'string', 'required': False,
+             'description': 'Campos a devolver separados por coma (ej. id,fecha,estado)'},
+            {'name': 'expand', 'in': 'query', 'type': 'string', 'required': False,
+             'description': 'Relaciones a incluir: orden_servicio,fichas_tecnicas'},
+            {'name': 'estado', 'in': 'query', 'type': 'string', 'required': False,
+             'description': 'Estados separados por coma'},
+            {'name': 'usuario_id', 'in': 'query', 'type': 'string', 'required': False,
+             'description': 'Ids de cliente separados por coma'},
+            {'name': 'fecha_desde', 'in': 'query', 'type': 'string', 'format': 'date', 'required': False,
+             'description': 'Fecha mínima (inclusive), AAAA-MM-DD'},
+            {'name': 'fecha_hasta', 'in': 'query', 'type': 'string', 'format': 'date', 'required': False,
+             'description': 'Fecha máxima (inclusive), AAAA-MM-DD'},
+            {'name': 'operario', 'in': 'query', 'type': 'string', 'required': False,
+             'description': 'Nombre exacto del operario en el detalle de servicio'},
+            {'name': 'sort', 'in': 'query', 'type': 'string', 'required': False,
+             'enum': ['id', '-id', 'fecha', '-fecha'], 'default': 'id',
+             'description': 'Orden (con - descendente); al ordenar por fecha no salen certificados sin fecha'},
+            {'name': 'total', 'in': 'query', 'type': 'string', 'required': False,
+             'enum': ['aproximado', 'exacto'],
+             'description': 'Incluir el total de resultados; el aproximado no recorre toda la tabla'}
+        ],
         'responses': {
             200: {
-                'description': 'Lista de certificados',
+                'description': 'Página de certificados',
                 'schema': {
-                    'type': 'array',
-                    'items': {
-                        '$ref': '#/definitions/Certificado'
+                    'type': 'object',
+                    'properties': {
+                        'certificados': {
+                            'type': 'array',
+                            'items': {
+                                '$ref': '#/definitions/Certificado'
+                            }
+                        },
+                        'siguiente': {
+                            # Sin 'type': es un entero (el id) con sort=id/-id y un texto
+                            # 'fecha,id' con sort=fecha/-fecha
+                            'description': "Cursor para la página siguiente (null si no hay más): entero con el "
+                                           "id al ordenar por id, texto 'fecha,id' al ordenar por fecha"
+                        },
+                        'total': {'type': 'integer', 'description': 'Solo con ?total='},
+                        'total_aproximado': {'type': 'boolean', 'description': 'Solo con ?total='}
                     }
                 }
-            }
+            },
+            400: {'description': 'Parámetros de paginación, filtros o proyección inválidos'}
         }
     })
+    @solo_lectura
     def get(self):
-        certificados = Certificado.query.all()
-        return certificados_schema.dump(certificados), 200
+        try:
+            columna_orden, descendente = orden_certificado()
+            after, limite = parametros_cursor(date.fromisoformat if columna_orden is not None else None)
+            columnas, relaciones = proyeccion_certificado()
+            filtros = filtros_certificado()
+            modo_total = request.args.get('total')
+            if modo_total is not None and modo_total not in MODOS_TOTAL:
+                raise ParametroInvalido("El parámetro 'total' debe ser 'aproximado' o 'exacto'")
+        except ParametroInvalido as e:
+            return {'message': str(e)}, 400
+
+        # El cursor por fecha necesita la fecha aunque no se haya pedido en ?fields=
+        carga = columnas + ('fecha',) if columna_orden is not None and 'fecha' not in columnas else columnas
+        query = Certificado.query.filter(*filtros).options(*opciones_carga_certificado(carga, relaciones))
+        certificados, siguiente = paginar_keyset(
+            query, Certificado.id, after, limite, columna_orden=columna_orden, descendente=descendente
+        )
+        respuesta = {
+            'certificados': esquema_certificado(columnas, relaciones, many=True).dump(certificados),
+            'siguiente': siguiente
+        }
+        if modo_total:
+            conteo = db.session.query(Certificado.id).filter(*filtros)
+            if columna_orden is not None:
+                conteo = conteo.filter(columna_orden.isnot(None))
+            sin_filtros = not filtros and columna_orden is None
+            respuesta['total'], respuesta['total_aproximado'] = contar(
+                conteo, modo_total, tabla=Certificado.__tablename__ if sin_filtros else None
+            )
+        return respuesta, 200
 
     @swag_from({
         'tags': ['Certificados'],
@@ -39,125 +442,44 @@ class VistaCertificados(Resource):
                 'schema': {
                     '$ref': '#/definitions/Certificado'
                 }
-            }
+            },
+            PARAMETRO_IDEMPOTENCIA
         ],
         'responses': {
-            201: {'description': 'Certificado creado exitosamente'},
+            201: {'description': 'Certificado creado exitosamente; el documento se genera en segundo plano (ver trabajo_render_id)'},
             400: {'description': 'Datos inválidos o usuario no existe'},
+            409: {'description': 'Otra petición con la misma Idempotency-Key sigue en curso'},
+            422: {'description': 'La Idempotency-Key ya se usó con otro cuerpo'},
             500: {'description': 'Error interno al guardar'}
         }
     })
+    @idempotente
     def post(self):
         try:
             data = request.json
-            usuario = Usuario.query.get(data.get('usuario_id'))
+            errores = validar_certificado(data)
+            if errores:
+                return {"message": "Datos inválidos", "errors": errores}, 400
+
+            usuarios = usuarios_por_id([data['usuario_id'], data['orden_servicio']['usuario_id']])
+            usuario = usuarios.get(data['usuario_id'])
             if not usuario:
                 return {"message": f"Usuario con id {data.get('usuario_id')} no existe"}, 400
 
-            usuario_orden = Usuario.query.get(data['orden_servicio'].get('usuario_id'))
-            if not usuario_orden:
+            if data['orden_servicio']['usuario_id'] not in usuarios:
                 return {"message": f"Usuario en orden_servicio con id {data['orden_servicio'].get('usuario_id')} no existe"}, 400
 
-            tipo_servicio = TipoServicio(**data['orden_servicio']['tipo_servicio'])
-            db.session.add(tipo_servicio)
-            db.session.flush()
-
-            orden_servicio = OrdenServicio(
-                fecha=data['orden_servicio']['fecha'],
-                hora=data['orden_servicio']['hora'],
-                precaucion=data['orden_servicio']['precaucion'],
-                usuario_id=data['orden_servicio']['usuario_id'],
-                tipo_servicio_id=tipo_servicio.id
-            )
-            db.session.add(orden_servicio)
-            db.session.flush()
-
-            detalle_servicio = DetalleServicio(
-                precio=data['detalle_servicio']['precio'],
-                nombre_operario=data['detalle_servicio']['nombre_operario'],
-                cantidad_producto=data['detalle_servicio']['cantidad_producto'],
-                fin_servicio=data['detalle_servicio']['fin_servicio'],
-                orden_servicio_id=orden_servicio.id
-            )
-            db.session.add(detalle_servicio)
-
-            certificado = Certificado(
-                fecha=data['fecha'],
-                estado=data['estado'],
-                usuario_id=data['usuario_id'],
-                orden_servicio_id=orden_servicio.id
-            )
+            certificado = construir_certificado(data)
             db.session.add(certificado)
-            db.session.flush()
-
-            for ficha in data['fichas_tecnicas']:
-                ficha_tecnica = FichaTecnica(
-                    producto_aplicado=ficha['producto_aplicado'],
-                    dosis=ficha['dosis'],
-                    ingrediente_activo=ficha['ingrediente_activo'],
-                    certificado_id=certificado.id
-                )
-                db.session.add(ficha_tecnica)
-
+            trabajo = cola_renderizado.crear_trabajo(certificado, datos_docx(certificado, usuario, data))
             db.session.commit()
 
-            # Generación del archivo DOCX - RUTA CORREGIDA
-            datos_docx = {
-                'fecha': certificado.fecha.strftime('%Y-%m-%d'),
-                'cliente': usuario.nombre,
-                'representante': getattr(usuario.rep_legal, 'nombre', 'N/A') if hasattr(usuario, 'rep_legal') else 'N/A',
-                'telefono': getattr(usuario, 'telefono', 'N/A'),
-                'nit': getattr(usuario, 'nit', 'N/A'),
-                'direccion': getattr(usuario, 'direccion', 'N/A'),
-                'descripcion_servicio': data['orden_servicio']['tipo_servicio'].get('descripcion', 'N/A')
-            }
+            # El documento se genera en segundo plano; el estado se consulta en /render-status
+            cola_renderizado.enviar(trabajo.id)
 
-            for i, ficha in enumerate(data['fichas_tecnicas'][:3], start=1):
-                datos_docx[f'producto_{i}'] = ficha['producto_aplicado']
-                datos_docx[f'ingrediente_{i}'] = ficha['ingrediente_activo']
-                datos_docx[f'dosis_{i}'] = ficha['dosis']
-                datos_docx[f'categoria_{i}'] = ficha.get('categoria_toxica', 'N/A')
-                datos_docx[f'lugar_{i}'] = ficha.get('lugar_aplicado', 'N/A')
-                datos_docx[f'presentacion_{i}'] = ficha.get('presentacion', 'N/A')
-
-            # CORRECCIÓN: Ruta correcta para encontrar la plantilla
-            # Debugging: Imprimir rutas para verificar
-            current_file = os.path.abspath(__file__)
-            print(f"Archivo actual: {current_file}")
-            
-            # Desde vista_certificado.py (backend/vistas/) hacia plantillas (backend/plantillas/)
-            BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # Esto lleva a 'backend/'
-            print(f"BASE_DIR: {BASE_DIR}")
-            
-            plantilla_path = os.path.join(BASE_DIR, 'plantillas', 'plantilla_certificado.docx')
-            print(f"Ruta de plantilla: {plantilla_path}")
-            print(f"¿Existe la plantilla? {os.path.exists(plantilla_path)}")
-            
-            # Listar contenido del directorio plantillas para debugging
-            plantillas_dir = os.path.join(BASE_DIR, 'plantillas')
-            if os.path.exists(plantillas_dir):
-                print(f"Contenido de plantillas: {os.listdir(plantillas_dir)}")
-            else:
-                print(f"El directorio plantillas no existe: {plantillas_dir}")
-            
-            # Verificar si el archivo existe antes de intentar abrirlo
-            if not os.path.exists(plantilla_path):
-                return {"message": f"Plantilla no encontrada en: {plantilla_path}. Directorio base: {BASE_DIR}"}, 500
-            
-            # Crear directorio de salida si no existe
-            salida_path = f"certificados_generados/Certificado_{certificado.id}.docx"
-            os.makedirs("certificados_generados", exist_ok=True)
-
-            # Generar el documento
-            doc = Document(plantilla_path)
-            for p in doc.paragraphs:
-                for key, val in datos_docx.items():
-                    if f"{{{{{key}}}}}" in p.text:
-                        for run in p.runs:
-                            run.text = run.text.replace(f"{{{{{key}}}}}", str(val))
-            doc.save(salida_path)
-
-            return certificado_schema.dump(certificado), 201
+            respuesta = certificado_schema.dump(certificado)
+            respuesta['trabajo_render_id'] = trabajo.id
+            return respuesta, 201
 
         except ValidationError as err:
             return {"message": "Datos inválidos", "errors": err.messages}, 400
@@ -166,6 +488,103 @@ class VistaCertificados(Resource):
             db.session.rollback()
             return {"message": "Error al guardar en base de datos", "error": str(e)}, 500
 
+
+class VistaCertificadosLote(Resource):
+    @swag_from({
+        'tags': ['Certificados'],
+        'parameters': [
+            {
+                'name': 'body',
+                'in': 'body',
+                'required': True,
+                'schema': {
+                    'type': 'object',
+                    'properties': {
+                        'certificados': {
+                            'type': 'array',
+                            'items': {'$ref': '#/definitions/Certificado'}
+                        }
+                    }
+                }
+            },
+            PARAMETRO_IDEMPOTENCIA
+        ],
+        'responses': {
+            201: {'description': 'Todos los certificados fueron creados'},
+            207: {'description': 'Algunos certificados fueron creados y otros no (ver resultados)'},
+            400: {'description': 'Ningún certificado es válido o el lote está vacío o es demasiado grande'},
+            409: {'description': 'Otra petición con la misma Idempotency-Key sigue en curso'},
+            422: {'description': 'La Idempotency-Key ya se usó con otro cuerpo'},
+            500: {'description': 'Error interno al guardar; no se creó ningún certificado'}
+        }
+    })
+    @idempotente
+    def post(self):
+        """
+        Crea varios certificados en una sola transacción.
+        Todos los elementos se validan antes de escribir; los usuarios referenciados se
+        resuelven con una sola consulta y los válidos se insertan en un único flush. Ese flush
+        emite un INSERT por fila: las llaves son autoincrementales y SQLAlchemy 1.4 necesita el
+        id de cada padre para sus hijos, así que no agrupa las filas en un executemany.
+        La respuesta trae un resultado por elemento, en el mismo orden del lote.
+        """
+        data = request.get_json(silent=True)
+        items = data.get('certificados') if isinstance(data, dict) else data
+        if not isinstance(items, list) or not items:
+            return {"message": "Se esperaba una lista no vacía en 'certificados'"}, 400
+
+        maximo = current_app.config.get('CERTIFICADOS_LOTE_MAXIMO', 200)
+        if len(items) > maximo:
+            return {"message": f"El lote supera el máximo de {maximo} certificados"}, 400
+
+        resultados = [{'indice': i, 'ok': False} for i in range(len(items))]
+        for resultado, item in zip(resultados, items):
+            errores = validar_certificado(item)
+            if errores:
+                resultado['errores'] = errores
+
+        validos = [i for i, r in enumerate(resultados) if 'errores' not in r]
+        ids = set()
+        for i in validos:
+            ids.update((items[i]['usuario_id'], items[i]['orden_servicio']['usuario_id']))
+        usuarios = usuarios_por_id(ids)
+
+        for i in list(validos):
+            faltantes = [
+                f"Usuario con id {uid} no existe"
+                for uid in (items[i]['usuario_id'], items[i]['orden_servicio']['usuario_id'])
+                if uid not in usuarios
+            ]
+            if faltantes:
+                resultados[i]['errores'] = faltantes
+                validos.remove(i)
+
+        if not validos:
+            return {"message": "Ningún certificado es válido", "resultados": resultados}, 400
+
+        try:
+            certificados = {i: construir_certificado(items[i]) for i in validos}
+            db.session.add_all(certificados.values())
+            trabajos = {
+                i: cola_renderizado.crear_trabajo(cert, datos_docx(cert, usuarios[items[i]['usuario_id']], items[i]))
+                for i, cert in certificados.items()
+            }
+            db.session.commit()
+        except Exception as e:
+            print("Error al guardar lote:", traceback.format_exc())
+            db.session.rollback()
+            return {"message": "Error al guardar en base de datos", "error": str(e)}, 500
+
+        for i, certificado in certificados.items():
+            resultados[i]['ok'] = True
+            resultados[i]['id'] = certificado.id
+            resultados[i]['trabajo_render_id'] = trabajos[i].id
+            cola_renderizado.enviar(trabajos[i].id)
+
+        codigo = 201 if len(validos) == len(items) else 207
+        return {"resultados": resultados}, codigo
+
+
 class VistaCertificado(Resource):
     @swag_from({
         'tags': ['Certificados'],
@@ -176,17 +595,28 @@ class VistaCertificado(Resource):
                 'type': 'integer',
                 'required': True,
                 'description': 'ID del certificado'
-            }
+            },
+            {'name': 'fields', 'in': 'query', 'type': 'string', 'required': False,
+             'description': 'Campos a devolver separados por coma'},
+            {'name': 'expand', 'in': 'query', 'type': 'string', 'required': False,
+             'description': 'Relaciones a incluir: orden_servicio,fichas_tecnicas'}
         ],
         'responses': {
             200: {'description': 'x'},
+            400: {'description': 'Parámetros de proyección inválidos'},
             404: {'description': 'Certificado no encontrado'}
         }
     })
+    @solo_lectura
     def get(self, id):
-        cert = Certificado.query.get(id)
+        try:
+            columnas, relaciones = proyeccion_certificado()
+        except ParametroInvalido as e:
+            return {'message': str(e)}, 400
+
+        cert = Certificado.query.options(*opciones_carga_certificado(columnas, relaciones)).get(id)
         if cert:
-            return certificado_schema.dump(cert), 200
+            return esquema_certificado(columnas, relaciones).dump(cert), 200
         return {'message': 'Certificado no encontrado'}, 404
 
     @swag_from({
@@ -200,12 +630,14 @@ class VistaCertificado(Resource):
         }
     })
     def delete(self, id):
-        cert = Certificado.query.get(id)
+        cert = _certificado_bloqueado(id)
         if cert:
-            # Eliminar manualmente fichas técnicas relacionadas
+            # Eliminar manualmente fichas técnicas y trabajos de renderizado relacionados
             FichaTecnica.query.filter_by(certificado_id=cert.id).delete()
+            TrabajoRender.query.filter_by(certificado_id=cert.id).delete()
             db.session.delete(cert)
             db.session.commit()
+            cache_documentos.invalidar(id)
             return {'message': 'Certificado eliminado'}, 204
         return {'message': 'Certificado no encontrado'}, 404
 
@@ -234,29 +666,63 @@ class VistaCertificado(Resource):
         }
     })
     def put(self, id):
-        certificado = Certificado.query.get(id)
+        certificado = _certificado_bloqueado(id)
         if not certificado:
             return {'message': 'Certificado no encontrado'}, 404
 
         data = request.get_json()
         try:
+            cambios_documento = {}
             if 'estado' in data:
                 certificado.estado = data['estado']
             if 'fecha' in data:
-                certificado.fecha = data['fecha']
+                try:
+                    certificado.fecha = _fecha(data['fecha'])
+                except (TypeError, ValueError):
+                    return {'message': 'fecha debe tener formato AAAA-MM-DD'}, 400
+                cambios_documento['fecha'] = certificado.fecha.strftime('%Y-%m-%d')
             if 'usuario_id' in data:
                 nuevo_usuario = Usuario.query.get(data['usuario_id'])
                 if not nuevo_usuario:
                     return {'message': f'Usuario con id {data["usuario_id"]} no existe'}, 400
                 certificado.usuario_id = data['usuario_id']
+                cambios_documento.update(
+                    cliente=nuevo_usuario.nombre,
+                    telefono=nuevo_usuario.telefono,
+                    direccion=nuevo_usuario.direccion
+                )
 
+            cola_renderizado.actualizar_datos(
+                certificado, cambios_documento, lambda: datos_docx_de_certificado(certificado)
+            )
             db.session.commit()
+            # El documento anterior ya no es válido; se regenera en la próxima descarga
+            cache_documentos.invalidar(certificado.id)
             return {'message': 'Certificado actualizado correctamente'}, 200
 
         except Exception as e:
             db.session.rollback()
             return {'message': 'Error al actualizar certificado', 'error': str(e)}, 500
 
+class VistaEstadoRender(Resource):
+    @swag_from({
+        'tags': ['Certificados'],
+        'parameters': [
+            {'name': 'id', 'in': 'path', 'type': 'integer', 'required': True,
+             'description': 'ID del certificado'}
+        ],
+        'responses': {
+            200: {'description': 'Estado del último trabajo de renderizado (pendiente, procesando, terminado o fallido)'},
+            404: {'description': 'No hay trabajos de renderizado para el certificado'}
+        }
+    })
+    @solo_lectura
+    def get(self, id):
+        trabajo = cola_renderizado.ultimo_trabajo(id)
+        if trabajo:
+            return trabajo_render_schema.dump(trabajo), 200
+        return {'message': 'No hay trabajos de renderizado para el certificado'}, 404
+
 class VistaDescargaCertificado(Resource):
     @swag_from({
         'tags': ['Certificados'],
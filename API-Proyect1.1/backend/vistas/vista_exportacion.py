@@ -0,0 +1,316 @@
+from flask import Response, current_app, request, stream_with_context
+from flask_restful import Resource
+from backend.modelos import db, solo_lectura, Certificado, OrdenServicio, FichaTecnica, DetalleServicioSchema, FichaTecnicaSchema
+from backend.servicios.renderizado import cola_renderizado
+from backend.servicios.serializacion import compilar
+from flasgger.utils import swag_from
+from sqlalchemy.orm import selectinload
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from datetime import date
+import csv
+import io
+import json
+import logging
+import zipfile
+
+logger = logging.getLogger(__name__)
+
+detalles_schema = compilar(DetalleServicioSchema(many=True))
+fichas_schema = compilar(FichaTecnicaSchema(many=True))
+
+COLUMNAS_CSV = [
+    'certificado_id', 'fecha', 'estado', 'usuario_id', 'orden_servicio_id',
+    'detalle_servicio_id', 'precio', 'nombre_operario', 'cantidad_producto', 'fin_servicio',
+    'ficha_tecnica_id', 'producto_aplicado', 'dosis', 'ingrediente_activo'
+]
+
+# Tamaño aproximado de cada trozo enviado al cliente
+TAMANO_TROZO = 64 * 1024
+
+
+def _certificados_exportacion():
+    """
+    Recorre todos los certificados en lotes por id (keyset): la memoria queda acotada al
+    tamaño del lote y cada lote carga sus relaciones con una consulta por relación.
+
+    No se usa yield_per: con stream_results pymysql lee con un cursor sin buffer y las
+    consultas de selectinload sobre la misma conexión descartarían las filas pendientes,
+    cortando la exportación después del primer lote.
+    """
+    lote = current_app.config.get('EXPORTACION_LOTE', 500)
+    ultimo_id = 0
+    while True:
+        certificados = (
+            Certificado.query
+            .options(
+                selectinload(Certificado.orden_servicio).selectinload(OrdenServicio.detalles_servicio),
+                selectinload(Certificado.fichas_tecnicas).selectinload(FichaTecnica.detalle_servicio),
+            )
+            .filter(Certificado.id > ultimo_id)
+            .order_by(Certificado.id)
+            .limit(lote)
+            .all()
+        )
+        yield from certificados
+        if len(certificados) < lote:
+            return
+        ultimo_id = certificados[-1].id
+
+
+def _en_trozos(lineas):
+    """Agrupa líneas pequeñas en trozos de ~64 KB para no emitir un write por fila."""
+    buffer = []
+    tamano = 0
+    for linea in lineas:
+        buffer.append(linea)
+        tamano += len(linea)
+        if tamano >= TAMANO_TROZO:
+            yield ''.join(buffer)
+            buffer = []
+            tamano = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def _lineas_ndjson():
+    for cert in _certificados_exportacion():
+        registro = {
+            'id': cert.id,
+            'fecha': cert.fecha.isoformat() if cert.fecha else None,
+            'estado': cert.estado,
+            'usuario_id': cert.usuario_id,
+            'orden_servicio_id': cert.orden_servicio_id,
+            'detalles_servicio': detalles_schema.dump(cert.orden_servicio.detalles_servicio if cert.orden_servicio else []),
+            'fichas_tecnicas': fichas_schema.dump(cert.fichas_tecnicas),
+        }
+        yield json.dumps(registro, ensure_ascii=False) + '\n'
+
+
+def _lineas_csv():
+    salida = io.StringIO()
+    escritor = csv.writer(salida)
+
+    def linea(valores):
+        escritor.writerow(valores)
+        texto = salida.getvalue()
+        salida.seek(0)
+        salida.truncate()
+        return texto
+
+    yield linea(COLUMNAS_CSV)
+    for cert in _certificados_exportacion():
+        detalles = cert.orden_servicio.detalles_servicio if cert.orden_servicio else []
+        base = [
+            cert.id, cert.fecha.isoformat() if cert.fecha else '', cert.estado,
+            cert.usuario_id, cert.orden_servicio_id
+        ]
+        # Una fila por ficha técnica; un certificado sin fichas sale en una sola fila
+        for ficha in cert.fichas_tecnicas or [None]:
+            detalle = (ficha.detalle_servicio if ficha else None) or (detalles[0] if detalles else None)
+            yield linea(base + [
+                detalle.id if detalle else '',
+                detalle.precio if detalle else '',
+                detalle.nombre_operario if detalle else '',
+                detalle.cantidad_producto if detalle else '',
+                detalle.fin_servicio if detalle else '',
+                ficha.id if ficha else '',
+                ficha.producto_aplicado if ficha else '',
+                ficha.dosis if ficha else '',
+                ficha.ingrediente_activo if ficha else '',
+            ])
+
+
+FORMATOS = {
+    'ndjson': (_lineas_ndjson, 'application/x-ndjson', 'certificados.ndjson'),
+    'csv': (_lineas_csv, 'text/csv', 'certificados.csv'),
+}
+
+
+class VistaExportarCertificados(Resource):
+    @swag_from({
+        'tags': ['Certificados'],
+        'parameters': [
+            {'name': 'formato', 'in': 'query', 'type': 'string', 'required': False,
+             'enum': ['ndjson', 'csv'], 'default': 'ndjson',
+             'description': 'Formato de la exportación'}
+        ],
+        'responses': {
+            200: {'description': 'Exportación de todos los certificados con fichas técnicas y detalle de servicio (streaming)'},
+            400: {'description': 'Formato no soportado'}
+        }
+    })
+    @solo_lectura
+    def get(self):
+        formato = request.args.get('formato', 'ndjson').lower()
+        if formato not in FORMATOS:
+            return {'message': f"Formato no soportado: {formato}. Use 'ndjson' o 'csv'"}, 400
+
+        generador, mimetype, nombre = FORMATOS[formato]
+        respuesta = Response(stream_with_context(_en_trozos(generador())), mimetype=mimetype)
+        respuesta.headers['Content-Disposition'] = f'attachment; filename={nombre}'
+        return respuesta
+
+
+class _SalidaZip(io.RawIOBase):
+    """Destino no posicionable para ZipFile: acumula lo escrito hasta que se vacía hacia el cliente."""
+
+    def __init__(self):
+        self._trozos = []
+
+    def writable(self):
+        return True
+
+    def write(self, datos):
+        self._trozos.append(bytes(datos))
+        return len(datos)
+
+    def vaciar(self):
+        datos = b''.join(self._trozos)
+        self._trozos = []
+        return datos
+
+
+def _ids_para_zip():
+    """
+    Ids pedidos en ``ids`` (query "1,2,3" o JSON {"ids": [...]}) o, si no vienen, los que
+    cumplen los filtros desde/hasta (fecha del certificado) y usuario_id.
+    Devuelve (ids encontrados, ids pedidos que no existen).
+    """
+    cuerpo = request.get_json(silent=True) or {}
+    ids = cuerpo.get('ids')
+    if ids is None and request.args.get('ids'):
+        ids = request.args['ids'].split(',')
+
+    consulta = db.session.query(Certificado.id)
+    if ids is not None:
+        try:
+            ids = [int(i) for i in ids]
+        except (TypeError, ValueError):
+            raise ValueError("'ids' debe ser una lista de enteros")
+        consulta = consulta.filter(Certificado.id.in_(ids))
+    else:
+        filtros = {**cuerpo, **request.args.to_dict()}
+        try:
+            if filtros.get('desde'):
+                consulta = consulta.filter(Certificado.fecha >= date.fromisoformat(filtros['desde']))
+            if filtros.get('hasta'):
+                consulta = consulta.filter(Certificado.fecha <= date.fromisoformat(filtros['hasta']))
+        except (TypeError, ValueError):
+            raise ValueError("'desde' y 'hasta' deben tener formato YYYY-MM-DD")
+        if filtros.get('usuario_id'):
+            try:
+                consulta = consulta.filter(Certificado.usuario_id == int(filtros['usuario_id']))
+            except (TypeError, ValueError):
+                raise ValueError("'usuario_id' debe ser un entero")
+        if not any(filtros.get(f) for f in ('desde', 'hasta', 'usuario_id')):
+            raise ValueError("Indique 'ids' o al menos un filtro: desde, hasta, usuario_id")
+
+    maximo = current_app.config['ZIP_MAXIMO_CERTIFICADOS']
+    if ids is not None and len(set(ids)) > maximo:
+        raise ValueError(f"El ZIP admite como máximo {maximo} certificados; acote la búsqueda")
+    encontrados = [fila.id for fila in consulta.order_by(Certificado.id).limit(maximo + 1)]
+    if len(encontrados) > maximo:
+        raise ValueError(f"El ZIP admite como máximo {maximo} certificados; acote la búsqueda")
+    no_encontrados = sorted(set(ids) - set(encontrados)) if ids is not None else []
+    return encontrados, no_encontrados
+
+
+def _preparar_documento(app, certificado_id, formato):
+    """Ruta del documento (de la caché o recién generado); corre en un hilo del pool del ZIP."""
+    with app.app_context():
+        if formato == 'pdf':
+            return cola_renderizado.documento_pdf(certificado_id)
+        return cola_renderizado.documento(certificado_id)
+
+
+def _documentos_en_orden(ids, formato):
+    """
+    Devuelve (id, ruta, error) en el orden de ``ids``. Los documentos faltantes se generan
+    en paralelo (ZIP_PARALELISMO), adelantándose solo esa cantidad al que se está enviando.
+    """
+    app = current_app._get_current_object()
+    paralelismo = max(1, app.config['ZIP_PARALELISMO'])
+    pendientes = deque()
+    siguientes = iter(ids)
+    with ThreadPoolExecutor(max_workers=paralelismo, thread_name_prefix='zip') as pool:
+        for certificado_id in siguientes:
+            pendientes.append((certificado_id, pool.submit(_preparar_documento, app, certificado_id, formato)))
+            if len(pendientes) >= paralelismo:
+                break
+        while pendientes:
+            certificado_id, futuro = pendientes.popleft()
+            siguiente = next(siguientes, None)
+            if siguiente is not None:
+                pendientes.append((siguiente, pool.submit(_preparar_documento, app, siguiente, formato)))
+            try:
+                ruta = futuro.result()
+                yield certificado_id, ruta, None if ruta else 'El certificado no tiene documento'
+            except Exception as e:
+                logger.error("No se pudo preparar el documento del certificado %s: %s", certificado_id, e)
+                yield certificado_id, None, str(e)
+
+
+def _zip_certificados(ids, formato, no_encontrados=()):
+    """
+    Arma el ZIP mientras se envía: cada documento se copia en trozos de 64 KB y lo que
+    ZipFile escribe se entrega de inmediato. Los documentos ya vienen comprimidos (DOCX es
+    un ZIP, el PDF también) así que se guardan sin recomprimir.
+    """
+    salida = _SalidaZip()
+    errores = [f"Certificado {i}: no existe" for i in no_encontrados]
+    with zipfile.ZipFile(salida, 'w', zipfile.ZIP_STORED) as archivo:
+        for certificado_id, ruta, error in _documentos_en_orden(ids, formato):
+            if error:
+                errores.append(f"Certificado {certificado_id}: {error}")
+                continue
+            info = zipfile.ZipInfo.from_file(ruta, arcname=f"Certificado_{certificado_id}.{formato}")
+            with open(ruta, 'rb') as origen, archivo.open(info, 'w') as destino:
+                while True:
+                    trozo = origen.read(TAMANO_TROZO)
+                    if not trozo:
+                        break
+                    destino.write(trozo)
+                    yield salida.vaciar()
+            yield salida.vaciar()
+        if errores:
+            archivo.writestr('errores.txt', '\n'.join(errores) + '\n')
+    yield salida.vaciar()
+
+
+class VistaZipCertificados(Resource):
+    @swag_from({
+        'tags': ['Certificados'],
+        'parameters': [
+            {'name': 'ids', 'in': 'query', 'type': 'string', 'required': False,
+             'description': 'Ids separados por coma (también {"ids": [...]} en el cuerpo)'},
+            {'name': 'desde', 'in': 'query', 'type': 'string', 'format': 'date', 'required': False},
+            {'name': 'hasta', 'in': 'query', 'type': 'string', 'format': 'date', 'required': False},
+            {'name': 'usuario_id', 'in': 'query', 'type': 'integer', 'required': False},
+            {'name': 'formato', 'in': 'query', 'type': 'string', 'required': False,
+             'enum': ['pdf', 'docx'], 'default': 'pdf'}
+        ],
+        'responses': {
+            200: {'description': 'ZIP con los certificados, enviado a medida que se arma (los que fallan se listan en errores.txt)'},
+            400: {'description': 'Parámetros inválidos o demasiados certificados'},
+            404: {'description': 'Ningún certificado cumple los criterios'}
+        }
+    })
+    def get(self):
+        formato = request.args.get('formato', 'pdf').lower()
+        if formato not in ('pdf', 'docx'):
+            return {'message': f"Formato no soportado: {formato}. Use 'pdf' o 'docx'"}, 400
+        try:
+            ids, no_encontrados = _ids_para_zip()
+        except ValueError as e:
+            return {'message': str(e)}, 400
+        if not ids:
+            return {'message': 'Ningún certificado cumple los criterios'}, 404
+
+        respuesta = Response(stream_with_context(_zip_certificados(ids, formato, no_encontrados)), mimetype='application/zip')
+        respuesta.headers['Content-Disposition'] = 'attachment; filename=certificados.zip'
+        return respuesta
+
+    def post(self):
+        # Para listas de ids que no caben en la URL
+        return self.get()
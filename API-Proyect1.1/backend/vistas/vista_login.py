@@ -1,9 +1,10 @@
 from flask import request
 from flask_jwt_extended import create_access_token
-from werkzeug.security import check_password_hash
-from ..modelos.modelos import Usuario, Rol
+from sqlalchemy.orm import joinedload
+from ..modelos.modelos import db, Usuario, Rol
+from ..servicios.cache_usuarios import cache_usuarios
+from ..servicios.contrasenas import HashSaturado
 from backend.vistas.auth import auth_blueprint
-from flask import current_app 
 from flask import jsonify
 
 
@@ -24,14 +25,19 @@ def login():
     nombre = data["nombre"]
     contrasena = data["contrasena"]
 
-    usuario = Usuario.query.filter_by(nombre=nombre).first()
+    usuario = Usuario.query.options(joinedload(Usuario.rol)).filter_by(nombre=nombre).first()
 
-    if usuario and check_password_hash(usuario.contrasena_hash, contrasena):
-        rol_nombre = usuario.get_rol_nombre()
-        print(f"vista_login.py: JWT_SECRET_KEY = {current_app.config['JWT_SECRET_KEY']}")
+    try:
+        valida = usuario is not None and usuario.verificar_contrasena(contrasena)
+    except HashSaturado as e:
+        return jsonify({'mensaje': str(e)}), 503, {'Retry-After': '1'}
+
+    if valida:
+        if db.session.is_modified(usuario):
+            db.session.commit()
+        rol_nombre = cache_usuarios.guardar(usuario)['rol']
         token = create_access_token(identity=str(usuario.id),
                                     additional_claims={'rol': rol_nombre})
-        print("DEBUG usuario.id:", usuario.id)
 
         return jsonify({
         'mensaje': 'Inicio de sesión exitoso',
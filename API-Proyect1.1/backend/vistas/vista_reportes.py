@@ -0,0 +1,121 @@
+from datetime import date
+from flask import request
+from flask_restful import Resource
+from backend.modelos import db, solo_lectura, ResumenMensual, ResumenOperario, ResumenTipoServicio
+from backend.servicios.paginacion import ParametroInvalido
+from backend.vistas.vistas_usuarios import admin_required
+from flasgger.utils import swag_from
+from sqlalchemy import func
+
+PARAMETROS_RANGO = [
+    {'name': 'desde', 'in': 'query', 'type': 'string', 'required': False,
+     'description': 'Primer mes (inclusive), AAAA-MM'},
+    {'name': 'hasta', 'in': 'query', 'type': 'string', 'required': False,
+     'description': 'Último mes (inclusive), AAAA-MM'},
+]
+
+
+def _mes_parametro(nombre):
+    valor = request.args.get(nombre)
+    if not valor:
+        return None
+    try:
+        anio, mes = valor.split('-')
+        return date(int(anio), int(mes), 1)
+    except ValueError:
+        raise ParametroInvalido(f"El parámetro '{nombre}' debe tener formato AAAA-MM")
+
+
+def rango_meses(resumen):
+    """Criterios de ``?desde=`` y ``?hasta=`` sobre la columna mes (prefijo de la llave primaria)."""
+    filtros = []
+    desde, hasta = _mes_parametro('desde'), _mes_parametro('hasta')
+    if desde:
+        filtros.append(resumen.mes >= desde)
+    if hasta:
+        filtros.append(resumen.mes <= hasta)
+    return filtros
+
+
+def totales_por(resumen, columna, cantidad):
+    """Suma cantidad e ingresos del rango por ``columna``, de mayor a menor cantidad."""
+    total_cantidad = func.sum(getattr(resumen, cantidad))
+    filas = (
+        db.session.query(getattr(resumen, columna), total_cantidad, func.sum(resumen.ingresos))
+        .filter(*rango_meses(resumen))
+        .group_by(getattr(resumen, columna))
+        .having(total_cantidad > 0)
+        .order_by(total_cantidad.desc(), getattr(resumen, columna))
+        .all()
+    )
+    # SUM devuelve Decimal en MySQL
+    return [{columna: clave, cantidad: int(n), 'ingresos': int(ingresos)} for clave, n, ingresos in filas]
+
+
+class VistaReporteMensual(Resource):
+    @swag_from({
+        'tags': ['Reportes'],
+        'parameters': PARAMETROS_RANGO,
+        'responses': {
+            200: {'description': 'Por mes: certificados, ingresos y certificados por estado'},
+            400: {'description': 'Rango de meses inválido'},
+            403: {'description': 'Solo administradores'}
+        }
+    })
+    @admin_required()
+    @solo_lectura
+    def get(self):
+        try:
+            filtros = rango_meses(ResumenMensual)
+        except ParametroInvalido as e:
+            return {'message': str(e)}, 400
+
+        meses = {}
+        filas = ResumenMensual.query.filter(*filtros, ResumenMensual.certificados > 0) \
+            .order_by(ResumenMensual.mes, ResumenMensual.estado).all()
+        for fila in filas:
+            mes = meses.setdefault(fila.mes, {
+                'mes': fila.mes.strftime('%Y-%m'), 'certificados': 0, 'ingresos': 0, 'por_estado': {}
+            })
+            mes['certificados'] += fila.certificados
+            mes['ingresos'] += fila.ingresos
+            mes['por_estado'][fila.estado] = fila.certificados
+        return list(meses.values()), 200
+
+
+class VistaReporteOperarios(Resource):
+    @swag_from({
+        'tags': ['Reportes'],
+        'parameters': PARAMETROS_RANGO,
+        'responses': {
+            200: {'description': 'Por operario: trabajos (certificados) e ingresos de sus detalles de servicio'},
+            400: {'description': 'Rango de meses inválido'},
+            403: {'description': 'Solo administradores'}
+        }
+    })
+    @admin_required()
+    @solo_lectura
+    def get(self):
+        try:
+            return totales_por(ResumenOperario, 'nombre_operario', 'trabajos'), 200
+        except ParametroInvalido as e:
+            return {'message': str(e)}, 400
+
+
+class VistaReporteTiposServicio(Resource):
+    @swag_from({
+        'tags': ['Reportes'],
+        'parameters': PARAMETROS_RANGO,
+        'responses': {
+            200: {'description': 'Por tipo de servicio (descripción): trabajos (certificados) e ingresos'},
+            400: {'description': 'Rango de meses inválido'},
+            403: {'description': 'Solo administradores'}
+        }
+    })
+    @admin_required()
+    @solo_lectura
+    def get(self):
+        try:
+            return totales_por(ResumenTipoServicio, 'descripcion', 'trabajos'), 200
+        except ParametroInvalido as e:
+            return {'message': str(e)}, 400
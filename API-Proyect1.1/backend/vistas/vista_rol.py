@@ -1,18 +1,28 @@
-from flask import request
+from flask import current_app, request
 from flask_restful import Resource
-from backend.modelos import db, Rol, RolSchema
+from backend.modelos import db, solo_lectura, Rol, RolSchema
+from backend.servicios.cache_usuarios import cache_usuarios
+from backend.servicios.catalogo_roles import catalogo_roles
+from backend.servicios.serializacion import compilar
 from flasgger.utils import swag_from
 
-rol_schema = RolSchema()
+rol_schema = compilar(RolSchema())
 roles_schema = RolSchema(many=True)
 
 class VistaRol(Resource):
-    def get(self):
+    @solo_lectura
+    def get(self, id=None):
         """
-        Obtener todos los roles
+        Obtener todos los roles (o uno por ID)
         ---
         tags:
           - Roles
+        parameters:
+          - name: If-None-Match
+            in: header
+            type: string
+            required: false
+            description: ETag de una respuesta anterior
         responses:
           200:
             description: Lista de roles
@@ -21,17 +31,31 @@ class VistaRol(Resource):
               items:
                 type: object
                 properties:
-                  id_rol:
+                  id:
                     type: integer
                     example: 1
-                  nombre_rol:
+                  nombre:
                     type: string
                     example: Administrador
+          304:
+            description: Los roles no cambiaron desde el ETag enviado
+          404:
+            description: Rol no encontrado
         """
-        roles = Rol.query.all()
-        return roles_schema.dump(roles), 200
+        etag = catalogo_roles.etag
+        cabeceras = {'ETag': f'"{etag}"', 'Cache-Control': 'no-cache'}
+        # Comparación débil: comprimida, la respuesta lleva el ETag como W/"..."
+        if request.if_none_match.contains_weak(etag):
+            return current_app.response_class(status=304, headers=cabeceras)
+
+        if id is None:
+            return catalogo_roles.todos(), 200, cabeceras
+        rol = catalogo_roles.por_id(id)
+        if not rol:
+            return {'message': 'Rol no encontrado'}, 404
+        return rol, 200, cabeceras
 
-    def put(self, id):
+    def put(self, id=None):
         """
         Actualizar el nombre de un rol por ID
         ---
@@ -49,7 +73,7 @@ class VistaRol(Resource):
             schema:
               type: object
               properties:
-                nombre_rol:
+                nombre:
                   type: string
                   example: Nuevo nombre de rol
         responses:
@@ -58,11 +82,15 @@ class VistaRol(Resource):
           404:
             description: Rol no encontrado
         """
-        rol_existente = Rol.query.get(id)
+        rol_existente = Rol.query.get(id) if id is not None else None
         if not rol_existente:
             return {'message': 'Rol no encontrado'}, 404
 
-        data = request.get_json()
-        rol_existente.nombre_rol = data.get('nombre_rol', rol_existente.nombre_rol)
+        data = request.get_json() or {}
+        # 'nombre_rol' es el nombre que documentaba la versión anterior de este endpoint
+        rol_existente.nombre = data.get('nombre', data.get('nombre_rol', rol_existente.nombre))
         db.session.commit()
+        catalogo_roles.refrescar()
+        # Los usuarios en caché llevan el nombre del rol
+        cache_usuarios.limpiar()
         return rol_schema.dump(rol_existente), 200
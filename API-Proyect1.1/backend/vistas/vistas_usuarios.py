@@ -1,16 +1,36 @@
-from flask import request, jsonify, current_app
+from flask import request, jsonify, current_app, abort
 from flask_restful import Resource, Api
-from ..modelos import db, Usuario, UsuarioSchema, Rol
-from werkzeug.security import generate_password_hash
+from ..modelos import db, solo_lectura, Usuario, UsuarioSchema, UsuarioPublicoSchema
+from ..servicios.cache_usuarios import cache_usuarios
+from ..servicios.catalogo_roles import catalogo_roles
+from ..servicios.contrasenas import HashSaturado
+from ..servicios.serializacion import compilar
+from sqlalchemy.exc import IntegrityError
 from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
 from backend.vistas.auth import auth_blueprint
 from functools import wraps
 import logging
 
-logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
 
 vistas_usuarios_schema = UsuarioSchema()
+usuarios_publicos_schema = compilar(UsuarioPublicoSchema(many=True))
 ADMIN_ROLE = 'admin'  
+CAMPOS_PUBLICOS = ('id', 'nombre', 'direccion', 'telefono', 'rol_id')
+
+
+def usuario_en_cache_o_404(usuario_id):
+    datos = cache_usuarios.obtener(usuario_id)
+    if datos is None:
+        abort(404)
+    return {campo: datos[campo] for campo in CAMPOS_PUBLICOS}
+
+
+def mensaje_conflicto(data):
+    """Mensaje para el 409 de una edición que choca con el índice único de usuario.nombre."""
+    if 'nombre' in data:
+        return f"Ya existe un usuario con el nombre {data['nombre']}"
+    return "Los datos chocan con otro registro existente"
 
 
 def admin_required():
@@ -39,7 +59,7 @@ def registrar_usuario():
     data = request.get_json()
     try:
         rol_id = data['rol_id']
-        rol = Rol.query.get(rol_id)
+        rol = catalogo_roles.por_id(rol_id)
         if not rol:
             return {"mensaje": f"No existe el rol con ID {rol_id}"}, 400
 
@@ -47,8 +67,8 @@ def registrar_usuario():
             nombre=data['nombre'],
             direccion=data['direccion'],
             telefono=data['telefono'],
-            rol_id=rol.id,
-            contrasena_hash=generate_password_hash(data['contrasena'])
+            rol_id=rol['id'],
+            contrasena=data['contrasena']
         )
         db.session.add(nuevo_usuario)
         db.session.commit()
@@ -62,6 +82,12 @@ def registrar_usuario():
         }, 201
     except KeyError as e:
         return {"mensaje": f"Falta el campo: {e}"}, 400
+    except HashSaturado as e:
+        db.session.rollback()
+        return {"mensaje": str(e)}, 503, {'Retry-After': '1'}
+    except IntegrityError:
+        db.session.rollback()
+        return {"mensaje": f"Ya existe un usuario con el nombre {data['nombre']}"}, 409
     except Exception as e:
         db.session.rollback()
         return {"mensaje": "Error al registrar el usuario", "error": str(e)}, 500
@@ -70,32 +96,28 @@ def registrar_usuario():
 class UsuariosResource(Resource):
 
     @jwt_required()
+    @solo_lectura
     def get(self):
         """
         Obtener todos los usuarios (solo administradores).
         """
         claims = get_jwt()
         if claims.get('rol', '').lower() != ADMIN_ROLE:
-            logging.debug("Acceso no autorizado: Rol no es administrador")
+            logger.debug("Acceso no autorizado: Rol no es administrador")
             return {'mensaje': 'No tienes permisos de administrador'}, 403
         try:
             usuarios = Usuario.query.all()
-            resultado = [{
-                'id': u.id,
-                'nombre': u.nombre,
-                'direccion': u.direccion,
-                'telefono': u.telefono,
-                'rol_id': u.rol_id
-            } for u in usuarios]
-            logging.debug(f"Resultado a devolver: {resultado}")
+            resultado = usuarios_publicos_schema.dump(usuarios)
+            logger.debug("Usuarios devueltos: %s", len(resultado))
             return resultado, 200
         except Exception as e:
-            logging.error(f"Error al obtener usuarios: {e}")
+            logger.error("Error al obtener usuarios: %s", e)
             return {'mensaje': 'Error al obtener la lista de usuarios'}, 500
 
 
 class UsuarioResource(Resource):
     @jwt_required()
+    @solo_lectura
     def get(self, usuario_id):
         """
         Obtener usuario por ID (solo administradores).
@@ -103,14 +125,7 @@ class UsuarioResource(Resource):
         claims = get_jwt()
         if claims.get('rol', '').lower() != ADMIN_ROLE:
             return {'mensaje': 'No tienes permisos de administrador'}, 403
-        usuario = Usuario.query.get_or_404(usuario_id)
-        return jsonify({
-            'id': usuario.id,
-            'nombre': usuario.nombre,
-            'direccion': usuario.direccion,
-            'telefono': usuario.telefono,
-            'rol_id': usuario.rol_id
-        })
+        return jsonify(usuario_en_cache_o_404(usuario_id))
 
     @admin_required()
     def put(self, usuario_id):
@@ -127,7 +142,12 @@ class UsuarioResource(Resource):
             usuario.telefono = data['telefono']
         if 'rol_id' in data:
             usuario.rol_id = data['rol_id']
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return {"mensaje": mensaje_conflicto(data)}, 409
+        cache_usuarios.invalidar(usuario_id)
         return jsonify({
             'id': usuario.id,
             'nombre': usuario.nombre,
@@ -144,6 +164,7 @@ class UsuarioResource(Resource):
         usuario = Usuario.query.get_or_404(usuario_id)
         db.session.delete(usuario)
         db.session.commit()
+        cache_usuarios.invalidar(usuario_id)
         return {"mensaje": f"Usuario con ID {usuario_id} eliminado exitosamente"}
 
 
@@ -153,19 +174,12 @@ class UsuarioResource(Resource):
 
 @auth_blueprint.route('/perfil', methods=['GET', 'OPTIONS'])
 @jwt_required(optional=True)
+@solo_lectura
 def obtener_perfil():
     if request.method == 'OPTIONS':
         return '', 200
 
-    identidad = get_jwt_identity()
-    usuario = Usuario.query.get_or_404(identidad)
-    return jsonify({
-        'id': usuario.id,
-        'nombre': usuario.nombre,
-        'direccion': usuario.direccion,
-        'telefono': usuario.telefono,
-        'rol_id': usuario.rol_id
-    })
+    return jsonify(usuario_en_cache_o_404(get_jwt_identity()))
 
 
 
@@ -186,7 +200,12 @@ def actualizar_perfil():
     if 'telefono' in data:
         usuario.telefono = data['telefono']
 
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"mensaje": mensaje_conflicto(data)}), 409
+    cache_usuarios.invalidar(usuario.id)
     return jsonify({
         "mensaje": "Perfil actualizado exitosamente",
         "usuario": {
@@ -215,6 +234,19 @@ def cambiar_contrasena():
         return {"mensaje": "La nueva contraseña es requerida"}, 400
 
     usuario = Usuario.query.get_or_404(identidad)
-    usuario.contrasena_hash = generate_password_hash(nueva_contrasena)
+    try:
+        usuario.contrasena = nueva_contrasena
+    except HashSaturado as e:
+        return {"mensaje": str(e)}, 503, {'Retry-After': '1'}
     db.session.commit()
-    return {"mensaje": "Contraseña actualizada exitosamente"}
\ No newline at end of file
+    cache_usuarios.invalidar(usuario.id)
+    return {"mensaje": "Contraseña actualizada exitosamente"}
+
+
+@auth_blueprint.route('/usuarios/cache', methods=['GET'])
+@admin_required()
+def estadisticas_cache_usuarios():
+    """
+    Aciertos y fallos de la caché de usuarios de este proceso (solo administradores).
+    """
+    return cache_usuarios.estadisticas()
\ No newline at end of file
@@ -0,0 +1,74 @@
+"""
+App de pruebas sobre una base SQLite temporal, con el esquema creado (db.create_all) y unos
+pocos certificados completos: orden de servicio, tipo, detalle, dos fichas técnicas y su
+trabajo de renderizado. El renderizado corre en el mismo proceso y el PDF sale del conversor
+'texto' (sin LibreOffice).
+"""
+from datetime import date, timedelta
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from backend.app import construir_app
+from backend.modelos import (
+    db, Certificado, DetalleServicio, FichaTecnica, OrdenServicio, Rol, TipoServicio, TrabajoRender, Usuario
+)
+from backend.servicios import busqueda, reportes
+
+CERTIFICADOS = 5
+
+
+def sembrar(n_certificados=CERTIFICADOS):
+    admin = Rol(nombre='admin')
+    usuario = Usuario(nombre='superAdministrador', contrasena_hash='x', rol=admin)
+    db.session.add(usuario)
+    db.session.flush()
+    for i in range(n_certificados):
+        fecha = date(2024, 1, 1) + timedelta(days=i)
+        orden = OrdenServicio(fecha=fecha, hora='10:00', precaucion='ninguna', usuario_id=usuario.id,
+                              tipo_servicio=TipoServicio(descripcion='Fumigación'))
+        detalle = DetalleServicio(precio=1000, nombre_operario='Operario', cantidad_producto='2L',
+                                  fin_servicio='11:00', orden_servicio=orden)
+        fichas = [
+            FichaTecnica(producto_aplicado=f'Producto {letra}', dosis='1ml', ingrediente_activo=f'Ingrediente {letra}',
+                         detalle_servicio=detalle)
+            for letra in 'AB'
+        ]
+        certificado = Certificado(fecha=fecha, estado='activo', usuario_id=usuario.id, orden_servicio=orden,
+                                  fichas_tecnicas=fichas)
+        db.session.add_all([certificado, TrabajoRender(certificado=certificado, datos='{}')])
+    db.session.commit()
+
+
+@pytest.fixture(scope='module')
+def app(tmp_path_factory):
+    directorio = tmp_path_factory.mktemp('app')
+    app = construir_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{directorio / "pruebas.db"}',
+        'SQLALCHEMY_BINDS': {},
+        'REPLICAS': [],
+        'RENDER_PROCESOS': 0,
+        'CONVERSOR_PDF': 'texto',
+        'CERTIFICADOS_DIR': str(directorio / 'certificados_generados'),
+    })
+    with app.app_context():
+        db.create_all()
+        with db.engine.begin() as conexion:
+            busqueda.crear_indice(conexion)
+        sembrar()
+        with db.engine.begin() as conexion:
+            busqueda.reindexar_todo(conexion)
+            reportes.reconstruir(conexion)
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture(scope='module')
+def cliente(app):
+    return app.test_client()
+
+
+@pytest.fixture(scope='module')
+def cabeceras_admin(app):
+    return {'Authorization': 'Bearer ' + create_access_token(identity='1', additional_claims={'rol': 'admin'})}
@@ -0,0 +1,42 @@
+"""PUT /certificados/<id> sobre un certificado creado antes de los trabajos de renderizado."""
+from datetime import date
+import json
+import os
+
+from backend.modelos import db, Certificado, DetalleServicio, FichaTecnica, OrdenServicio, TipoServicio, TrabajoRender
+from backend.servicios.cache_documentos import cache_documentos
+
+
+def _certificado_heredado():
+    """Certificado sin TrabajoRender, con su documento con el nombre sin versión."""
+    orden = OrdenServicio(fecha=date(2023, 6, 1), hora='09:00', precaucion='ninguna', usuario_id=1,
+                          tipo_servicio=TipoServicio(descripcion='Desinfección'))
+    DetalleServicio(precio=500, nombre_operario='Operario', orden_servicio=orden)
+    certificado = Certificado(fecha=date(2023, 6, 1), estado='activo', usuario_id=1, orden_servicio=orden,
+                              fichas_tecnicas=[FichaTecnica(producto_aplicado='Producto X', dosis='3ml',
+                                                            ingrediente_activo='Ingrediente X')])
+    db.session.add(certificado)
+    db.session.commit()
+    ruta = cache_documentos.ruta_heredada(certificado.id)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    with open(ruta, 'wb') as f:
+        f.write(b'documento anterior')
+    return certificado.id
+
+
+def test_put_en_certificado_heredado_no_pierde_el_documento(cliente, cabeceras_admin):
+    certificado_id = _certificado_heredado()
+
+    respuesta = cliente.put(f'/certificados/{certificado_id}', json={'estado': 'anulado'}, headers=cabeceras_admin)
+    assert respuesta.status_code == 200
+
+    # Se crea el primer trabajo con los datos de la base; el documento se regenera al descargarlo
+    trabajo = TrabajoRender.query.filter_by(certificado_id=certificado_id).one()
+    datos = json.loads(trabajo.datos)
+    assert datos['fecha'] == '2023-06-01'
+    assert datos['descripcion_servicio'] == 'Desinfección'
+    assert datos['producto_1'] == 'Producto X'
+
+    descarga = cliente.get(f'/certificados/{certificado_id}/archivo', headers=cabeceras_admin)
+    assert descarga.status_code == 200
+    assert descarga.mimetype == 'application/pdf'
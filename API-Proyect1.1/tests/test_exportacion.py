@@ -0,0 +1,56 @@
+"""GET /certificados/exportar: la exportación recorre todos los lotes, no solo el primero."""
+import csv
+import io
+import json
+
+import pytest
+from sqlalchemy import event
+
+from backend.modelos import db, Certificado
+
+
+@pytest.fixture
+def lote_de_dos(app):
+    anterior = app.config['EXPORTACION_LOTE']
+    app.config['EXPORTACION_LOTE'] = 2
+    yield 2
+    app.config['EXPORTACION_LOTE'] = anterior
+
+
+@pytest.fixture
+def consultas_certificado(app):
+    capturadas = []
+
+    def antes(conn, cursor, sentencia, parametros, contexto, executemany):
+        if sentencia.lstrip().startswith('SELECT') and 'FROM certificado' in sentencia:
+            capturadas.append(sentencia)
+
+    event.listen(db.engine, 'before_cursor_execute', antes)
+    yield capturadas
+    event.remove(db.engine, 'before_cursor_execute', antes)
+
+
+def test_ndjson_exporta_todos_los_lotes(cliente, cabeceras_admin, lote_de_dos, consultas_certificado):
+    ids = [i for i, in db.session.query(Certificado.id).order_by(Certificado.id)]
+    del consultas_certificado[:]
+    respuesta = cliente.get('/certificados/exportar?formato=ndjson', headers=cabeceras_admin)
+    assert respuesta.status_code == 200
+    registros = [json.loads(linea) for linea in respuesta.get_data(as_text=True).splitlines()]
+
+    assert len(ids) == 5
+    assert [r['id'] for r in registros] == ids
+    assert all(len(r['fichas_tecnicas']) == 2 and len(r['detalles_servicio']) == 1 for r in registros)
+    # 5 certificados en lotes de 2: tres consultas (2 + 2 + 1)
+    assert len(consultas_certificado) == 3
+
+
+def test_csv_exporta_todos_los_lotes(cliente, cabeceras_admin, lote_de_dos):
+    respuesta = cliente.get('/certificados/exportar?formato=csv', headers=cabeceras_admin)
+    assert respuesta.status_code == 200
+    filas = list(csv.DictReader(io.StringIO(respuesta.get_data(as_text=True))))
+
+    ids = [i for i, in db.session.query(Certificado.id).order_by(Certificado.id)]
+    # Una fila por ficha técnica
+    assert len(filas) == len(ids) * 2
+    assert sorted({int(f['certificado_id']) for f in filas}) == ids
+    assert all(f['nombre_operario'] == 'Operario' for f in filas)
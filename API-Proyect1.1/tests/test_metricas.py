@@ -0,0 +1,31 @@
+"""Volcado del estado de las métricas por proceso (METRICAS_DIR)."""
+import os
+import threading
+
+from backend.servicios.metricas import metricas
+
+
+def test_volcados_simultaneos_en_el_mismo_proceso(app, tmp_path):
+    anterior = app.config['METRICAS_DIR']
+    app.config['METRICAS_DIR'] = str(tmp_path)
+    errores = []
+
+    def volcar():
+        with app.app_context():
+            for _ in range(100):
+                try:
+                    metricas.volcar()
+                except Exception as e:
+                    errores.append(e)
+
+    try:
+        hilos = [threading.Thread(target=volcar) for _ in range(4)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+    finally:
+        app.config['METRICAS_DIR'] = anterior
+
+    assert errores == []
+    assert os.listdir(tmp_path) == [f'{os.getpid()}.json']
@@ -0,0 +1,191 @@
+"""
+Planes de ejecución de las consultas de los endpoints principales: ninguna debe recorrer
+completa una tabla que tiene índice para esa búsqueda, y los índices de las migraciones
+deben ser los declarados en los modelos.
+
+Por defecto corre sobre la base SQLite de conftest; con PLAN_CONSULTAS_URL revisa una base
+existente, por ejemplo la MySQL de producción ya migrada:
+
+    PLAN_CONSULTAS_URL=mysql+pymysql://... pytest tests/test_plan_consultas.py
+"""
+from contextlib import contextmanager
+from datetime import date
+import glob
+import importlib.util
+import os
+
+import pytest
+from sqlalchemy import event, or_, select
+from sqlalchemy.orm import selectinload
+
+from backend import BASE_DIR, create_app
+from backend.modelos import (
+    db, Certificado, DetalleServicio, FichaTecnica, OrdenServicio, ResumenMensual, TrabajoRender, Usuario
+)
+from backend.servicios import reportes
+
+DESDE = date(2024, 1, 1)
+HASTA = date(2024, 1, 31)
+
+
+def consultas():
+    """(descripción, función que ejecuta la consulta, tablas que no deben recorrerse completas)."""
+    return [
+        ('login: usuario por nombre',
+         lambda: Usuario.query.filter_by(nombre='superAdministrador').first(),
+         {'usuario'}),
+        ('ZIP/listados: certificados de un usuario en un rango de fechas',
+         lambda: db.session.query(Certificado.id).filter(
+             Certificado.usuario_id == 1, Certificado.fecha >= DESDE, Certificado.fecha <= HASTA
+         ).all(),
+         {'certificado'}),
+        ('ZIP/listados: certificados en un rango de fechas',
+         lambda: db.session.query(Certificado.id).filter(
+             Certificado.fecha >= DESDE, Certificado.fecha <= HASTA
+         ).all(),
+         {'certificado'}),
+        ('listados: certificados por estado y fecha',
+         lambda: Certificado.query.filter(Certificado.estado == 'activo', Certificado.fecha >= DESDE).all(),
+         {'certificado'}),
+        ('GET /certificados?operario=: certificados con detalles de un operario',
+         lambda: db.session.query(Certificado.id).filter(Certificado.orden_servicio_id.in_(
+             select(DetalleServicio.orden_servicio_id).where(DetalleServicio.nombre_operario == 'Operario')
+         )).all(),
+         {'certificado', 'detalle_servicio'}),
+        ('GET /certificados?sort=-fecha: página siguiente por (fecha, id)',
+         lambda: db.session.query(Certificado.id).filter(
+             Certificado.fecha.isnot(None), Certificado.fecha <= HASTA,
+             or_(Certificado.fecha < HASTA, Certificado.id < 100)
+         ).order_by(Certificado.fecha.desc(), Certificado.id.desc()).limit(51).all(),
+         {'certificado'}),
+        ('certificados de una orden de servicio',
+         lambda: Certificado.query.filter_by(orden_servicio_id=1).all(),
+         {'certificado'}),
+        ('GET /certificados: relaciones cargadas con selectinload',
+         lambda: Certificado.query.options(
+             selectinload(Certificado.fichas_tecnicas),
+             selectinload(Certificado.orden_servicio).selectinload(OrdenServicio.detalles_servicio),
+         ).filter(Certificado.id.in_([1, 2, 3])).all(),
+         {'certificado', 'ficha_tecnica', 'detalle_servicio', 'orden_servicio'}),
+        ('DELETE /certificados/<id>: fichas técnicas del certificado',
+         lambda: FichaTecnica.query.filter_by(certificado_id=1).delete(synchronize_session=False),
+         {'ficha_tecnica'}),
+        ('detalles de una orden de servicio',
+         lambda: DetalleServicio.query.filter_by(orden_servicio_id=1).all(),
+         {'detalle_servicio'}),
+        ('órdenes de servicio de un usuario',
+         lambda: OrdenServicio.query.filter_by(usuario_id=1).all(),
+         {'orden_servicio'}),
+        ('descarga: último trabajo de renderizado del certificado',
+         lambda: TrabajoRender.query.filter_by(certificado_id=1).order_by(TrabajoRender.id.desc()).first(),
+         {'trabajo_render'}),
+        ('resúmenes de reportes: aporte de los certificados que cambian',
+         lambda: db.session.execute(reportes._consulta(or_(
+             Certificado.id.in_([1, 2]), Certificado.orden_servicio_id.in_([1])
+         ))).all(),
+         {'certificado', 'orden_servicio', 'detalle_servicio', 'tipo_servicio'}),
+        ('GET /reportes/mensual: rango de meses',
+         lambda: ResumenMensual.query.filter(ResumenMensual.mes >= DESDE, ResumenMensual.mes <= HASTA).all(),
+         {'resumen_mensual'}),
+    ]
+
+
+@contextmanager
+def capturar_sentencias(engine):
+    capturadas = []
+
+    def antes(conn, cursor, sentencia, parametros, contexto, executemany):
+        capturadas.append((sentencia, parametros))
+
+    event.listen(engine, 'before_cursor_execute', antes)
+    try:
+        yield capturadas
+    finally:
+        event.remove(engine, 'before_cursor_execute', antes)
+
+
+def recorridos_completos(conexion, sentencia, parametros):
+    """Tablas que el plan recorre completas, sin índice que lo pueda evitar."""
+    dialecto = conexion.dialect.name
+    if dialecto == 'sqlite':
+        filas = conexion.exec_driver_sql('EXPLAIN QUERY PLAN ' + sentencia, parametros).fetchall()
+        tablas = set()
+        for fila in filas:
+            detalle = fila[-1]
+            # "SCAN certificado" es un recorrido completo; "SCAN ... USING INDEX" no
+            if detalle.startswith('SCAN ') and 'USING' not in detalle:
+                tablas.add(detalle.split()[1])
+        return tablas, [f[-1] for f in filas]
+    if dialecto == 'mysql':
+        resultado = conexion.exec_driver_sql('EXPLAIN ' + sentencia, parametros)
+        columnas = list(resultado.keys())
+        filas = [dict(zip(columnas, f)) for f in resultado.fetchall()]
+        # Con pocas filas MySQL puede preferir un ALL aunque exista índice: solo se cuenta
+        # como problema si además no había ninguna clave posible.
+        tablas = {f['table'] for f in filas if f['type'] == 'ALL' and not f['possible_keys']}
+        return tablas, [f"{f['table']}: {f['type']} key={f['key']} posibles={f['possible_keys']}" for f in filas]
+    pytest.skip(f'Dialecto no soportado para revisar planes: {dialecto}')
+
+
+def revisar_migracion():
+    """Los índices de las migraciones deben coincidir con los declarados en los modelos."""
+    declarados = {
+        indice.name: (tabla.name, [c.name for c in indice.columns], bool(indice.unique))
+        for tabla in db.metadata.tables.values() for indice in tabla.indexes
+    }
+    en_migraciones = {}
+    for ruta in sorted(glob.glob(os.path.join(BASE_DIR, 'migrations', 'versions', '*.py'))):
+        spec = importlib.util.spec_from_file_location(os.path.basename(ruta)[:-3], ruta)
+        modulo = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(modulo)
+        for nombre, tabla, columnas, unico in getattr(modulo, 'INDICES', []):
+            en_migraciones[nombre] = (tabla, list(columnas), unico)
+
+    problemas = []
+    for nombre in sorted(set(declarados) | set(en_migraciones)):
+        if declarados.get(nombre) != en_migraciones.get(nombre):
+            problemas.append(f"{nombre}: modelos={declarados.get(nombre)} migraciones={en_migraciones.get(nombre)}")
+    return problemas
+
+
+def revisar_plan(engine, ejecutar, vigiladas):
+    """Ejecuta una consulta de consultas() y revisa sus planes: (líneas del plan, tablas mal recorridas)."""
+    with capturar_sentencias(engine) as capturadas:
+        ejecutar()
+    db.session.rollback()
+
+    recorridas = set()
+    detalle = []
+    with engine.connect() as conexion:
+        for sentencia, parametros in capturadas:
+            tablas, plan = recorridos_completos(conexion, sentencia, parametros)
+            recorridas |= tablas
+            detalle.extend(plan)
+    return detalle, recorridas & vigiladas
+
+
+CONSULTAS = consultas()
+
+
+@pytest.fixture(scope='module')
+def base(request):
+    url = os.environ.get('PLAN_CONSULTAS_URL')
+    if not url:
+        yield request.getfixturevalue('app')
+        return
+    app = create_app(configuracion={'SQLALCHEMY_DATABASE_URI': url, 'SQLALCHEMY_BINDS': {}, 'REPLICAS': []})
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.mark.parametrize('descripcion, ejecutar, vigiladas', CONSULTAS, ids=[c[0] for c in CONSULTAS])
+def test_sin_recorridos_completos(base, descripcion, ejecutar, vigiladas):
+    detalle, malas = revisar_plan(db.engine, ejecutar, vigiladas)
+    assert detalle, 'La consulta no ejecutó ninguna sentencia'
+    assert not malas, f"Recorrido completo de {', '.join(sorted(malas))}:\n" + '\n'.join(detalle)
+
+
+def test_indices_de_migraciones_coinciden_con_modelos():
+    assert revisar_migracion() == []
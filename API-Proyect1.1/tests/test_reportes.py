@@ -0,0 +1,63 @@
+"""PUT/DELETE /certificados/<id>: bloquean el certificado y los resúmenes quedan como al reconstruirlos."""
+import pytest
+from sqlalchemy import event
+from sqlalchemy.sql import Select
+
+from backend.modelos import db, Certificado, ResumenMensual, ResumenOperario, ResumenTipoServicio
+from backend.servicios import reportes
+
+
+def resumenes():
+    return {
+        resumen: sorted(tuple(fila) for fila in db.session.query(*resumen.__table__.columns)
+                        if fila[-1] or fila[-2])
+        for resumen in (ResumenMensual, ResumenOperario, ResumenTipoServicio)
+    }
+
+
+def reconstruidos():
+    conexion = db.session.connection()
+    reportes.reconstruir(conexion)
+    try:
+        return resumenes()
+    finally:
+        db.session.rollback()
+
+
+@pytest.fixture
+def lecturas_bloqueadas(app):
+    """Tablas de cada SELECT ... FOR UPDATE (SQLite no lo escribe en el SQL, se mira la sentencia)."""
+    capturadas = []
+
+    def antes(conn, sentencia, multiparametros, parametros, opciones):
+        if isinstance(sentencia, Select) and sentencia._for_update_arg is not None:
+            capturadas.append({t.name for t in sentencia.columns_clause_froms})
+
+    event.listen(db.engine, 'before_execute', antes)
+    yield capturadas
+    event.remove(db.engine, 'before_execute', antes)
+
+
+def test_put_bloquea_y_mantiene_resumenes(cliente, cabeceras_admin, lecturas_bloqueadas):
+    certificado_id = db.session.query(Certificado.id).order_by(Certificado.id).first()[0]
+    respuesta = cliente.put(f'/certificados/{certificado_id}', json={'estado': 'anulado'}, headers=cabeceras_admin)
+    assert respuesta.status_code == 200
+
+    # La vista bloquea la fila y la resta de los reportes se lee con bloqueo
+    assert len(lecturas_bloqueadas) == 2
+    assert all('certificado' in tablas for tablas in lecturas_bloqueadas)
+    db.session.remove()
+    actuales = resumenes()
+    assert ('anulado', 1) in {(fila[1], fila[2]) for fila in actuales[ResumenMensual]}
+    assert actuales == reconstruidos()
+
+
+def test_delete_bloquea_y_mantiene_resumenes(cliente, cabeceras_admin, lecturas_bloqueadas):
+    certificado_id = db.session.query(Certificado.id).order_by(Certificado.id.desc()).first()[0]
+    respuesta = cliente.delete(f'/certificados/{certificado_id}', headers=cabeceras_admin)
+    assert respuesta.status_code == 204
+
+    assert len(lecturas_bloqueadas) == 2
+    db.session.remove()
+    assert db.session.get(Certificado, certificado_id) is None
+    assert resumenes() == reconstruidos()